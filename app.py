@@ -1,6 +1,7 @@
 import sys
-from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QFrame, QTabWidget
+from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QFrame, QTabWidget, QMessageBox
 from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QShortcut, QKeySequence
 from tab import MainTabContent, RibbonTabButton, SubTabButton, TAB_COLORS
 from screens.calibration_tab import ElementsTab
 from screens.pivot.pivot_tab import PivotTab
@@ -11,7 +12,13 @@ from screens.process.RM_check import CheckRMFrame
 from screens.process.weight_check import WeightCheckFrame
 from screens.process.volume_check import VolumeCheckFrame
 from screens.process.DF_check import DFCheckFrame
+from screens.process.blank_check import BlankCheckFrame
+from screens.process.IS_check import ISCheckFrame
 from screens.compare_tab import CompareTab
+from screens.process.pipeline_view import PipelineView
+from utils.pipeline import ProcessPipeline
+from utils.undo import UndoStack, stage_edit, params_edit
+from utils.uncertainty import compact_uncertainty
 import os
 import pandas as pd
 import logging
@@ -32,6 +39,8 @@ class MainWindow(QMainWindow):
         self.data = None
         self.file_path = None
         self.file_path_label = QLabel("File Path: No file selected")
+        self.pipeline = ProcessPipeline()
+        self.undo_stack = UndoStack()
         
         # Initialize tabs only once
         self.pivot_tab = PivotTab(self, self)
@@ -42,7 +51,10 @@ class MainWindow(QMainWindow):
         self.weight_check = WeightCheckFrame(self, self)
         self.volume_check = VolumeCheckFrame(self, self)
         self.df_check = DFCheckFrame(self, self)
+        self.blank_check = BlankCheckFrame(self, self)
+        self.is_check = ISCheckFrame(self, self)
         self.compare_tab = CompareTab(self, self)
+        self.pipeline_view = PipelineView(self, self)
         
         # Tab definitions
         tab_info = {
@@ -58,8 +70,11 @@ class MainWindow(QMainWindow):
                 "Weight Check": self.weight_check,
                 "Volume Check": self.volume_check,
                 "DF check": self.df_check,
+                "Blank check": self.blank_check,
+                "IS check": self.is_check,
                 "RM check": self.rm_check,
-                "Result": self.results
+                "Result": self.results,
+                "Pipeline": self.pipeline_view
             },
             "Elements": {
                 "Display": self.elements_tab,
@@ -76,6 +91,12 @@ class MainWindow(QMainWindow):
         self.main_content = MainTabContent(tab_info)
         self.setCentralWidget(self.main_content)
         self.setWindowTitle("RASF Data Processor")
+
+        # Undo/redo of corrections
+        QShortcut(QKeySequence.StandardKey.Undo, self, activated=self.undo)
+        QShortcut(QKeySequence.StandardKey.Redo, self, activated=self.redo)
+        self.undo_stack.changed.connect(self.update_undo_buttons)
+        self.update_undo_buttons()
         
         # Add window to open_windows list
         MainWindow.open_windows.append(self)
@@ -105,6 +126,7 @@ class MainWindow(QMainWindow):
             # Ensure CRMTab closes its database connection
             if hasattr(self.crm_tab, 'close_db_connection'):
                 self.crm_tab.close_db_connection()
+            self.rm_check.close_corrections_store()
             event.accept()
         except Exception as e:
             logger.error(f"Error in closeEvent: {str(e)}")
@@ -116,6 +138,7 @@ class MainWindow(QMainWindow):
             result = load_excel(self)
             if result:
                 self.data, self.file_path = result
+                self.undo_stack.clear()
                 file_name = os.path.basename(self.file_path)
                 self.setWindowTitle(f"RASF Data Processor - {file_name}")
                 logger.debug(f"Excel file loaded: {file_name}")
@@ -135,6 +158,74 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logger.error(f"Error in set_data: {str(e)}")
 
+    def stage_input(self, name):
+        """Input of a Process stage: the memoised output of the stages before it."""
+        if self.pipeline.source is None:
+            return self.data
+        return self.pipeline.input_for(name)
+
+    def stage_output(self, name):
+        """Output of a Process stage computed from its current input and parameters."""
+        if self.pipeline.source is None:
+            return self.data
+        return self.pipeline.output(name)
+
+    def stage_params(self, name):
+        return self.pipeline.params(name)
+
+    def set_stage_params(self, name, params):
+        """Change a stage's parameters from outside its Process tab and refresh the application data."""
+        if self.pipeline.source is None:
+            return
+        self.pipeline.set_params(name, params)
+        self.set_data(self.pipeline.output('Result'), for_results=True)
+
+    def apply_stage_params(self, name, params, for_results=False):
+        """Store a Process tab's parameters; the pipeline computes the stage output from its current input."""
+        if self.pipeline.source is None:
+            return
+        before_params = self.pipeline.params(name)
+        self.pipeline.set_params(name, params)
+        self.set_data(self.pipeline.output('Result'), for_results)
+        self.undo_stack.push(params_edit(
+            f"{name} correction", self.pipeline, name, before_params, params,
+            refresh=lambda: self.set_data(self.pipeline.output('Result'), for_results=True)
+        ))
+
+    def commit_stage(self, name, df, params, for_results=False):
+        """Store a Process tab's output as its stage output and refresh the application data."""
+        # Tabs build their output with concat/merge, which can widen the float32 SD/RSD and category Units columns
+        compact_uncertainty(df)
+        if self.pipeline.source is None:
+            self.set_data(df, for_results)
+            return
+        before, before_params = self.pipeline.cached_output(name), self.pipeline.params(name)
+        self.pipeline.commit(name, df, params)
+        self.set_data(self.pipeline.output('Result'), for_results)
+        self.undo_stack.push(stage_edit(
+            f"{name} correction", self.pipeline, name, before, before_params, df, params,
+            refresh=lambda: self.set_data(self.pipeline.output('Result'), for_results=True)
+        ))
+
+    def undo(self):
+        self.run_edit(self.undo_stack.undo)
+
+    def redo(self):
+        self.run_edit(self.undo_stack.redo)
+
+    def run_edit(self, action):
+        try:
+            description = action()
+            if description:
+                logger.debug(f"Applied undo/redo of '{description}'")
+        except Exception as e:
+            logger.error(f"Undo/redo failed: {str(e)}")
+            QMessageBox.warning(self, "Error", f"Could not undo/redo the correction: {str(e)}\nThe undo history was cleared.")
+
+    def update_undo_buttons(self):
+        self.pivot_tab.update_undo_buttons(self.undo_stack)
+        self.pipeline_view.update_undo_buttons(self.undo_stack)
+
     def notify_data_changed(self):
         """Notify all tabs that data has changed."""
         try:
@@ -1,8 +1,11 @@
 import logging
 import pandas as pd
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QLabel, QTreeWidget, QTreeWidgetItem, QGridLayout
+import numpy as np
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QLabel, QTreeWidget, QTreeWidgetItem, QGridLayout, QDialog
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont, QColor, QBrush
+from utils.element_registry import ElementRegistry
+from utils.calibration import CalibrationIndex, MIN_R2
 
 # Setup logging with minimal output for performance
 logger = logging.getLogger(__name__)
@@ -30,6 +33,8 @@ class ElementsTab(QWidget):
         self.current_element = None
         self.filtered_elements = []
         self.df_cache = None  # Cache for DataFrame
+        self.element_registry = ElementRegistry()
+        self.calibration_index = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -122,8 +127,21 @@ class ElementsTab(QWidget):
         self.wavelength_combo.setToolTip("Select a wavelength to filter element data")
         self.wavelength_combo.currentTextChanged.connect(self.filter_by_wavelength)
         filter_layout.addWidget(self.wavelength_combo)
+
+        # Calibration statistics of the selected element/wavelength
+        self.stats_label = QLabel("", self.filter_frame)
+        self.stats_label.setFont(QFont("Segoe UI", 11))
+        self.stats_label.setStyleSheet("color: #555555; border: none;")
+        filter_layout.addWidget(self.stats_label)
         filter_layout.addStretch()
 
+        summary_btn = QPushButton("Calibration Summary", self.filter_frame)
+        summary_btn.setFont(QFont("Segoe UI", 12))
+        summary_btn.setFixedHeight(34)
+        summary_btn.setToolTip("Slope, intercept, R², residuals and LOD/LOQ for every wavelength in the run")
+        summary_btn.clicked.connect(self.show_calibration_summary)
+        filter_layout.addWidget(summary_btn)
+
         # Details frame with TreeWidget for element data
         self.details_frame = QWidget(self)
         details_layout = QVBoxLayout()
@@ -263,6 +281,8 @@ class ElementsTab(QWidget):
             # Convert Soln Conc and Int to numeric, preserving -1.0 for invalid values
             df['Soln Conc'] = pd.to_numeric(df['Soln Conc'], errors='coerce').fillna(-1.0)
             df['Int'] = pd.to_numeric(df['Int'], errors='coerce').fillna(-1.0)
+            self.element_registry = ElementRegistry.from_dataframe(df)
+            self.calibration_index = CalibrationIndex(df, self.element_registry)
             logger.info("DataFrame cleaned successfully")
             return df
         except Exception as e:
@@ -275,28 +295,19 @@ class ElementsTab(QWidget):
         self.current_element = element
         if self.df_cache is None:
             self.df_cache = self.clean_dataframe(self.app.get_data())
-        df = self.df_cache
+        index = self.calibration_index
 
-        if df is None:
+        self.details_tree.clear()
+        if self.df_cache is None or index is None:
             logger.error("No valid DataFrame available")
-            self.details_tree.clear()
             item = CustomTreeWidgetItem(["No data available", element, "", "", ""])
             item.setForeground(0, QBrush(QColor("#d32f2f")))
             self.details_tree.addTopLevelItem(item)
+            self.stats_label.setText("")
             return
 
-        self.details_tree.clear()
-
-        try:
-            std_data = df[(df['Type'] == 'Std') & (df['Element'].str.startswith(element + ' '))]
-        except Exception as e:
-            logger.error(f"Error filtering STD data: {str(e)}")
-            item = CustomTreeWidgetItem([f"Error: {str(e)}", element, "", "", ""])
-            item.setForeground(0, QBrush(QColor("#d32f2f")))
-            self.details_tree.addTopLevelItem(item)
-            return
-
-        if std_data.empty:
+        rows = index.rows(element)
+        if rows.stop == rows.start:
             logger.warning(f"No STD data found for element: {element}")
             item = CustomTreeWidgetItem(["No STD data found", element, "", "", ""])
             item.setForeground(0, QBrush(QColor("#757575")))
@@ -305,56 +316,16 @@ class ElementsTab(QWidget):
             self.wavelength_combo.clear()
             self.wavelength_combo.addItem("All Wavelengths")
             self.wavelength_combo.blockSignals(False)
-        else:
-            try:
-                wavelengths = std_data['Element'].str.replace(element + ' ', '', regex=False).unique()
-                wavelengths = [w for w in wavelengths if w]
-            except Exception as e:
-                logger.error(f"Error extracting wavelengths: {str(e)}")
-                wavelengths = []
+            self.stats_label.setText("")
+            return
 
-            self.wavelength_combo.blockSignals(True)
-            self.wavelength_combo.clear()
-            self.wavelength_combo.addItems(["All Wavelengths"] + sorted(wavelengths))
-            self.wavelength_combo.setCurrentText("All Wavelengths")
-            self.wavelength_combo.blockSignals(False)
-
-            try:
-                items = []
-                for _, row in std_data.iterrows():
-                    soln_conc = row['Soln Conc']
-                    int_val = row['Int']
-                    # Format display values
-                    soln_conc_display = '---' if soln_conc == -1.0 else f"{soln_conc:.2f}"
-                    int_display = '---' if int_val == -1.0 else f"{int_val:.2f}"
-                    wavelength = row.get('Element', '').replace(element + ' ', '') if row.get('Element', '').startswith(element + ' ') else row.get('Wavelength', '')
-                    item = CustomTreeWidgetItem([
-                        str(row.get('Solution Label', '')),
-                        element,
-                        soln_conc_display,
-                        int_display,
-                        wavelength
-                    ])
-                    # Store numeric values for sorting
-                    item.setData(2, Qt.ItemDataRole.UserRole, float(soln_conc))
-                    item.setData(3, Qt.ItemDataRole.UserRole, float(int_val))
-                    # Store text for non-numeric columns
-                    item.setData(0, Qt.ItemDataRole.UserRole, str(row.get('Solution Label', '')).lower())
-                    item.setData(1, Qt.ItemDataRole.UserRole, element.lower())
-                    item.setData(4, Qt.ItemDataRole.UserRole, wavelength.lower())
-                    items.append(item)
-
-                for i, item in enumerate(items):
-                    # Apply alternating background
-                    if i % 2 == 0:
-                        for col in range(5):
-                            item.setBackground(col, QBrush(QColor("#fafafa")))
-                self.details_tree.addTopLevelItems(items)
-            except Exception as e:
-                logger.error(f"Error populating tree: {str(e)}")
-                item = CustomTreeWidgetItem([f"Error: {str(e)}", element, "", "", ""])
-                item.setForeground(0, QBrush(QColor("#d32f2f")))
-                self.details_tree.addTopLevelItem(item)
+        self.wavelength_combo.blockSignals(True)
+        self.wavelength_combo.clear()
+        self.wavelength_combo.addItems(["All Wavelengths"] + index.wavelengths(element))
+        self.wavelength_combo.setCurrentText("All Wavelengths")
+        self.wavelength_combo.blockSignals(False)
+        self.populate_tree(element, rows)
+        self.update_stats_label(element)
 
     def filter_by_wavelength(self, selected_wavelength):
         """Filter data by selected wavelength"""
@@ -365,71 +336,121 @@ class ElementsTab(QWidget):
 
         if self.df_cache is None:
             self.df_cache = self.clean_dataframe(self.app.get_data())
-        df = self.df_cache
+        index = self.calibration_index
 
-        if df is None:
+        self.details_tree.clear()
+        if self.df_cache is None or index is None:
             logger.error("No valid DataFrame available")
-            self.details_tree.clear()
             item = CustomTreeWidgetItem(["No data available", self.current_element, "", "", selected_wavelength])
             item.setForeground(0, QBrush(QColor("#d32f2f")))
             self.details_tree.addTopLevelItem(item)
             return
 
-        self.details_tree.clear()
+        rows = index.rows(self.current_element, selected_wavelength)
+        if rows.stop == rows.start:
+            logger.warning(f"No data found for wavelength: {selected_wavelength}")
+            item = CustomTreeWidgetItem([f"No data for {selected_wavelength}", self.current_element, "", "", selected_wavelength])
+            item.setForeground(0, QBrush(QColor("#757575")))
+            self.details_tree.addTopLevelItem(item)
+            return
+        self.populate_tree(self.current_element, rows)
+        self.update_stats_label(self.current_element, selected_wavelength)
 
-        element_with_wavelength = f"{self.current_element} {selected_wavelength}".strip()
+    def populate_tree(self, element, rows):
+        """Fill the details tree from a slice of the calibration index."""
+        index = self.calibration_index
         try:
-            type_mask = df['Type'] == 'Std'
-            element_mask = df['Element'] == element_with_wavelength
-            std_data = df[type_mask & element_mask]
+            labels = index.labels[rows]
+            conc = index.soln_conc[rows]
+            intensity = index.intensity[rows]
+            lines = index.lines_of_rows[rows]
+            conc_display = np.where(conc == -1.0, '---', np.char.mod('%.2f', conc))
+            int_display = np.where(intensity == -1.0, '---', np.char.mod('%.2f', intensity))
+            stripe = QBrush(QColor("#fafafa"))
+
+            items = []
+            for i in range(len(labels)):
+                label = str(labels[i])
+                item = CustomTreeWidgetItem([label, element, conc_display[i], int_display[i], lines[i]])
+                # Store numeric values for sorting
+                item.setData(2, Qt.ItemDataRole.UserRole, float(conc[i]))
+                item.setData(3, Qt.ItemDataRole.UserRole, float(intensity[i]))
+                # Store text for non-numeric columns
+                item.setData(0, Qt.ItemDataRole.UserRole, label.lower())
+                item.setData(1, Qt.ItemDataRole.UserRole, element.lower())
+                item.setData(4, Qt.ItemDataRole.UserRole, lines[i].lower())
+                # Apply alternating background
+                if i % 2 == 0:
+                    for col in range(5):
+                        item.setBackground(col, stripe)
+                items.append(item)
+            self.details_tree.addTopLevelItems(items)
         except Exception as e:
-            logger.error(f"Error filtering data: {str(e)}")
-            item = CustomTreeWidgetItem([f"Error: {str(e)}", self.current_element, "", "", selected_wavelength])
+            logger.error(f"Error populating tree: {str(e)}")
+            item = CustomTreeWidgetItem([f"Error: {str(e)}", element, "", "", ""])
             item.setForeground(0, QBrush(QColor("#d32f2f")))
             self.details_tree.addTopLevelItem(item)
+
+    def update_stats_label(self, element, line=None):
+        """Show slope, R² and LOD of the shown wavelength(s)."""
+        stats = self.calibration_index.line_stats(element, line)
+        parts = []
+        for (_, wavelength), row in zip(stats.index, stats.itertuples(index=False)):
+            if np.isnan(row.Slope):
+                parts.append(f"{wavelength or element}: no fit")
+                continue
+            text = f"{wavelength or element}: slope {row.Slope:.4g}, R² {row.R2:.4f}"
+            if not np.isnan(row.LOD):
+                text += f", LOD {row.LOD:.3g}"
+            parts.append(text)
+        self.stats_label.setText(" | ".join(parts))
+
+    def show_calibration_summary(self):
+        """Show calibration quality of every element/wavelength in the run."""
+        if self.df_cache is None:
+            self.df_cache = self.clean_dataframe(self.app.get_data())
+        index = self.calibration_index
+        if index is None or index.stats.empty:
+            logger.warning("No calibration data for summary")
+            self.stats_label.setText("No STD data for a calibration summary")
             return
 
-        if std_data.empty:
-            logger.warning(f"No data found for wavelength: {selected_wavelength}")
-            item = CustomTreeWidgetItem([f"No data for {selected_wavelength}", self.current_element, "", "", selected_wavelength])
-            item.setForeground(0, QBrush(QColor("#757575")))
-            self.details_tree.addTopLevelItem(item)
-        else:
-            try:
-                items = []
-                for _, row in std_data.iterrows():
-                    soln_conc = row['Soln Conc']
-                    int_val = row['Int']
-                    # Format display values
-                    soln_conc_display = '---' if soln_conc == -1.0 else f"{soln_conc:.2f}"
-                    int_display = '---' if int_val == -1.0 else f"{int_val:.2f}"
-                    item = CustomTreeWidgetItem([
-                        str(row.get('Solution Label', '')),
-                        self.current_element,
-                        soln_conc_display,
-                        int_display,
-                        selected_wavelength
-                    ])
-                    # Store numeric values for sorting
-                    item.setData(2, Qt.ItemDataRole.UserRole, float(soln_conc))
-                    item.setData(3, Qt.ItemDataRole.UserRole, float(int_val))
-                    # Store text for non-numeric columns
-                    item.setData(0, Qt.ItemDataRole.UserRole, str(row.get('Solution Label', '')).lower())
-                    item.setData(1, Qt.ItemDataRole.UserRole, self.current_element.lower())
-                    item.setData(4, Qt.ItemDataRole.UserRole, selected_wavelength.lower())
-                    items.append(item)
-
-                for i, item in enumerate(items):
-                    # Apply alternating background
-                    if i % 2 == 0:
-                        for col in range(5):
-                            item.setBackground(col, QBrush(QColor("#fafafa")))
-                self.details_tree.addTopLevelItems(items)
-            except Exception as e:
-                logger.error(f"Error populating tree: {str(e)}")
-                item = CustomTreeWidgetItem([f"Error: {str(e)}", self.current_element, "", "", selected_wavelength])
-                item.setForeground(0, QBrush(QColor("#d32f2f")))
-                self.details_tree.addTopLevelItem(item)
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Calibration Summary")
+        dialog.resize(900, 600)
+        layout = QVBoxLayout(dialog)
+        stats = index.stats
+        headers = ["Element", "Wavelength", "Points", "Slope", "Intercept", "R2", "Max Residual (%)", "LOD", "LOQ"]
+        tree = QTreeWidget(dialog)
+        tree.setHeaderLabels(headers)
+        tree.setRootIsDecorated(False)
+        tree.setAlternatingRowColors(True)
+
+        formatted = {col: stats[col].map(lambda v: "---" if pd.isna(v) else f"{v:.4g}") for col in headers[3:]}
+        poor = (stats['R2'] < MIN_R2).to_numpy() | stats['R2'].isna().to_numpy()
+        items = []
+        for i in range(len(stats)):
+            values = [str(stats['Element'].iat[i]), str(stats['Wavelength'].iat[i]), str(stats['Points'].iat[i])]
+            values += [formatted[col].iat[i] for col in headers[3:]]
+            item = QTreeWidgetItem(values)
+            if poor[i]:
+                item.setForeground(5, QBrush(QColor("#d32f2f")))
+            items.append(item)
+        tree.addTopLevelItems(items)
+        for col in range(len(headers)):
+            tree.resizeColumnToContents(col)
+        layout.addWidget(tree)
+
+        fitted = stats['R2'].notna()
+        summary = QLabel(
+            f"{len(stats)} wavelengths, {int(fitted.sum())} fitted, "
+            f"{int((stats['R2'] < MIN_R2).sum())} with R² < {MIN_R2}, "
+            f"median R² {stats['R2'].median():.4f}" if fitted.any() else f"{len(stats)} wavelengths, none fitted",
+            dialog
+        )
+        summary.setFont(QFont("Segoe UI", 11))
+        layout.addWidget(summary)
+        dialog.show()
 
     def process_blk_elements(self):
         """Process BLK data and display unique elements"""
@@ -454,7 +475,7 @@ class ElementsTab(QWidget):
         self.filtered_elements = []
         try:
             for element in blk_data['Element'].unique():
-                element_name = element.split()[0]
+                element_name = self.element_registry.element_of(element)
                 if element_name and element_name not in self.filtered_elements:
                     self.filtered_elements.append(element_name)
         except Exception as e:
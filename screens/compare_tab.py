@@ -1,26 +1,40 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QFileDialog, QMessageBox, QScrollArea, QComboBox, QGroupBox, QDialog, QProgressDialog
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QFileDialog, QMessageBox, QScrollArea, QComboBox, QGroupBox, QDialog, QProgressDialog, QCheckBox
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt6.QtGui import QStandardItemModel, QStandardItem, QColor
 import pandas as pd
+import numpy as np
 import math
 import logging
-import re
-from xlsxwriter import Workbook
+import time
 import random
 import os
 import subprocess
 import platform
+from utils.element_registry import ElementRegistry
+from utils.excel_export import SheetSpec, start_excel_export
+from utils.similarity import (to_feature_array, candidate_controls, candidate_recall, group_membership,
+                              group_partial_sums, collapse_groups, weighted_similarity, run_matching, MAX_CACHE_BYTES)
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# Named cell formats of the comparison report
+REPORT_FORMATS = {
+    'header': {'bold': True, 'bg_color': '#D1E7DD', 'border': 1, 'align': 'center', 'valign': 'vcenter'},
+    'sample': {'bg_color': '#E8F5E9', 'border': 1, 'align': 'center'},
+    'control': {'bg_color': '#E3F2FD', 'border': 1, 'align': 'center'},
+    'd': {'num_format': '0.00', 'bg_color': '#FFEBEE', 'border': 1, 'align': 'center'},
+    'blank': {'bg_color': '#FFFFFF', 'border': 1, 'align': 'center'},
+    'sum': {'bold': True, 'bg_color': '#F5F6F5', 'border': 1, 'align': 'center'},
+}
+
 class ComparisonThread(QThread):
     progress = pyqtSignal(int)
     finished = pyqtSignal(list, list)
     error = pyqtSignal(str)
 
-    def __init__(self, sample_df, control_df, sample_col_map, control_col_map, sorted_columns, non_numeric_columns, group_weights, magnitude_groups):
+    def __init__(self, sample_df, control_df, sample_col_map, control_col_map, sorted_columns, non_numeric_columns, group_weights, magnitude_groups, match_mode="greedy", min_similarity=0.0, top_k=None):
         super().__init__()
         self.sample_df = sample_df
         self.control_df = control_df
@@ -30,118 +44,133 @@ class ComparisonThread(QThread):
         self.non_numeric_columns = non_numeric_columns
         self.group_weights = group_weights
         self.magnitude_groups = magnitude_groups
+        self.match_mode = match_mode
+        self.min_similarity = min_similarity
+        self.top_k = top_k
+        self.summary = {}
+        self.score_cache = None
 
     def run(self):
         try:
-            weights = {}
-            for order, entry in self.group_weights.items():
-                try:
-                    weight_val = float(entry.text() or str(order + 1))
-                except ValueError:
-                    logger.warning(f"Invalid weight for magnitude {order}, using {order + 1}")
-                    weight_val = order + 1
-                for col in self.magnitude_groups[order]:
-                    weights[col] = weight_val
+            group_orders = sorted(self.magnitude_groups.keys(), reverse=True)
+            weights = read_group_weights(self.group_weights)
+            group_weight_values = np.array([weights.get(order, order + 1) for order in group_orders], dtype=np.float64)
 
             included_columns = self.sorted_columns
             all_columns = self.non_numeric_columns + included_columns
-            results = []
-            match_data = []
-            used_control_ids = set()  # برای ردیابی Control IDهای استفاده‌شده
-            total_rows = len(self.sample_df)
-
-            for idx, sample_row in enumerate(self.sample_df.iterrows()):
-                _, sample_row = sample_row
-                sample_id = sample_row["SAMPLE ID"]
-                best_similarity = 0
-                best_control_id = None
-                best_column_diffs = {}
-                best_control_row = None
-
-                for _, control_row in self.control_df.iterrows():
-                    control_id = control_row["SAMPLE ID"]
-                    if control_id in used_control_ids:
-                        continue  # از Control IDهای استفاده‌شده صرف‌نظر کن
-                    scores = []
-                    column_diffs = {}
-                    total_weight = sum(weights.get(col, 0) for col in included_columns)
-
-                    for col in included_columns:
-                        sample_val = sample_row[self.sample_col_map[col]]
-                        control_val = control_row[self.control_col_map[col]]
-                        if pd.isna(sample_val) or pd.isna(control_val):
-                            column_diffs[col] = None
-                            continue
-                        if abs(control_val) == 0:
-                            if abs(sample_val) == 0:
-                                scores.append(weights[col] * 1)
-                                column_diffs[col] = 0
-                            else:
-                                scores.append(0)
-                                column_diffs[col] = None
-                            continue
-                        diff = abs(sample_val - control_val) / abs(control_val)
-                        score = weights[col] * (1 / (1 + diff))
-                        scores.append(score)
-                        column_diffs[col] = diff * 100
-
-                    if total_weight > 0:
-                        similarity = (sum(scores) / total_weight) * 100
-                    else:
-                        similarity = 0
-
-                    if similarity > best_similarity:
-                        best_similarity = similarity
-                        best_control_id = control_id
-                        best_control_row = control_row
-                        best_column_diffs = column_diffs
-
-                # ایجاد ردیف برای Sample، حتی اگر مچ نشود
-                result = {
-                    "Sample ID": sample_id,
-                    "Control ID": best_control_id if best_control_id is not None else None,
-                    "Similarity (%)": round(best_similarity, 2) if best_control_id is not None else 0
-                }
-                results.append(result)
-
-                match_row = {
-                    "Sample ID": sample_id,
-                    "Control ID": best_control_id if best_control_id is not None else None,
-                    "Similarity (%)": round(best_similarity, 2) if best_control_id is not None else 0
-                }
-                for col in all_columns:
-                    sample_col_name = self.sample_col_map[col]
-                    match_row[f"Sample_{col}"] = sample_row[sample_col_name]
-                    # اگر مچ نشده، مقادیر Control را خالی بگذار
-                    if best_control_row is not None:
-                        control_col_name = self.control_col_map[col]
-                        match_row[f"Control_{col}"] = best_control_row[control_col_name]
-                    else:
-                        match_row[f"Control_{col}"] = None
-                for col in included_columns:
-                    if best_control_id is not None:
-                        sample_val = match_row[f"Sample_{col}"]
-                        control_val = match_row[f"Control_{col}"]
-                        if not pd.isna(sample_val) and not pd.isna(control_val) and (sample_val + control_val) != 0:
-                            d = abs(sample_val - control_val) / abs(sample_val + control_val) * 100
-                            match_row[f"{col}_Difference"] = round(d, 2)
-                        else:
-                            match_row[f"{col}_Difference"] = None
-                    else:
-                        match_row[f"{col}_Difference"] = None
 
-                match_data.append(match_row)
-                if best_control_id is not None:
-                    used_control_ids.add(best_control_id)  # اضافه کردن Control ID به استفاده‌شده‌ها
-
-                self.progress.emit(int((idx + 1) / total_rows * 100))
+            # Numeric (samples x columns) and (controls x columns) arrays for vectorized scoring
+            sample_values = to_feature_array(self.sample_df, self.sample_col_map, included_columns)
+            control_values = to_feature_array(self.control_df, self.control_col_map, included_columns)
+            membership = group_membership(included_columns, self.magnitude_groups, group_orders)
+            column_weights = membership @ group_weight_values
+            control_keys = self.control_df["SAMPLE ID"].tolist()
+
+            candidates = None
+            recall = None
+            if self.top_k:
+                # Prefilter: score only each sample's k nearest controls in log-scaled feature space
+                candidates = candidate_controls(sample_values, control_values, column_weights, self.top_k)
+                recall = candidate_recall(sample_values, control_values, column_weights, candidates)
+                n_cached = candidates.shape[1]
+            else:
+                n_cached = len(control_values)
+
+            # Per-group partial sums do not depend on the weights, so keep them for instant re-weighting
+            group_sizes = membership.sum(axis=0)
+            reweightable = len(sample_values) * n_cached * len(group_orders) * 4 <= MAX_CACHE_BYTES
+            if not reweightable:
+                logger.debug("Score cache too large for per-group partial sums; storing weighted sums only")
+                membership, cache_weights, group_sizes = collapse_groups(membership, group_weight_values)
+            else:
+                cache_weights = group_weight_values
+            partials = group_partial_sums(
+                sample_values, control_values, membership, candidates,
+                progress=lambda frac: self.progress.emit(int(frac * 90))
+            )
+            sim = weighted_similarity(partials, cache_weights, group_sizes)
+
+            matched, best_scores, self.summary = run_matching(sim, control_keys, self.match_mode, self.min_similarity, candidates)
+            self.summary.update({"top_k": self.top_k, "recall": recall})
+            if self.match_mode == "optimal":
+                logger.debug(f"Optimal matching total {self.summary['total_similarity']:.2f} vs greedy {self.summary['greedy_total']:.2f}")
+
+            self.score_cache = {
+                "partials": partials,
+                "candidates": candidates,
+                "control_keys": control_keys,
+                "group_orders": group_orders,
+                "group_sizes": group_sizes,
+                "reweightable": reweightable,
+                "sample_values": sample_values,
+                "control_values": control_values,
+                "all_columns": all_columns,
+                "top_k": self.top_k,
+                "recall": recall,
+            }
 
-            results.sort(key=lambda x: x["Similarity (%)"], reverse=True)
-            match_data.sort(key=lambda x: x["Similarity (%)"], reverse=True)
+            match_data = build_match_data(
+                self.sample_df, self.control_df, self.sample_col_map, self.control_col_map,
+                all_columns, included_columns, sample_values, control_values,
+                matched, best_scores
+            )
+            self.progress.emit(100)
             self.finished.emit(match_data, all_columns)
         except Exception as e:
             logger.error(f"Error during comparison: {str(e)}")
             self.error.emit(str(e))
+
+
+def read_group_weights(group_weights):
+    """Read {order: weight} from the magnitude-group QLineEdits, defaulting to order + 1."""
+    weights = {}
+    for order, entry in group_weights.items():
+        try:
+            weights[order] = float(entry.text() or str(order + 1))
+        except ValueError:
+            logger.warning(f"Invalid weight for magnitude {order}, using {order + 1}")
+            weights[order] = order + 1
+    return weights
+
+
+def build_match_data(sample_df, control_df, sample_col_map, control_col_map, all_columns, included_columns,
+                     sample_values, control_values, matched, best_scores):
+    """Build the result rows (sorted by similarity) for matched sample/control pairs."""
+
+    sample_records = sample_df.to_dict('records')
+    control_records = control_df.to_dict('records')
+    match_data = []
+    for idx, sample_row in enumerate(sample_records):
+        j = matched[idx]
+        best_control_row = control_records[j] if j >= 0 else None
+
+        # ایجاد ردیف برای Sample، حتی اگر مچ نشود
+        match_row = {
+            "Sample ID": sample_row["SAMPLE ID"],
+            "Control ID": best_control_row["SAMPLE ID"] if best_control_row is not None else None,
+            "Similarity (%)": round(float(best_scores[idx]), 2) if best_control_row is not None else 0
+        }
+        for col in all_columns:
+            match_row[f"Sample_{col}"] = sample_row[sample_col_map[col]]
+            # اگر مچ نشده، مقادیر Control را خالی بگذار
+            if best_control_row is not None:
+                match_row[f"Control_{col}"] = best_control_row[control_col_map[col]]
+            else:
+                match_row[f"Control_{col}"] = None
+        for k, col in enumerate(included_columns):
+            match_row[f"{col}_Difference"] = None
+            if best_control_row is not None:
+                sample_val = sample_values[idx, k]
+                control_val = control_values[j, k]
+                if not np.isnan(sample_val) and not np.isnan(control_val) and (sample_val + control_val) != 0:
+                    d = abs(sample_val - control_val) / abs(sample_val + control_val) * 100
+                    match_row[f"{col}_Difference"] = round(float(d), 2)
+        match_data.append(match_row)
+
+    match_data.sort(key=lambda x: x["Similarity (%)"], reverse=True)
+    return match_data
+
+
 class CompareTab(QWidget):
     def __init__(self, app, parent=None):
         super().__init__(parent)
@@ -161,6 +190,16 @@ class CompareTab(QWidget):
         self.control_col_map = {}
         self.column_weights = {}
         self.sorted_columns = []
+        self.element_registry = ElementRegistry()
+        self.score_cache = None
+        self.sheet_cache = {}
+        self.results_dialog = None
+        self.results_model = None
+        self.results_avg_label = None
+        self.rescore_timer = QTimer(self)
+        self.rescore_timer.setSingleShot(True)
+        self.rescore_timer.setInterval(250)
+        self.rescore_timer.timeout.connect(self.rescore_from_cache)
         self.setup_ui()
 
     def setup_ui(self):
@@ -325,6 +364,27 @@ class CompareTab(QWidget):
         compare_button.clicked.connect(self.perform_comparison)
         compare_button.setFixedWidth(160)
         button_layout.addWidget(compare_button)
+
+        button_layout.addWidget(QLabel("Matching:"))
+        self.match_mode_combo = QComboBox()
+        self.match_mode_combo.addItems(["Greedy (file order)", "Global optimal"])
+        self.match_mode_combo.setFixedWidth(180)
+        button_layout.addWidget(self.match_mode_combo)
+
+        button_layout.addWidget(QLabel("Min Similarity (%):"))
+        self.min_similarity_entry = QLineEdit("0")
+        self.min_similarity_entry.setFixedWidth(80)
+        self.min_similarity_entry.textChanged.connect(lambda text, e=self.min_similarity_entry: self.validate_number(text, e))
+        button_layout.addWidget(self.min_similarity_entry)
+
+        self.prefilter_check = QCheckBox("Nearest-Neighbour Prefilter")
+        self.prefilter_check.setToolTip("Score only the k nearest controls per sample (for large control libraries)")
+        button_layout.addWidget(self.prefilter_check)
+        button_layout.addWidget(QLabel("k:"))
+        self.top_k_entry = QLineEdit("50")
+        self.top_k_entry.setFixedWidth(60)
+        self.top_k_entry.textChanged.connect(lambda text, e=self.top_k_entry: self.validate_number(text, e))
+        button_layout.addWidget(self.top_k_entry)
         button_layout.addStretch()
 
         main_layout.addWidget(file_frame)
@@ -391,18 +451,45 @@ class CompareTab(QWidget):
 
     def strip_wavelength(self, column_name):
         """Strip wavelength suffix and extra spaces from column name."""
-        cleaned = re.split(r'\s+\d+\.\d+', column_name)[0].strip()
-        return cleaned
-
-    def convert_limit_values(self, value):
-        """Convert '<X' values to their numeric limit."""
-        if isinstance(value, str) and value.startswith('<'):
-            try:
-                return float(value[1:])
-            except ValueError:
-                logger.warning(f"Cannot convert limit value: {value}")
-                return value
-        return value
+        return self.element_registry.stem_of(column_name)
+
+    def convert_limit_values(self, series):
+        """Convert '<X' detection-limit strings in a column to their numeric limit, vectorized."""
+        if series.dtype != object:
+            return series
+        # Sheets are read with header=None, so numeric columns are object dtype too and may hold no strings
+        is_limit = series.map(lambda v: isinstance(v, str) and v.startswith('<')).astype(bool)
+        if not is_limit.any():
+            return series
+        limits = pd.to_numeric(series[is_limit].str[1:].str.strip(), errors='coerce')
+        failed = limits.isna()
+        if failed.any():
+            logger.warning(f"Cannot convert limit values: {series[is_limit][failed].unique().tolist()}")
+        series = series.copy()
+        series.loc[limits.index[~failed]] = limits[~failed]
+        return series
+
+    def excel_headers(self, header_row):
+        """Column labels from a raw header row, named the way pandas.read_excel names them."""
+        headers = []
+        seen = {}
+        for i, value in enumerate(header_row):
+            label = f"Unnamed: {i}" if pd.isna(value) else value
+            if label in seen:
+                seen[label] += 1
+                label = f"{label}.{seen[label]}"
+            else:
+                seen[label] = 0
+            headers.append(label)
+        return headers
+
+    def read_sheet(self, sheet_name):
+        """Read a sheet once per (file, mtime, sheet) and reuse it for the tab's lifetime."""
+        key = (self.file_path, os.path.getmtime(self.file_path), sheet_name)
+        if key not in self.sheet_cache:
+            logger.debug(f"Reading sheet {sheet_name} from {self.file_path}")
+            self.sheet_cache[key] = pd.read_excel(self.file_path, sheet_name=sheet_name, header=None)
+        return self.sheet_cache[key]
 
     def update_sheets(self):
         """Load selected sheets, match columns, and create inputs."""
@@ -420,14 +507,14 @@ class CompareTab(QWidget):
             self.control_sheet = self.control_combo.currentText()
             logger.debug(f"Sample sheet: {self.sample_sheet}, Control sheet: {self.control_sheet}")
 
-            sample_df = pd.read_excel(self.file_path, sheet_name=self.sample_sheet, header=None)
-            control_df = pd.read_excel(self.file_path, sheet_name=self.control_sheet, header=None)
+            sample_raw = self.read_sheet(self.sample_sheet)
+            control_raw = self.read_sheet(self.control_sheet)
 
-            sample_df = sample_df.iloc[3:].reset_index(drop=True)
-            control_df = control_df.iloc[3:].reset_index(drop=True)
+            sample_df = sample_raw.iloc[3:].reset_index(drop=True)
+            control_df = control_raw.iloc[3:].reset_index(drop=True)
 
-            sample_headers = pd.read_excel(self.file_path, sheet_name=self.sample_sheet, nrows=1).columns.tolist()
-            control_headers = pd.read_excel(self.file_path, sheet_name=self.control_sheet, nrows=1).columns.tolist()
+            sample_headers = self.excel_headers(sample_raw.iloc[0].tolist()) if len(sample_raw) else []
+            control_headers = self.excel_headers(control_raw.iloc[0].tolist()) if len(control_raw) else []
 
             logger.debug(f"Sample headers: {sample_headers}")
             logger.debug(f"Control headers: {control_headers}")
@@ -469,8 +556,8 @@ class CompareTab(QWidget):
             for col in common_columns:
                 sample_col = self.sample_col_map[col]
                 control_col = self.control_col_map[col]
-                sample_df[sample_col] = sample_df[sample_col].apply(self.convert_limit_values)
-                control_df[control_col] = control_df[control_col].apply(self.convert_limit_values)
+                sample_df[sample_col] = self.convert_limit_values(sample_df[sample_col])
+                control_df[control_col] = self.convert_limit_values(control_df[control_col])
                 numeric_sample = pd.to_numeric(sample_df[sample_col], errors='coerce')
                 numeric_control = pd.to_numeric(control_df[control_col], errors='coerce')
 
@@ -510,6 +597,7 @@ class CompareTab(QWidget):
 
             self.sample_df = sample_df
             self.control_df = control_df
+            self.score_cache = None
             self.headers = ["SAMPLE ID"] + self.non_numeric_columns + self.sorted_columns
 
             self.create_group_inputs()
@@ -549,6 +637,7 @@ class CompareTab(QWidget):
             weight_entry.setText(str(order + 1))
             weight_entry.setFixedWidth(100)
             weight_entry.textChanged.connect(lambda text, e=weight_entry: self.validate_number(text, e))
+            weight_entry.textChanged.connect(self.schedule_rescore)
             weight_layout.addWidget(weight_label)
             weight_layout.addWidget(weight_entry)
             weight_layout.addStretch()
@@ -593,9 +682,22 @@ class CompareTab(QWidget):
         self.progress_dialog.setAutoClose(True)
         self.progress_dialog.canceled.connect(self.cancel_comparison)
 
+        try:
+            min_similarity = float(self.min_similarity_entry.text() or 0)
+        except ValueError:
+            min_similarity = 0.0
+        match_mode = "optimal" if self.match_mode_combo.currentText() == "Global optimal" else "greedy"
+        top_k = None
+        if self.prefilter_check.isChecked():
+            try:
+                top_k = max(1, int(float(self.top_k_entry.text() or 50)))
+            except ValueError:
+                top_k = 50
+
         self.thread = ComparisonThread(
             self.sample_df, self.control_df, self.sample_col_map, self.control_col_map,
-            self.sorted_columns, self.non_numeric_columns, self.group_weights, self.magnitude_groups
+            self.sorted_columns, self.non_numeric_columns, self.group_weights, self.magnitude_groups,
+            match_mode=match_mode, min_similarity=min_similarity, top_k=top_k
         )
         self.thread.progress.connect(self.progress_dialog.setValue)
         self.thread.finished.connect(self.on_comparison_finished)
@@ -613,11 +715,64 @@ class CompareTab(QWidget):
     def on_comparison_finished(self, match_data, all_columns):
         """Handle completion of comparison thread."""
         self.match_data = match_data
+        self.score_cache = self.thread.score_cache
         self.progress_dialog.close()
         self.show_results_dialog(self.match_data, all_columns, self.sorted_columns)
-        self.status_label.setText("Comparison completed")
+        summary = getattr(self.thread, 'summary', {})
+        status = "Comparison completed"
+        if summary.get("mode") == "optimal":
+            gain = summary["total_similarity"] - summary["greedy_total"]
+            status += (f" (global optimal): {summary['matched']}/{len(match_data)} matched, "
+                       f"total similarity {summary['total_similarity']:.2f} vs greedy {summary['greedy_total']:.2f} ({gain:+.2f})")
+        if summary.get("recall") is not None:
+            status += f" | top-{summary['top_k']} prefilter recall: {summary['recall'] * 100:.1f}%"
+        self.status_label.setText(status)
         self.status_label.setStyleSheet("color: #2e7d32; font: 13px 'Segoe UI'; background-color: #E8F5E9; padding: 10px; border-radius: 5px; border: 1px solid #A5D6A7;")
 
+    def schedule_rescore(self, *args):
+        """Debounce weight edits and re-score from the cached partial sums."""
+        if self.score_cache is not None:
+            self.rescore_timer.start()
+
+    def rescore_from_cache(self):
+        """Re-weight cached per-group partial sums and re-match without re-running the comparison."""
+        cache = self.score_cache
+        if cache is None or self.sample_df is None or self.control_df is None:
+            return
+        if not cache["reweightable"]:
+            self.status_label.setText("Weights changed: score cache too large for instant re-weighting, run Compare again")
+            self.status_label.setStyleSheet("color: #ff9800; font: 13px 'Segoe UI'; background-color: #FFF3E0; padding: 10px; border-radius: 5px; border: 1px solid #FFE082;")
+            return
+        try:
+            start = time.perf_counter()
+            weights = read_group_weights(self.group_weights)
+            group_weight_values = [weights.get(order, order + 1) for order in cache["group_orders"]]
+            sim = weighted_similarity(cache["partials"], group_weight_values, cache["group_sizes"])
+            try:
+                min_similarity = float(self.min_similarity_entry.text() or 0)
+            except ValueError:
+                min_similarity = 0.0
+            match_mode = "optimal" if self.match_mode_combo.currentText() == "Global optimal" else "greedy"
+            matched, best_scores, summary = run_matching(sim, cache["control_keys"], match_mode, min_similarity, cache["candidates"])
+            self.match_data = build_match_data(
+                self.sample_df, self.control_df, self.sample_col_map, self.control_col_map,
+                cache["all_columns"], self.sorted_columns, cache["sample_values"], cache["control_values"],
+                matched, best_scores
+            )
+            if self.results_dialog is not None and self.results_dialog.isVisible():
+                self.populate_results_model(self.match_data, cache["all_columns"], self.sorted_columns)
+            elapsed = (time.perf_counter() - start) * 1000
+            status = (f"Re-scored with updated weights in {elapsed:.0f} ms: {summary['matched']}/{len(self.match_data)} matched, "
+                      f"total similarity {summary['total_similarity']:.2f}")
+            if cache["candidates"] is not None:
+                status += f" | top-{cache['top_k']} candidates kept from the original weights, run Compare again to re-select them"
+            self.status_label.setText(status)
+            self.status_label.setStyleSheet("color: #2e7d32; font: 13px 'Segoe UI'; background-color: #E8F5E9; padding: 10px; border-radius: 5px; border: 1px solid #A5D6A7;")
+        except Exception as e:
+            logger.error(f"Error re-scoring comparison: {str(e)}")
+            self.status_label.setText(f"Error: {str(e)}")
+            self.status_label.setStyleSheet("color: #d32f2f; font: 13px 'Segoe UI'; background-color: #FFEBEE; padding: 10px; border-radius: 5px; border: 1px solid #EF9A9A;")
+
     def on_comparison_error(self, error_msg):
         """Handle errors from comparison thread."""
         self.progress_dialog.close()
@@ -668,20 +823,47 @@ class CompareTab(QWidget):
         export_button = QPushButton("Export")
         export_button.setObjectName("exportButton")
         export_button.setFixedWidth(120)
-        export_button.clicked.connect(lambda: self.export_report(match_data, all_columns, numeric_columns))
+        export_button.clicked.connect(lambda: self.export_report(self.match_data, all_columns, numeric_columns))
         button_layout.addWidget(export_button)
 
         correct_button = QPushButton("Correct")
         correct_button.setObjectName("correctButton")
         correct_button.setFixedWidth(120)
-        correct_button.clicked.connect(lambda: self.correct_values(dialog, match_data, all_columns, numeric_columns))
+        correct_button.clicked.connect(lambda: self.correct_values(dialog, self.match_data, all_columns, numeric_columns))
         button_layout.addWidget(correct_button)
         button_layout.addStretch()
         layout.addWidget(button_frame)
 
+        self.results_model = QStandardItemModel()
+        self.results_avg_label = QLabel()
+        self.results_avg_label.setStyleSheet("font: bold 14px 'Segoe UI'; color: #D32F2F;")
+        layout.addWidget(self.results_avg_label)
+        self.populate_results_model(match_data, all_columns, numeric_columns)
+        model = self.results_model
+
+        table = QTableView()
+        table.setModel(model)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.setMinimumWidth(800)
+        table.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        table.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        table.verticalHeader().setVisible(False)
+        table.setSortingEnabled(False)
+
+        layout.addWidget(table)
+        # Non-modal so the magnitude-group weights can be tuned while the results update
+        if self.results_dialog is not None:
+            self.results_dialog.close()
+        self.results_dialog = dialog
+        dialog.show()
+
+    def populate_results_model(self, match_data, all_columns, numeric_columns):
+        """Fill the results table model and average-error label from match_data."""
+        model = self.results_model
         # فقط ستون‌های اصلی و بدون ستون‌های Difference
         columns = ["Type", "ID", "Similarity (%)"] + [f"{col}" for col in all_columns]
-        model = QStandardItemModel()
+        model.clear()
         model.setHorizontalHeaderLabels(columns)
 
         row_idx = 0
@@ -752,22 +934,9 @@ class CompareTab(QWidget):
             overall_avg = sum(total_errors) / len(total_errors)
         else:
             overall_avg = 0
-        avg_label = QLabel(f"Overall Average Error: {overall_avg:.2f}")
-        avg_label.setStyleSheet("font: bold 14px 'Segoe UI'; color: #D32F2F;")
-        layout.addWidget(avg_label)
+        self.results_avg_label.setText(f"Overall Average Error: {overall_avg:.2f}")
 
-        table = QTableView()
-        table.setModel(model)
-        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
-        table.horizontalHeader().setStretchLastSection(True)
-        table.setMinimumWidth(800)
-        table.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        table.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        table.verticalHeader().setVisible(False)
-        table.setSortingEnabled(False)
 
-        layout.addWidget(table)
-        dialog.exec()
     def correct_values(self, dialog, match_data, all_columns, numeric_columns):
         """Correct Sample values where error > 5% and update table."""
         logger.debug("Correcting values with error > 5%")
@@ -817,119 +986,98 @@ class CompareTab(QWidget):
                 self.status_label.setStyleSheet("color: #6c757d; font: 13px 'Segoe UI'; background-color: #E3F2FD; padding: 10px; border-radius: 5px; border: 1px solid #BBDEFB;")
                 return
 
-            with Workbook(output_path) as workbook:
-                worksheet = workbook.add_worksheet("Report")
-
-                header_format = workbook.add_format({'bold': True, 'bg_color': '#D1E7DD', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
-                sample_format = workbook.add_format({'bg_color': '#E8F5E9', 'border': 1, 'align': 'center'})
-                control_format = workbook.add_format({'bg_color': '#E3F2FD', 'border': 1, 'align': 'center'})
-                d_format = workbook.add_format({'bg_color': '#FFEBEE', 'border': 1, 'align': 'center'})
-                blank_format = workbook.add_format({'bg_color': '#FFFFFF', 'border': 1, 'align': 'center'})
-                sum_format = workbook.add_format({'bold': True, 'bg_color': '#F5F6F5', 'border': 1, 'align': 'center'})
-                number_format = workbook.add_format({'num_format': '0.00', 'bg_color': '#FFEBEE', 'border': 1, 'align': 'center'})
-
-                headers = ["Type", "ID"] + all_columns
-                for col_idx, header in enumerate(headers):
-                    worksheet.write(0, col_idx, header, header_format)
-
-                row = 1
-                column_sums = {col: 0 for col in numeric_columns}
-                total_errors = []
-
-                for match in match_data:
-                    worksheet.write(row, 0, "Control", sample_format)
-                    worksheet.write(row, 1, match["Sample ID"], sample_format)
-                    col_idx = 2
-                    for col in self.non_numeric_columns + numeric_columns:
-                        val = match.get(f"Sample_{col}", "")
-                        format_to_use = sample_format
-                        if isinstance(val, (int, float)) and not pd.isna(val):
-                            worksheet.write(row, col_idx, round(val, 2), format_to_use)
-                        else:
-                            worksheet.write(row, col_idx, str(val) if not pd.isna(val) else "", format_to_use)
-                        col_idx += 1
-                    row += 1
-
-                    worksheet.write(row, 0, "Sample", control_format)
-                    worksheet.write(row, 1, match["Control ID"], control_format)
-                    col_idx = 2
-                    for col in self.non_numeric_columns + numeric_columns:
-                        val = match.get(f"Control_{col}", "")
-                        format_to_use = control_format
-                        if isinstance(val, (int, float)) and not pd.isna(val):
-                            worksheet.write(row, col_idx, round(val, 2), format_to_use)
-                        else:
-                            worksheet.write(row, col_idx, str(val) if not pd.isna(val) else "", format_to_use)
-                        col_idx += 1
-                    row += 1
-
-                    worksheet.write(row, 0, "d", d_format)
-                    worksheet.write(row, 1, "", d_format)
-                    col_idx = 2
-                    for col in self.non_numeric_columns:
-                        worksheet.write(row, col_idx, "", d_format)
-                        col_idx += 1
-                    for col in numeric_columns:
-                        d = match.get(f"{col}_Difference")
-                        if d is not None:
-                            worksheet.write(row, col_idx, round(d, 2), number_format)
-                            column_sums[col] += d
-                            total_errors.append(d)
-                        else:
-                            worksheet.write(row, col_idx, "", d_format)
-                        col_idx += 1
-                    row += 1
-
-                    for col_idx in range(len(headers)):
-                        worksheet.write(row, col_idx, "", blank_format)
-                    row += 1
-
-                worksheet.write(row, 0, "Sum d", sum_format)
-                worksheet.write(row, 1, "", sum_format)
-                col_idx = 2
-                for col in self.non_numeric_columns:
-                    worksheet.write(row, col_idx, "", sum_format)
-                    col_idx += 1
-                for col in numeric_columns:
-                    sum_d = column_sums[col]
-                    worksheet.write(row, col_idx, round(sum_d, 2), sum_format)
-                    col_idx += 1
-                row += 1
-
-                if total_errors:
-                    overall_avg = sum(total_errors) / len(total_errors)
-                else:
-                    overall_avg = 0
-                worksheet.write(row, 0, f"Overall Average Error: {overall_avg:.2f}", sum_format)
-
-            self.status_label.setText(f"Report exported to {output_path.split('/')[-1]}")
-            self.status_label.setStyleSheet("color: #2e7d32; font: 13px 'Segoe UI'; background-color: #E8F5E9; padding: 10px; border-radius: 5px; border: 1px solid #A5D6A7;")
-            QMessageBox.information(self, "Success", f"Report exported to {output_path}")
-
-            # Ask user if they want to open the file
-            reply = QMessageBox.question(
-                self,
-                "Open File",
-                f"Do you want to open the exported file?\n{output_path}",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            sheet = self.report_sheet(match_data, all_columns, numeric_columns)
+            self.status_label.setText("Exporting report...")
+            self.status_label.setStyleSheet("color: #ff9800; font: 13px 'Segoe UI'; background-color: #FFF3E0; padding: 10px; border-radius: 5px; border: 1px solid #FFE082;")
+            self.export_thread = start_excel_export(
+                self, output_path, [sheet], REPORT_FORMATS,
+                self.on_report_exported, self.on_report_export_error, title="Exporting Report"
             )
 
-            if reply == QMessageBox.StandardButton.Yes:
-                try:
-                    if platform.system() == "Windows":
-                        os.startfile(output_path)  # برای ویندوز
-                    else:
-                        # برای لینوکس و مک
-                        subprocess.run(["open" if platform.system() == "Darwin" else "xdg-open", output_path])
-                    logger.debug(f"Opened file: {output_path}")
-                except Exception as e:
-                    logger.error(f"Error opening file: {str(e)}")
-                    self.status_label.setText(f"Error opening file: {str(e)}")
-                    self.status_label.setStyleSheet("color: #d32f2f; font: 13px 'Segoe UI'; background-color: #FFEBEE; padding: 10px; border-radius: 5px; border: 1px solid #EF9A9A;")
-                    QMessageBox.critical(self, "Error", f"Failed to open file:\n{str(e)}")
-
         except Exception as e:
-            logger.error(f"Error exporting report: {str(e)}")
-            self.status_label.setText(f"Error: {str(e)}")
-            self.status_label.setStyleSheet("color: #d32f2f; font: 13px 'Segoe UI'; background-color: #FFEBEE; padding: 10px; border-radius: 5px; border: 1px solid #EF9A9A;")
-            QMessageBox.critical(self, "Error", f"Failed to export report:\n{str(e)}")
\ No newline at end of file
+            self.on_report_export_error(str(e))
+
+    def report_sheet(self, match_data, all_columns, numeric_columns):
+        """Build the comparison report as one frame: Control, Sample, d and blank rows per match, then the sums."""
+        columns = self.non_numeric_columns + numeric_columns
+        headers = ["Type", "ID"] + all_columns
+        md = pd.DataFrame(match_data)
+        n = len(md)
+
+        def values(prefix):
+            block = {}
+            for i, col in enumerate(columns):
+                key = f"{prefix}{col}"
+                series = md[key] if key in md.columns else pd.Series([None] * n, dtype=object)
+                if pd.api.types.is_numeric_dtype(series):
+                    block[i] = series.round(2)
+                else:
+                    block[i] = series.where(series.notna(), "").astype(str)
+            return pd.DataFrame(block, index=md.index)
+
+        def with_labels(block, type_label, ids):
+            block.insert(0, "ID", ids)
+            block.insert(0, "Type", type_label)
+            block.columns = range(len(block.columns))
+            return block
+
+        control_rows = with_labels(values("Sample_"), "Control", md["Sample ID"].to_numpy())
+        sample_rows = with_labels(values("Control_"), "Sample", md["Control ID"].to_numpy())
+        differences = pd.DataFrame({
+            col: pd.to_numeric(md[f"{col}_Difference"], errors='coerce') if f"{col}_Difference" in md.columns else pd.Series(np.nan, index=md.index)
+            for col in numeric_columns
+        }, index=md.index)
+        d_block = pd.concat([pd.DataFrame({col: [""] * n for col in self.non_numeric_columns}, index=md.index),
+                             differences.round(2)], axis=1)
+        d_rows = with_labels(d_block, "d", "")
+        blank_rows = pd.DataFrame(None, index=md.index, columns=range(len(headers)), dtype=object)
+
+        # Interleave the four blocks row by row through one position array
+        stacked = pd.concat([control_rows, sample_rows, d_rows, blank_rows], ignore_index=True)
+        order = np.arange(4 * n).reshape(4, n).T.ravel()
+        report = stacked.iloc[order].reset_index(drop=True)
+
+        column_sums = differences.sum().round(2)
+        errors = differences.to_numpy().ravel()
+        errors = errors[~np.isnan(errors)]
+        overall_avg = errors.mean() if len(errors) else 0
+        sum_row = ["Sum d", ""] + [""] * len(self.non_numeric_columns) + column_sums.tolist()
+        avg_row = [f"Overall Average Error: {overall_avg:.2f}"] + [None] * (len(headers) - 1)
+        report = pd.concat([report, pd.DataFrame([sum_row, avg_row], columns=report.columns)], ignore_index=True)
+        report.columns = headers
+
+        row_styles = ['sample', 'control', 'd', 'blank'] * n + ['sum', 'sum']
+        return SheetSpec("Report", report, row_styles=row_styles)
+
+    def on_report_exported(self, output_path):
+        self.status_label.setText(f"Report exported to {output_path.split('/')[-1]}")
+        self.status_label.setStyleSheet("color: #2e7d32; font: 13px 'Segoe UI'; background-color: #E8F5E9; padding: 10px; border-radius: 5px; border: 1px solid #A5D6A7;")
+        QMessageBox.information(self, "Success", f"Report exported to {output_path}")
+
+        # Ask user if they want to open the file
+        reply = QMessageBox.question(
+            self,
+            "Open File",
+            f"Do you want to open the exported file?\n{output_path}",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+
+        if reply == QMessageBox.StandardButton.Yes:
+            try:
+                if platform.system() == "Windows":
+                    os.startfile(output_path)  # برای ویندوز
+                else:
+                    # برای لینوکس و مک
+                    subprocess.run(["open" if platform.system() == "Darwin" else "xdg-open", output_path])
+                logger.debug(f"Opened file: {output_path}")
+            except Exception as e:
+                logger.error(f"Error opening file: {str(e)}")
+                self.status_label.setText(f"Error opening file: {str(e)}")
+                self.status_label.setStyleSheet("color: #d32f2f; font: 13px 'Segoe UI'; background-color: #FFEBEE; padding: 10px; border-radius: 5px; border: 1px solid #EF9A9A;")
+                QMessageBox.critical(self, "Error", f"Failed to open file:\n{str(e)}")
+
+    def on_report_export_error(self, message):
+        logger.error(f"Error exporting report: {message}")
+        self.status_label.setText(f"Error: {message}")
+        self.status_label.setStyleSheet("color: #d32f2f; font: 13px 'Segoe UI'; background-color: #FFEBEE; padding: 10px; border-radius: 5px; border: 1px solid #EF9A9A;")
+        QMessageBox.critical(self, "Error", f"Failed to export report:\n{message}")
\ No newline at end of file
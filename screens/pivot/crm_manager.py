@@ -1,7 +1,7 @@
 import re
 import pandas as pd
 from PyQt6.QtWidgets import QCheckBox, QMessageBox, QDialog, QVBoxLayout, QRadioButton, QPushButton, QLabel
-from .oxide_factors import oxide_factors
+from utils.element_registry import OXIDE_TO_ELEMENT
 
 class CRMManager:
     """Manages CRM-related operations for the PivotTab."""
@@ -54,25 +54,13 @@ class CRMManager:
             print(f"pivot_data columns: {list(self.pivot_tab.pivot_data.columns)}")
 
             # Create element-to-wavelength mapping
+            registry = self.pivot_tab.element_registry
             element_to_columns = {}
-            if self.pivot_tab.original_df is not None and 'Element' in self.pivot_tab.original_df.columns:
-                # Use original_df to map elements to wavelength columns
-                for col in self.pivot_tab.pivot_data.columns:
-                    if col == 'Solution Label':
-                        continue
-                    element = col.split()[0].strip()  # e.g., 'Cu 324.754' -> 'Cu'
-                    if element not in element_to_columns:
-                        element_to_columns[element] = []
-                    element_to_columns[element].append(col)
-            else:
-                # Fallback: Parse pivot_data column names
-                for col in self.pivot_tab.pivot_data.columns:
-                    if col == 'Solution Label':
-                        continue
-                    element = col.split()[0].strip()  # e.g., 'Cu 324.754' -> 'Cu'
-                    if element not in element_to_columns:
-                        element_to_columns[element] = []
-                    element_to_columns[element].append(col)
+            for col in self.pivot_tab.pivot_data.columns:
+                if col == 'Solution Label':
+                    continue
+                element = registry.element_of(col)  # e.g., 'Cu 324.754' -> 'Cu', 'Al2O3' -> 'Al'
+                element_to_columns.setdefault(element, []).append(col)
             print(f"Element to columns mapping: {element_to_columns}")
 
             dec = int(self.pivot_tab.decimal_places.currentText())
@@ -121,10 +109,7 @@ class CRMManager:
                                 # Extract element symbol (e.g., 'Cu' or 'Fe')
                                 symbol = col.split('_')[0].strip()
                                 # If column is an oxide, map to element
-                                for el, (oxide_formula, _) in oxide_factors.items():
-                                    if col == oxide_formula:
-                                        symbol = el
-                                        break
+                                symbol = OXIDE_TO_ELEMENT.get(col, symbol)
                                 crm_options[crm_id].append((symbol, float(value)))
                             except (ValueError, TypeError):
                                 self.logger.warning(f"Invalid value for {col}: {value}")
@@ -175,11 +160,10 @@ class CRMManager:
                         if self.pivot_tab.use_oxide_var.isChecked():
                             # Apply oxide factor if column is an oxide formula
                             for col in columns:
-                                for el, (oxide_formula, factor) in oxide_factors.items():
-                                    if col == oxide_formula and element == el:
-                                        crm_values[col] = value * factor
-                                        print(f"Matched oxide {col} to {element}, value: {crm_values[col]}")
-                                        break
+                                col_info = registry.info(col)
+                                if col_info.is_oxide:
+                                    crm_values[col] = value * col_info.oxide_factor
+                                    print(f"Matched oxide {col} to {element}, value: {crm_values[col]}")
                                 else:
                                     crm_values[col] = value
                                     print(f"Matched {col} to {element}, value: {value}")
@@ -215,6 +199,14 @@ class CRMManager:
             self.logger.error(f"Failed to check RM: {str(e)}")
             QMessageBox.warning(self.pivot_tab, "Error", f"Failed to check RM: {str(e)}")
 
+    @staticmethod
+    def line_params(col_info, element_params, oxide_params, use_oxide):
+        """Act Vol/Act Wgt/Coeff 1/Coeff 2 of the line behind a pivot column, or the neutral defaults."""
+        params = element_params.get(col_info.base)
+        if params is None and use_oxide:
+            params = oxide_params.get(col_info.element)
+        return params or {'Act Vol': 1.0, 'Act Wgt': 1.0, 'Coeff 1': 0.0, 'Coeff 2': 1.0}
+
     def _build_crm_row_lists_for_columns(self, columns):
         """Build CRM row lists for display, including differences and tags."""
         crm_display = {}
@@ -231,6 +223,8 @@ class CRMManager:
         has_coeff_1 = 'Coeff 1' in self.pivot_tab.original_df.columns if self.pivot_tab.original_df is not None else False
         has_coeff_2 = 'Coeff 2' in self.pivot_tab.original_df.columns if self.pivot_tab.original_df is not None else False
         print(f"Input Inline CRM Rows: {self.pivot_tab._inline_crm_rows}")
+        registry = self.pivot_tab.element_registry
+        use_oxide = self.pivot_tab.use_oxide_var.isChecked()
 
         for sol_label, list_of_dicts in self.pivot_tab._inline_crm_rows.items():
             crm_display[sol_label] = []
@@ -243,20 +237,28 @@ class CRMManager:
                 continue
             pivot_values = pivot_row.iloc[0].to_dict()
 
+            # Keyed by line ('Cu 324.754'); oxide columns ('CuO') only know their element
             element_params = {}
+            oxide_params = {}
             if self.pivot_tab.original_df is not None:
                 sample_rows = self.pivot_tab.original_df[
                     (self.pivot_tab.original_df['Solution Label'].str.strip().str.lower() == sol_label.strip().lower()) &
                     (self.pivot_tab.original_df['Type'].isin(['Sample', 'Samp']))
                 ]
-                for _, row in sample_rows.iterrows():
-                    element = row['Element'].split('_')[0].strip()
-                    element_params[element] = {
-                        'Act Vol': row['Act Vol'] if has_act_vol else 1.0,
-                        'Act Wgt': row['Act Wgt'] if has_act_wg else 1.0,
-                        'Coeff 1': row['Coeff 1'] if has_coeff_1 else 0.0,
-                        'Coeff 2': row['Coeff 2'] if has_coeff_2 else 1.0
+                n = len(sample_rows)
+                act_vols = sample_rows['Act Vol'].tolist() if has_act_vol else [1.0] * n
+                act_wgts = sample_rows['Act Wgt'].tolist() if has_act_wg else [1.0] * n
+                coeff_1s = sample_rows['Coeff 1'].tolist() if has_coeff_1 else [0.0] * n
+                coeff_2s = sample_rows['Coeff 2'].tolist() if has_coeff_2 else [1.0] * n
+                for name, act_vol, act_wg, coeff_1, coeff_2 in zip(sample_rows['Element'], act_vols, act_wgts, coeff_1s, coeff_2s):
+                    params = {
+                        'Act Vol': act_vol,
+                        'Act Wgt': act_wg,
+                        'Coeff 1': coeff_1,
+                        'Coeff 2': coeff_2
                     }
+                    element_params[registry.base_of(name)] = params
+                    oxide_params.setdefault(registry.element_of(name), params)
                 print(f"Element Params for {sol_label}: {element_params}")
 
             for d in list_of_dicts:
@@ -270,31 +272,22 @@ class CRMManager:
                             crm_row_list.append("")
                         else:
                             try:
-                                element_symbol = col.split()[0].strip()
-                                if self.pivot_tab.use_oxide_var.isChecked():
-                                    for el, (oxide_formula, _) in oxide_factors.items():
-                                        if col == oxide_formula:
-                                            element_symbol = el
-                                            break
-                                params = element_params.get(element_symbol, {
-                                    'Act Vol': 1.0, 'Act Wgt': 1.0, 'Coeff 1': 0.0, 'Coeff 2': 1.0
-                                })
+                                col_info = registry.info(col)
+                                params = self.line_params(col_info, element_params, oxide_params, use_oxide)
                                 act_vol = params['Act Vol']
                                 act_wg = params['Act Wgt']
                                 coeff_1 = params['Coeff 1']
                                 coeff_2 = params['Coeff 2']
                                 if self.pivot_tab.use_int_var.isChecked() and act_vol != 0 and act_wg != 0:
                                     int_value = coeff_2 * (float(val) / (act_vol / act_wg)) + coeff_1
-                                    if element_symbol in oxide_factors and self.pivot_tab.use_oxide_var.isChecked():
-                                        _, factor = oxide_factors[element_symbol]
-                                        oxide_int_value = int_value * factor
+                                    if col_info.oxide_formula is not None and use_oxide:
+                                        oxide_int_value = int_value * col_info.oxide_factor
                                         crm_row_list.append(f"{oxide_int_value:.{dec}f}")
                                     else:
                                         crm_row_list.append(f"{int_value:.{dec}f}")
                                 else:
-                                    if element_symbol in oxide_factors and self.pivot_tab.use_oxide_var.isChecked():
-                                        _, factor = oxide_factors[element_symbol]
-                                        oxide_val = float(val) * factor
+                                    if col_info.oxide_formula is not None and use_oxide:
+                                        oxide_val = float(val) * col_info.oxide_factor
                                         crm_row_list.append(f"{oxide_val:.{dec}f}")
                                     else:
                                         crm_row_list.append(f"{float(val):.{dec}f}")
@@ -314,15 +307,8 @@ class CRMManager:
                         crm_val = d.get(col, None)
                         if pivot_val is not None and crm_val is not None:
                             try:
-                                element_symbol = col.split()[0].strip()
-                                if self.pivot_tab.use_oxide_var.isChecked():
-                                    for el, (oxide_formula, _) in oxide_factors.items():
-                                        if col == oxide_formula:
-                                            element_symbol = el
-                                            break
-                                params = element_params.get(element_symbol, {
-                                    'Act Vol': 1.0, 'Act Wgt': 1.0, 'Coeff 1': 0.0, 'Coeff 2': 1.0
-                                })
+                                col_info = registry.info(col)
+                                params = self.line_params(col_info, element_params, oxide_params, use_oxide)
                                 act_vol = params['Act Vol']
                                 act_wg = params['Act Wgt']
                                 coeff_1 = params['Coeff 1']
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+
+def line_agreement(values, elements):
+    """Relative spread and max/min ratio across the wavelength columns of each multi-line element.
+
+    values is a (samples x columns) float matrix, elements the element of each column.
+    Returns (element names, spread %, ratio), the matrices being (samples x multi-line elements).
+    A sample needs at least two numeric lines of an element for a result; NaN otherwise.
+    """
+    codes, names = pd.factorize(pd.Series(elements, dtype=object))
+    counts = np.bincount(codes[codes >= 0], minlength=len(names))
+    keep = np.flatnonzero((codes >= 0) & (counts[np.maximum(codes, 0)] >= 2))
+    if len(keep) == 0:
+        empty = np.empty((values.shape[0], 0))
+        return [], empty, empty
+
+    keep = keep[np.argsort(codes[keep], kind='stable')]
+    grouped = values[:, keep]
+    group_codes = codes[keep]
+    starts = np.flatnonzero(np.r_[True, group_codes[1:] != group_codes[:-1]])
+
+    high = np.fmax.reduceat(grouped, starts, axis=1)
+    low = np.fmin.reduceat(grouped, starts, axis=1)
+    present = ~np.isnan(grouped)
+    n = np.add.reduceat(present.astype(np.float64), starts, axis=1)
+    total = np.add.reduceat(np.where(present, grouped, 0.0), starts, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        spread = np.where((n >= 2) & (mean != 0), (high - low) / np.abs(mean) * 100, np.nan)
+        ratio = np.where((n >= 2) & (low > 0), high / low, np.nan)
+    return list(names[group_codes[starts]]), spread, ratio
+
+
+class LineAgreementModel(QAbstractTableModel):
+    """Heatmap of inter-wavelength spread: one row per sample, one column per multi-line element."""
+    def __init__(self, labels=None, elements=None, spread=None, ratio=None, tolerance=10.0):
+        super().__init__()
+        self._labels = list(labels) if labels is not None else []
+        self._elements = list(elements) if elements is not None else []
+        self._spread = spread if spread is not None else np.empty((0, 0))
+        self._ratio = ratio if ratio is not None else np.empty((0, 0))
+        self.tolerance = tolerance
+
+    def rowCount(self, parent=QModelIndex()):
+        return len(self._labels)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self._elements)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        spread = self._spread[index.row(), index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return "" if np.isnan(spread) else f"{spread:.1f}"
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if np.isnan(spread):
+                return None
+            if spread > self.tolerance:
+                return QColor("#EF9A9A")
+            if spread > self.tolerance / 2:
+                return QColor("#FFF59D")
+            return QColor("#C8E6C9")
+        if role == Qt.ItemDataRole.ToolTipRole and not np.isnan(spread):
+            ratio = self._ratio[index.row(), index.column()]
+            ratio_text = "" if np.isnan(ratio) else f", max/min {ratio:.3f}"
+            return f"{self._labels[index.row()]} - {self._elements[index.column()]}: spread {spread:.2f}%{ratio_text}"
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._elements[section] if section < len(self._elements) else None
+        return str(self._labels[section]) if section < len(self._labels) else None
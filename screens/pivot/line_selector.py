@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+from utils.calibration import CalibrationIndex
+
+# Relative weight of each quality component in a line's score
+SCORE_WEIGHTS = {'crm': 0.4, 'r2': 0.25, 'blank': 0.15, 'rsd': 0.2}
+# Scales turning each metric into a 0..1 goodness
+CRM_ERROR_SCALE = 0.1   # median |recovery - 1| giving exp(-1)
+R2_FLOOR = 0.98         # R² at or below this scores 0, 1.0 scores 1
+BLANK_SCALE = 10.0      # blank at 10% of the sample level scores 0.5
+RSD_SCALE = 5.0         # replicate RSD of 5% scores 0.5
+
+
+def combine_scores(crm_error, r2, blank_ratio, rsd, weights=SCORE_WEIGHTS):
+    """Weighted mean of the per-line goodness values; missing components are left out of the mean."""
+    goodness = np.column_stack([
+        np.exp(-crm_error / CRM_ERROR_SCALE),
+        np.clip((r2 - R2_FLOOR) / (1.0 - R2_FLOOR), 0.0, 1.0),
+        1.0 / (1.0 + BLANK_SCALE * blank_ratio),
+        1.0 / (1.0 + rsd / RSD_SCALE),
+    ])
+    w = np.array([weights['crm'], weights['r2'], weights['blank'], weights['rsd']], dtype=np.float64)
+    available = ~np.isnan(goodness)
+    total = (available * w).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total > 0, np.where(available, goodness, 0.0) @ w / total, np.nan)
+
+
+class LineSelector:
+    """Scores every wavelength column of the pivot and picks the best line per element."""
+    def __init__(self, pivot_tab):
+        self.pivot_tab = pivot_tab
+        self.logger = pivot_tab.logger
+        self._scores = None
+        self._key = None
+
+    def invalidate(self):
+        self._scores = None
+        self._key = None
+
+    def scores(self):
+        """Per-column quality table (Element, CRM Error, R2, Blank Ratio, RSD (%), Score, Best), cached."""
+        pivot = self.pivot_tab.pivot_data
+        if pivot is None or pivot.empty:
+            return pd.DataFrame()
+        key = (id(pivot), pivot.shape, tuple(self.pivot_tab._inline_crm_rows.keys()),
+               self.pivot_tab.use_int_var.isChecked(), self.pivot_tab.replicate_var.isChecked())
+        if self._scores is None or key != self._key:
+            self._scores = self._compute(pivot)
+            self._key = key
+        return self._scores
+
+    def best_columns(self):
+        scores = self.scores()
+        if scores.empty:
+            return []
+        return scores.index[scores['Best']].tolist()
+
+    def _compute(self, pivot):
+        registry = self.pivot_tab.element_registry
+        columns = [col for col in pivot.columns if col != 'Solution Label']
+        values = pivot[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        labels = pivot['Solution Label'].to_numpy(dtype=object)
+
+        crm_error = self._crm_error(columns, values, labels)
+        r2 = self._calibration_r2(columns)
+        blank_ratio = self._blank_ratio(columns, values)
+        rsd = self._replicate_rsd(values, labels)
+
+        scores = pd.DataFrame({
+            'Element': [registry.element_of(col) for col in columns],
+            'CRM Error': crm_error,
+            'R2': r2,
+            'Blank Ratio': blank_ratio,
+            'RSD (%)': rsd,
+        }, index=columns)
+        scores['Score'] = combine_scores(crm_error, r2, blank_ratio, rsd)
+        ranked = scores['Score'].fillna(-np.inf)
+        best = ranked.groupby(scores['Element'], sort=False).idxmax()
+        scores['Best'] = scores.index.isin(best.to_numpy())
+        self.logger.debug(f"Scored {len(columns)} lines, best: {best.to_dict()}")
+        return scores
+
+    def _crm_error(self, columns, values, labels):
+        """Median |pivot / certified - 1| over the rows that have an inline CRM."""
+        error = np.full(len(columns), np.nan)
+        crm_rows = self.pivot_tab._inline_crm_rows
+        if not crm_rows or self.pivot_tab.use_int_var.isChecked():
+            return error
+        certified = np.full(values.shape, np.nan)
+        for label, entries in crm_rows.items():
+            if not entries:
+                continue
+            rows = np.flatnonzero(labels == label)
+            if len(rows):
+                certified[rows] = pd.to_numeric(pd.Series([entries[0].get(col) for col in columns], dtype=object),
+                                                 errors='coerce').to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = np.abs(np.where(certified != 0, values / certified, np.nan) - 1.0)
+        return pd.DataFrame(deviation).median().to_numpy(dtype=np.float64)
+
+    def _calibration_r2(self, columns):
+        """Calibration R² of each column's element/wavelength from the Std rows."""
+        df = self.pivot_tab.original_df
+        needed = ['Type', 'Element', 'Solution Label', 'Soln Conc', 'Int']
+        if df is None or not all(col in df.columns for col in needed):
+            return np.full(len(columns), np.nan)
+        clean = df.loc[df['Type'].isin(['Std', 'Blk']), needed].dropna(subset=['Type', 'Element']).copy()
+        clean['Soln Conc'] = pd.to_numeric(clean['Soln Conc'], errors='coerce').fillna(-1.0)
+        clean['Int'] = pd.to_numeric(clean['Int'], errors='coerce').fillna(-1.0)
+        registry = self.pivot_tab.element_registry
+        stats = CalibrationIndex(clean, registry).stats
+        if stats.empty:
+            return np.full(len(columns), np.nan)
+        infos = [registry.info(col) for col in columns]
+        keys = [(info.element, info.line) if info is not None else (None, None) for info in infos]
+        return stats['R2'].reindex(pd.MultiIndex.from_tuples(keys)).to_numpy(dtype=np.float64)
+
+    def _blank_ratio(self, columns, values):
+        """Mean |blank| of each column relative to its median |sample| level."""
+        df = self.pivot_tab.original_df
+        value_column = 'Int' if self.pivot_tab.use_int_var.isChecked() else 'Corr Con'
+        if df is None or value_column not in df.columns:
+            return np.full(len(columns), np.nan)
+        blk = df[df['Type'] == 'Blk']
+        if blk.empty:
+            return np.full(len(columns), np.nan)
+        registry = self.pivot_tab.element_registry
+        use_oxide = self.pivot_tab.use_oxide_var.isChecked()
+        column_of, factor_of = {}, {}
+        for name in blk['Element'].dropna().unique():
+            base = registry.base_of(name)
+            formula, factor = registry.oxide_of(name)
+            if use_oxide and formula is not None:
+                column_of[name], factor_of[name] = formula, factor
+            else:
+                column_of[name], factor_of[name] = base, 1.0
+        blank = pd.to_numeric(blk[value_column], errors='coerce') * blk['Element'].map(factor_of)
+        blank_level = blank.abs().groupby(blk['Element'].map(column_of)).mean().reindex(columns).to_numpy(dtype=np.float64)
+        sample_level = pd.DataFrame(np.abs(values)).median().to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(sample_level > 0, blank_level / sample_level, np.nan)
+
+    def _replicate_rsd(self, values, labels):
+        """Median RSD (%) across Solution Labels measured more than once."""
+        replicates = self.pivot_tab.replicate_data
+        if replicates is not None:
+            return replicates['rsd'].median().reindex(self.pivot_tab.pivot_data.columns[1:]).to_numpy(dtype=np.float64)
+        frame = pd.DataFrame(values)
+        grouped = frame.groupby(labels, sort=False)
+        counts = grouped.count()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsd = (grouped.std(ddof=1) / grouped.mean().abs() * 100).where(counts >= 2)
+        return rsd.median().to_numpy(dtype=np.float64)
@@ -1,7 +1,10 @@
 import re
 import pandas as pd
 from PyQt6.QtWidgets import QMessageBox
-from .oxide_factors import oxide_factors
+from utils.element_registry import ElementRegistry
+from utils.uncertainty import propagate_uncertainty, COMBINED_SD
+from utils.replicates import replicate_stats
+from utils.provenance import CRM_SCALE, FLAG_NAMES
 
 class PivotCreator:
     """Handles pivot table creation for the PivotTab."""
@@ -11,6 +14,9 @@ class PivotCreator:
 
     def create_pivot(self):
         """Create and populate the pivot table from the application data."""
+        # A rebuilt pivot starts from the uncorrected values, so drop the CRM Scale marks
+        if self.pivot_tab.app.stage_params(FLAG_NAMES[CRM_SCALE]):
+            self.pivot_tab.app.set_stage_params(FLAG_NAMES[CRM_SCALE], None)
         df = self.pivot_tab.app.get_data()
         if df is None or df.empty:
             QMessageBox.warning(self.pivot_tab, "Warning", "No data to display!")
@@ -20,7 +26,10 @@ class PivotCreator:
             self.pivot_tab.original_df = df.copy()
             df_filtered = df[df['Type'].isin(['Samp', 'Sample'])].copy()
             df_filtered['original_index'] = df_filtered.index
-            df_filtered['Element'] = df_filtered['Element'].str.split('_').str[0]
+            registry = ElementRegistry.from_dataframe(df)
+            self.pivot_tab.element_registry = registry
+            base_names = {name: registry.base_of(name) for name in df_filtered['Element'].dropna().unique()}
+            df_filtered['Element'] = df_filtered['Element'].map(base_names)
             df_filtered['unique_id'] = df_filtered.groupby(['Solution Label', 'Element']).cumcount()
 
             def clean_label(label):
@@ -37,17 +46,28 @@ class PivotCreator:
                 QMessageBox.warning(self.pivot_tab, "Error", f"Column '{value_column}' not found in data!")
                 return
 
-            pivot_df = df_filtered.pivot_table(
-                index=['Solution Label', 'unique_id'],
-                columns='Element',  # Fixed typo: changed 'columnsML' to 'columns'
-                values=value_column,
-                aggfunc='first'
-            ).reset_index()
-            pivot_df = pivot_df.merge(
-                df_filtered[['original_index', 'Solution Label', 'unique_id']],
-                on=['Solution Label', 'unique_id'],
-                how='left'
-            ).sort_values('original_index').drop(columns=['original_index', 'unique_id']).drop_duplicates()
+            replicate_data = None
+            if self.pivot_tab.replicate_var.isChecked():
+                # One row per label: replicate mean, with SD/RSD/count from the same reduction
+                stats = replicate_stats(df_filtered, value_column)
+                pivot_df = stats['mean'].reset_index()
+                uncertainty_df = stats['sd'].reset_index(drop=True)
+                replicate_data = {key: stats[key].reset_index(drop=True) for key in ('rsd', 'count')}
+            else:
+                pivot_df = df_filtered.pivot_table(
+                    index=['Solution Label', 'unique_id'],
+                    columns='Element',  # Fixed typo: changed 'columnsML' to 'columns'
+                    values=value_column,
+                    aggfunc='first'
+                ).reset_index()
+                pivot_df = pivot_df.merge(
+                    df_filtered[['original_index', 'Solution Label', 'unique_id']],
+                    on=['Solution Label', 'unique_id'],
+                    how='left'
+                ).sort_values('original_index')
+                row_keys = pd.Series(list(zip(pivot_df['Solution Label'], pivot_df['unique_id'])), index=pivot_df.index)
+                pivot_df = pivot_df.drop(columns=['original_index', 'unique_id']).drop_duplicates()
+                uncertainty_df = self.uncertainty_pivot(df_filtered, value_column, row_keys, pivot_df)
 
             print("Before oxide transformation:", pivot_df)  # Debug
 
@@ -56,17 +76,27 @@ class PivotCreator:
                 rename_dict = {}
                 for col in pivot_df.columns:
                     if col != 'Solution Label':
-                        # Extract element name without wavelength
-                        element = col.split()[0]
-                        if element in oxide_factors:
-                            oxide_formula, factor = oxide_factors[element]
+                        oxide_formula, factor = registry.oxide_of(col)
+                        if oxide_formula is not None:
                             rename_dict[col] = oxide_formula
                             pivot_df[col] = pd.to_numeric(pivot_df[col], errors='coerce') * factor
+                            if uncertainty_df is not None and col in uncertainty_df.columns:
+                                uncertainty_df[col] = uncertainty_df[col] * factor
                 pivot_df.rename(columns=rename_dict, inplace=True)
+                if uncertainty_df is not None:
+                    uncertainty_df.rename(columns=rename_dict, inplace=True)
+                if replicate_data is not None:
+                    for frame in replicate_data.values():
+                        frame.rename(columns=rename_dict, inplace=True)
 
             print("After oxide transformation:", pivot_df)  # Debug
 
+            registry.set_positions('pivot', pivot_df.columns)
             self.pivot_tab.pivot_data = pivot_df
+            self.pivot_tab.discard_edits()
+            self.pivot_tab.uncertainty_data = uncertainty_df
+            self.pivot_tab.replicate_data = replicate_data
+            self.pivot_tab.line_selector.invalidate()
             self.pivot_tab.column_widths.clear()
             self.pivot_tab.cached_formatted.clear()
             self.pivot_tab._inline_crm_rows.clear()
@@ -77,4 +107,33 @@ class PivotCreator:
 
         except Exception as e:
             self.logger.error(f"Failed to create pivot table: {str(e)}")
-            QMessageBox.warning(self.pivot_tab, "Pivot Error", f"Failed to create pivot table: {str(e)}")
\ No newline at end of file
+            QMessageBox.warning(self.pivot_tab, "Pivot Error", f"Failed to create pivot table: {str(e)}")
+
+    def uncertainty_pivot(self, df_filtered, value_column, row_keys, pivot_df):
+        """SD of each pivot cell, aligned with pivot_df (same index and columns), or None.
+
+        Concentrations use the combined SD carried through the corrections, intensities the
+        instrument Int SD.
+        """
+        if value_column == 'Int':
+            if 'Int SD' not in df_filtered.columns:
+                return None
+            sd_column = 'Int SD'
+        else:
+            if 'Corr Con RSD' not in df_filtered.columns:
+                return None
+            df_filtered = propagate_uncertainty(df_filtered)
+            sd_column = COMBINED_SD
+        if pivot_df.empty or df_filtered[sd_column].isna().all():
+            return None
+
+        sd = df_filtered.pivot_table(
+            index=['Solution Label', 'unique_id'],
+            columns='Element',
+            values=sd_column,
+            aggfunc='first'
+        )
+        # Pick each kept pivot row's (label, unique_id) cell set, in pivot row order
+        sd = sd.reindex(pd.MultiIndex.from_tuples(row_keys.loc[pivot_df.index].tolist()))
+        sd.index = pivot_df.index
+        return sd.reindex(columns=[col for col in pivot_df.columns if col != 'Solution Label'])
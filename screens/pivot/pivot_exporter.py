@@ -1,10 +1,10 @@
 import os
 import platform
+import numpy as np
 import pandas as pd
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font as OpenPyXLFont, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from utils.excel_export import SheetSpec, numeric_or_text, start_excel_export
+from utils.columnar_export import ask_export_path, start_columnar_export
 
 class PivotExporter:
     """Handles exporting the pivot table to an Excel file."""
@@ -40,75 +40,6 @@ class PivotExporter:
                 self.logger.warning(f"Invalid decimal_places value, using default 1: {str(e)}")
                 decimal_places = 1
             
-            # Create a list to hold all rows, including CRM and Diff rows
-            export_rows = []
-            export_index = []
-
-            # Iterate through the displayed rows and insert CRM/Diff rows
-            for idx, row in df.iterrows():
-                sol_label = row['Solution Label']
-                export_rows.append(row)
-                export_index.append(sol_label)
-                
-                # Add inline CRM and Diff rows if they exist
-                if sol_label in self.pivot_tab._inline_crm_rows_display:
-                    for crm_row, tags in self.pivot_tab._inline_crm_rows_display[sol_label]:
-                        if not isinstance(crm_row, list) or not crm_row:
-                            self.logger.warning(f"Invalid CRM row data for {sol_label}")
-                            continue
-                        # Convert CRM/Diff row to a Series with the same columns as df
-                        crm_data = pd.Series(index=df.columns, dtype=object)
-                        crm_data['Solution Label'] = crm_row[0]
-                        for col in df.columns[1:]:  # Skip 'Solution Label'
-                            try:
-                                col_idx = self.pivot_tab.pivot_data.columns.get_loc(col)
-                                crm_data[col] = crm_row[col_idx] if col_idx < len(crm_row) else ''
-                            except (ValueError, IndexError) as e:
-                                self.logger.warning(f"Invalid column index for {col} in CRM row for {sol_label}: {str(e)}")
-                                crm_data[col] = ''
-                        if crm_row[0].endswith("CRM"):
-                            export_rows.append(crm_data)
-                            export_index.append(f"{sol_label} CRM")
-                        elif crm_row[0].endswith("Diff (%)") and getattr(self.pivot_tab, 'show_diff', False).isChecked():
-                            export_rows.append(crm_data)
-                            export_index.append(f"{sol_label} Diff (%)")
-
-            # Create DataFrame for export
-            export_df = pd.DataFrame(export_rows, index=export_index)
-
-            # Format numeric columns to respect decimal places
-            for col in export_df.columns[1:]:  # Skip 'Solution Label'
-                export_df[col] = export_df[col].apply(
-                    lambda x: self.pivot_tab.format_value(x) if self.pivot_tab.is_numeric(x) else x
-                )
-
-            # Create Excel workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Pivot Table"
-
-            # Define styles
-            header_fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-            first_col_fill = PatternFill(start_color="FFF5E4", end_color="FFF5E4", fill_type="solid")
-            odd_fill = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
-            even_fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-            diff_in_range_fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")  # Green
-            diff_out_range_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")  # Red
-            header_font = OpenPyXLFont(name="Segoe UI", size=12, bold=True)
-            cell_font = OpenPyXLFont(name="Segoe UI", size=12)
-            cell_align = Alignment(horizontal="center", vertical="center")
-            thin_border = Border(left=Side(style="thin"), right=Side(style="thin"), top=Side(style="thin"), bottom=Side(style="thin"))
-
-            # Write headers
-            headers = list(export_df.columns)
-            for ci, h in enumerate(headers, 1):
-                c = ws.cell(row=1, column=ci, value=h)
-                c.fill = header_fill
-                c.font = header_font
-                c.alignment = cell_align
-                c.border = thin_border
-                ws.column_dimensions[get_column_letter(ci)].width = 15
-
             # Get difference range
             try:
                 min_diff = float(self.pivot_tab.diff_min.text())
@@ -117,93 +48,215 @@ class PivotExporter:
                 self.logger.warning(f"Invalid diff_min or diff_max values, using defaults -12 and 12: {str(e)}")
                 min_diff, max_diff = -12, 12
 
-            # Write data
-            row_idx = 2
-            for idx, row in enumerate(export_rows):
-                sol_label = export_index[idx]
-                is_crm_row = sol_label.endswith("CRM")
-                is_diff_row = sol_label.endswith("Diff (%)")
-                
-                for ci, val in enumerate(row, 1):
-                    cell = ws.cell(row=row_idx, column=ci)
-                    cell.value = val if is_crm_row or is_diff_row else self.pivot_tab.format_value(val)
-                    cell.font = cell_font
-                    cell.alignment = cell_align
-                    cell.border = thin_border
-                    # Apply row background
-                    cell.fill = first_col_fill if ci == 1 else (even_fill if (row_idx - 1) % 2 == 0 else odd_fill)
-                    
-                    # Apply difference coloring for non-CRM, non-Diff rows
-                    if ci > 1 and not is_crm_row and not is_diff_row and self.pivot_tab.is_numeric(val):
-                        col_name = headers[ci - 1]
-                        pivot_val = float(val)
-                        crm_val = None
-                        if sol_label in self.pivot_tab._inline_crm_rows_display:
-                            for crm_row, tags in self.pivot_tab._inline_crm_rows_display[sol_label]:
-                                if isinstance(crm_row, list) and crm_row and crm_row[0].endswith("CRM"):
-                                    try:
-                                        crm_val_str = crm_row[self.pivot_tab.pivot_data.columns.get_loc(col_name)] if col_name in self.pivot_tab.pivot_data.columns else ""
-                                        if self.pivot_tab.is_numeric(crm_val_str):
-                                            crm_val = float(crm_val_str)
-                                            break
-                                    except ValueError as e:
-                                        self.logger.warning(f"Invalid column {col_name} for CRM row in {sol_label}: {str(e)}")
-                        if crm_val is not None:
-                            diff_percent = ((pivot_val - crm_val) / crm_val * 100) if crm_val != 0 else 0
-                            if not (min_diff <= diff_percent <= max_diff):
-                                cell.fill = diff_out_range_fill
-                            else:
-                                cell.fill = diff_in_range_fill
-                    # Apply CRM row fill
-                    elif is_crm_row and ci > 1:
-                        cell.fill = first_col_fill
-                    # Apply Diff row fill based on tags
-                    elif is_diff_row and ci > 1:
-                        col_name = headers[ci - 1]
-                        for crm_row, tags in self.pivot_tab._inline_crm_rows_display[sol_label.replace(" Diff (%)", "")]:
-                            if isinstance(crm_row, list) and crm_row and crm_row[0].endswith("Diff (%)"):
-                                try:
-                                    col_idx = self.pivot_tab.pivot_data.columns.get_loc(col_name)
-                                    if tags and col_idx - 1 < len(tags):  # Adjust for 0-based tags index
-                                        cell.fill = diff_in_range_fill if tags[col_idx - 1] == "in_range" else diff_out_range_fill
-                                    else:
-                                        cell.fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
-                                except ValueError as e:
-                                    self.logger.warning(f"Invalid column {col_name} for Diff row in {sol_label}: {str(e)}")
-                                    cell.fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
-                                break
-
-                row_idx += 1
-
-            # Adjust column widths
-            for ci, col in enumerate(headers, 1):
-                max_length = max(
-                    len(str(col)),
-                    max((len(str(row.get(col, ''))) for row in export_rows), default=10)
-                )
-                adjusted_width = max_length * 1.2
-                ws.column_dimensions[get_column_letter(ci)].width = adjusted_width
-
-            # Save the workbook
-            wb.save(file_path)
-            self.logger.info(f"Pivot table exported to {file_path}")
-            self.pivot_tab.status_label.setText(f"Exported to {file_path}")
-            QMessageBox.information(self.pivot_tab, "Success", "Pivot table exported successfully!")
-            
-            # Ask to open the file
-            if QMessageBox.question(self.pivot_tab, "Open File", "Open the saved Excel file?") == QMessageBox.StandardButton.Yes:
-                try:
-                    if platform.system() == "Windows":
-                        os.startfile(file_path)
-                    elif platform.system() == "Darwin":
-                        os.system(f"open '{file_path}'")
+            df = df.reset_index(drop=True)
+            value_columns = list(df.columns[1:])  # Skip 'Solution Label'
+            show_diff = getattr(self.pivot_tab, 'show_diff', None)
+            overlay = self.overlay_rows(df, include_diff=show_diff is not None and show_diff.isChecked())
+            n, m = len(df), len(overlay['parent'])
+
+            # One index-interleave: every view row followed by its CRM/Diff rows in display order
+            parent = np.concatenate([np.arange(n), overlay['parent']])
+            rank = np.concatenate([np.zeros(n, dtype=np.int64), np.arange(1, m + 1)])
+            order = np.lexsort((rank, parent))
+            position = np.empty(n + m, dtype=np.int64)
+            position[order] = np.arange(n + m)
+
+            labels = np.concatenate([df['Solution Label'].to_numpy(dtype=object), overlay['label']])
+            cells = np.vstack([df[value_columns].to_numpy(dtype=object), overlay['text']])
+            export_df = pd.DataFrame(cells[order], columns=value_columns)
+            export_df = export_df.apply(numeric_or_text, decimals=decimal_places)
+            export_df.insert(0, df.columns[0], labels[order])
+
+            kinds = np.concatenate([np.full(n, 'sample', dtype=object), overlay['kind']])[order]
+            stripes = np.where(np.arange(n + m) % 2 == 1, 'even', 'odd')
+            row_styles = np.where(kinds == 'sample', stripes, kinds).tolist()
+
+            formats = self.export_formats(decimal_places)
+            view_values = df[value_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+            cell_styles = self.range_tags(view_values, overlay, position, n, min_diff, max_diff)
+
+            sheet = SheetSpec(
+                "Pivot Table", export_df,
+                row_styles=row_styles,
+                first_column_style='first',
+                cell_styles=cell_styles
+            )
+            self.pivot_tab.status_label.setText("Exporting...")
+            self.export_thread = start_excel_export(
+                self.pivot_tab, file_path, [sheet], formats,
+                self.on_export_finished, self.on_export_error, title="Exporting Pivot Table"
+            )
+
+        except Exception as e:
+            self.on_export_error(str(e))
+
+    def export_formats(self, decimal_places):
+        """Named cell formats shared by every cell of the exported pivot."""
+        number_format = f"0.{'0' * decimal_places}" if decimal_places else "0"
+        cell = {'font_name': 'Segoe UI', 'font_size': 12, 'align': 'center', 'valign': 'vcenter',
+                'border': 1, 'num_format': number_format}
+        return {
+            'header': {**cell, 'bold': True, 'bg_color': '#90EE90'},
+            'first': {**cell, 'bg_color': '#FFF5E4'},
+            'odd': {**cell, 'bg_color': '#F5F5F5'},
+            'even': {**cell, 'bg_color': '#FFFFFF'},
+            'crm': {**cell, 'bg_color': '#FFF5E4'},
+            'diff': {**cell, 'bg_color': '#E6E6FA'},
+            'in_range': {**cell, 'bg_color': '#00FF00'},
+            'out_range': {**cell, 'bg_color': '#FF0000'},
+        }
+
+    def overlay_rows(self, df, include_diff=True):
+        """Inline CRM/Diff rows of the view, parsed once into matrices aligned with its value columns.
+
+        Returns parent (view row of each overlay row), kind ('crm'/'diff'), label, text (the
+        displayed strings) and values (float, NaN where not numeric).
+        """
+        value_columns = list(df.columns[1:])
+        # CRM row lists are built for the view columns, so index them by view position
+        registry = self.pivot_tab.element_registry
+        positions = [registry.position('view', col) for col in value_columns]
+        source = np.array([-1 if pos is None else pos for pos in positions], dtype=np.int64)
+        parents, kinds, labels, rows = [], [], [], []
+        crm_display = self.pivot_tab._inline_crm_rows_display
+        if crm_display:
+            for sol_label, view_rows in df.groupby('Solution Label', sort=False).indices.items():
+                for crm_row, _ in crm_display.get(sol_label, []):
+                    if not isinstance(crm_row, list) or not crm_row:
+                        self.logger.warning(f"Invalid CRM row data for {sol_label}")
+                        continue
+                    if crm_row[0].endswith("CRM"):
+                        kind = 'crm'
+                    elif crm_row[0].endswith("Diff (%)") and include_diff:
+                        kind = 'diff'
                     else:
-                        os.system(f"xdg-open '{file_path}'")
-                except Exception as e:
-                    self.logger.error(f"Failed to open file: {str(e)}")
-                    QMessageBox.warning(self.pivot_tab, "Error", f"Failed to open file: {str(e)}")
+                        continue
+                    parents.extend(view_rows)
+                    kinds.extend([kind] * len(view_rows))
+                    labels.extend([crm_row[0]] * len(view_rows))
+                    rows.extend([crm_row] * len(view_rows))
+
+        text = np.full((len(rows), len(value_columns)), '', dtype=object)
+        if rows:
+            raw = pd.DataFrame(rows).fillna('')
+            valid = (source >= 0) & (source < raw.shape[1])
+            text[:, valid] = raw.iloc[:, source[valid]].to_numpy(dtype=object)
+        values = pd.DataFrame(text).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        return {
+            'parent': np.asarray(parents, dtype=np.int64),
+            'kind': np.asarray(kinds, dtype=object),
+            'label': np.asarray(labels, dtype=object),
+            'text': text,
+            'values': values.reshape(len(rows), len(value_columns)),
+        }
+
+    def range_tags(self, view_values, overlay, position, n, min_diff, max_diff):
+        """Per-cell in_range/out_range styles from the numeric view and overlay matrices.
+
+        Sample cells compare against the first numeric CRM value of their row; Diff cells test
+        their own value. Untagged cells are None and keep their row style.
+        """
+        n_cols = view_values.shape[1]
+        cell_styles = np.full((len(position), n_cols + 1), None, dtype=object)
+
+        def tag(rows, diff, valid):
+            in_range = valid & (diff >= min_diff) & (diff <= max_diff)
+            out_range = valid & ~in_range
+            cell_styles[rows, 1:] = np.where(in_range, 'in_range', np.where(out_range, 'out_range', None))
+
+        is_crm = overlay['kind'] == 'crm'
+        if is_crm.any():
+            crm_ref = pd.DataFrame(overlay['values'][is_crm]).groupby(overlay['parent'][is_crm]).first()
+            parents = crm_ref.index.to_numpy()
+            pivot_vals = view_values[parents]
+            crm_vals = crm_ref.to_numpy(dtype=np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                diff = np.where(crm_vals != 0, (pivot_vals - crm_vals) / crm_vals * 100, 0.0)
+            tag(position[parents], diff, ~np.isnan(pivot_vals) & ~np.isnan(crm_vals))
+
+        is_diff = np.flatnonzero(overlay['kind'] == 'diff')
+        if len(is_diff):
+            diff = overlay['values'][is_diff]
+            tag(position[n + is_diff], diff, ~np.isnan(diff))
+        return cell_styles
 
+    def on_export_finished(self, file_path):
+        self.logger.info(f"Pivot table exported to {file_path}")
+        self.pivot_tab.status_label.setText(f"Exported to {file_path}")
+        QMessageBox.information(self.pivot_tab, "Success", "Pivot table exported successfully!")
+
+        # Ask to open the file
+        if QMessageBox.question(self.pivot_tab, "Open File", "Open the saved Excel file?") == QMessageBox.StandardButton.Yes:
+            try:
+                if platform.system() == "Windows":
+                    os.startfile(file_path)
+                elif platform.system() == "Darwin":
+                    os.system(f"open '{file_path}'")
+                else:
+                    os.system(f"xdg-open '{file_path}'")
+            except Exception as e:
+                self.logger.error(f"Failed to open file: {str(e)}")
+                QMessageBox.warning(self.pivot_tab, "Error", f"Failed to open file: {str(e)}")
+
+    def on_export_error(self, message):
+        self.logger.error(f"Failed to export pivot table: {message}")
+        self.pivot_tab.status_label.setText(f"Error: {message}")
+        QMessageBox.warning(self.pivot_tab, "Error", f"Failed to export pivot table: {message}")
+
+    def columnar_frame(self):
+        """The displayed pivot with SD, CRM and Diff (%) values as typed columns next to each element column."""
+        df = self.pivot_tab.current_view_df
+        value_columns = list(df.columns[1:])
+        frame = pd.DataFrame({'Solution Label': df['Solution Label'].astype(str).to_numpy()})
+        values = df[value_columns].apply(pd.to_numeric, errors='coerce')
+        uncertainty = self.pivot_tab.current_view_uncertainty
+
+        def add_value(col):
+            frame[col] = values[col].to_numpy()
+            if uncertainty is not None and col in uncertainty.columns:
+                frame[f"{col} SD"] = uncertainty[col].to_numpy(dtype=np.float64)
+
+        if not self.pivot_tab._inline_crm_rows_display:
+            for col in value_columns:
+                add_value(col)
+            return frame
+
+        overlay = self.overlay_rows(df.reset_index(drop=True))
+        crm_values = np.full((len(df), len(value_columns)), np.nan)
+        diff_values = np.full((len(df), len(value_columns)), np.nan)
+        for kind, target in (('crm', crm_values), ('diff', diff_values)):
+            rows = overlay['kind'] == kind
+            if rows.any():
+                first = pd.DataFrame(overlay['values'][rows]).groupby(overlay['parent'][rows]).first()
+                target[first.index.to_numpy()] = first.to_numpy(dtype=np.float64)
+
+        for j, col in enumerate(value_columns):
+            add_value(col)
+            frame[f"{col} CRM"] = crm_values[:, j]
+            frame[f"{col} Diff (%)"] = diff_values[:, j]
+        return frame
+
+    def export_columnar(self):
+        """Export the displayed pivot as Parquet/Arrow IPC/CSV without styling."""
+        if self.pivot_tab.current_view_df is None or self.pivot_tab.current_view_df.empty:
+            self.logger.warning("No data to export")
+            QMessageBox.warning(self.pivot_tab, "Warning", "No data to export!")
+            return
+
+        file_path, target = ask_export_path(self.pivot_tab, "Export Pivot Data", "pivot_table")
+        if not file_path:
+            self.pivot_tab.status_label.setText("Export cancelled")
+            return
+        try:
+            frame = self.columnar_frame()
+            self.pivot_tab.status_label.setText("Exporting...")
+            self.columnar_thread = start_columnar_export(
+                self.pivot_tab, frame, file_path, target,
+                self.on_columnar_exported, self.on_export_error, title="Exporting Pivot Data"
+            )
         except Exception as e:
-            self.logger.error(f"Failed to export pivot table: {str(e)}")
-            self.pivot_tab.status_label.setText(f"Error: {str(e)}")
-            QMessageBox.warning(self.pivot_tab, "Error", f"Failed to export pivot table: {str(e)}")
\ No newline at end of file
+            self.on_export_error(str(e))
+
+    def on_columnar_exported(self, file_path):
+        self.logger.info(f"Pivot data exported to {file_path}")
+        self.pivot_tab.status_label.setText(f"Exported to {file_path}")
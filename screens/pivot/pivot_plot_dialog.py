@@ -71,6 +71,11 @@ class PivotPlotDialog(QDialog):
         select_crms_btn.clicked.connect(self.open_select_crms_window)
         control_frame.addWidget(select_crms_btn)
         
+        grid_btn = QPushButton("All Elements")
+        grid_btn.setToolTip("Recovery plots of every element in one grid")
+        grid_btn.clicked.connect(self.open_small_multiples)
+        control_frame.addWidget(grid_btn)
+        
         report_btn = QPushButton("Report")
         report_btn.clicked.connect(self.show_report)
         control_frame.addWidget(report_btn)
@@ -100,12 +105,54 @@ class PivotPlotDialog(QDialog):
         self.main_plot.enableAutoRange(x=False, y=False)
         self.main_plot.setBackground('w')
         self.legend = self.main_plot.addLegend(offset=(10, 10))
+        # One batched item per series, updated with setData on every element switch
+        self.series_items = {
+            'Certificate Value': pg.PlotDataItem(pen=None, symbol='o', symbolSize=8, symbolPen='g', symbolBrush='g', name='Certificate Value'),
+            'Sample Value': pg.PlotDataItem(pen=None, symbol='t', symbolSize=8, symbolPen='b', symbolBrush='b', name='Sample Value'),
+            'Acceptable Range': pg.PlotDataItem(pen=pg.mkPen('r', width=2), connect='pairs', name='Acceptable Range'),
+        }
+        self.series_checks = {
+            'Certificate Value': self.show_check_crm,
+            'Sample Value': self.show_pivot_crm,
+            'Acceptable Range': self.show_range,
+        }
+        for item in self.series_items.values():
+            item.setClipToView(True)
+            item.setDownsampling(auto=True, method='peak')
+            self.main_plot.addItem(item)
+        self.small_multiples = None
         layout.addWidget(self.main_plot)
         
         self.main_plot.scene().sigMouseMoved.connect(self.show_tooltip)
         
         self.update_plot()
 
+    def clear_series(self):
+        for item in self.series_items.values():
+            item.setData([], [])
+        self.legend.clear()
+
+    def included_crm_labels(self):
+        """Inline CRM labels selected for verification, without the CRM blanks."""
+        labels = self.parent.pivot_data['Solution Label']
+        blank_labels = set(labels[labels.str.contains(r'CRM\s*BLANK', case=False, na=False, regex=True)])
+        return [
+            label for label in self.parent._inline_crm_rows_display.keys()
+            if label not in blank_labels
+            and label in self.parent.included_crms and self.parent.included_crms[label].isChecked()
+        ]
+
+    def open_small_multiples(self):
+        if self.parent.pivot_data is None or self.parent.pivot_data.empty:
+            QMessageBox.warning(self, "Warning", "No pivot data available!")
+            return
+        from .small_multiples import SmallMultiplesDialog
+        if self.small_multiples is None:
+            self.small_multiples = SmallMultiplesDialog(self)
+        self.small_multiples.refresh()
+        self.small_multiples.show()
+        self.small_multiples.raise_()
+
     def zoom_in(self):
         self.main_plot.getViewBox().scaleBy((0.8, 0.8))
 
@@ -167,6 +214,11 @@ class PivotPlotDialog(QDialog):
             return "0"
         return f"{num:.4f}".rstrip('0').rstrip('.')
 
+    def crm_value(self, row_data, element):
+        """Return the CRM cell for an element from an inline CRM row built for the current view."""
+        pos = self.parent.element_registry.position('view', element)
+        return row_data[pos] if pos is not None and pos < len(row_data) else ""
+
     def correct_pivot_crm(self, selected_element):
         self.logger.debug(f"Correcting pivot CRM for element: {selected_element}")
         if self.parent.pivot_data is None or self.parent.pivot_data.empty:
@@ -197,7 +249,7 @@ class PivotPlotDialog(QDialog):
                 pivot_val = pivot_row.iloc[0][selected_element]
                 for row_data, _ in crm_rows:
                     if isinstance(row_data, list) and row_data and row_data[0].endswith("CRM"):
-                        val_str = row_data[self.parent.pivot_data.columns.get_loc(selected_element)] if selected_element in self.parent.pivot_data.columns else ""
+                        val_str = self.crm_value(row_data, selected_element)
                         if val_str and val_str.strip() and pd.notna(pivot_val):
                             try:
                                 cert_val = float(val_str)
@@ -273,7 +325,13 @@ class PivotPlotDialog(QDialog):
 
             initial_in_range = sum(d['lower'] <= d['pivot_val'] <= d['upper'] for d in crm_data)
             if in_range_after > initial_in_range:
+                before = self.parent.pivot_data[selected_element].to_numpy(copy=True)
                 self.parent.pivot_data[selected_element] = (self.parent.pivot_data[selected_element] - blank_adjust) * scale
+                self.parent.line_selector.invalidate()
+                changes = [('pivot_data', selected_element, before)]
+                marked, stage_change = self.parent.mark_crm_correction(selected_element, {'blank': round(float(blank_adjust), 6), 'scale': round(float(scale), 6)})
+                changes.extend(marked)
+                self.parent.record_edit(f"CRM correction of {selected_element}", changes, stage_change)
                 self.logger.debug(f"Applied correction for {selected_element}: blank_adjust={blank_adjust}, scale={scale}")
                 return True, f"Correction applied for {selected_element}: blank_adjust={blank_adjust:.3f}, scale={scale:.3f}. In-range: {int(in_range_after)}/{total_crm}"
             else:
@@ -389,7 +447,7 @@ class PivotPlotDialog(QDialog):
                 pivot_val_float = float(pivot_val)
                 for row_data, _ in self.parent._inline_crm_rows_display[sol_label]:
                     if isinstance(row_data, list) and row_data and row_data[0].endswith("CRM"):
-                        val = row_data[self.parent.pivot_data.columns.get_loc(self.selected_element)] if self.selected_element in self.parent.pivot_data.columns else ""
+                        val = self.crm_value(row_data, self.selected_element)
                         if self.is_numeric(val):
                             sample_values.append(pivot_val_float)
                             cert_values.append(float(val))
@@ -403,6 +461,7 @@ class PivotPlotDialog(QDialog):
 
             # Apply corrections to pivot_data
             blank_column = 'Blank Value' if 'Blank Value' in self.parent.pivot_data.columns else None
+            edit_changes = [('pivot_data', column_to_correct, self.parent.pivot_data[column_to_correct].to_numpy(copy=True))]
             self.parent.pivot_data[column_to_correct] = self.parent.pivot_data.apply(
                 lambda row: (
                     (float(row[column_to_correct]) - 
@@ -411,6 +470,7 @@ class PivotPlotDialog(QDialog):
                 ) if self.is_numeric(row[column_to_correct]) else row[column_to_correct],
                 axis=1
             )
+            self.parent.line_selector.invalidate()
             self.logger.debug(f"Applied correction to pivot_data[{column_to_correct}]: blank={recommended_blank}, scale={recommended_scale}")
             self.logger.debug(f"Updated pivot_data: {self.parent.pivot_data[[column_to_correct]].head().to_dict()}")
 
@@ -418,6 +478,7 @@ class PivotPlotDialog(QDialog):
             if self.parent.original_df is not None and not self.parent.original_df.empty:
                 mask = self.parent.original_df['Element'] == self.selected_element
                 if 'Soln Conc' in self.parent.original_df.columns:
+                    edit_changes.append(('original_df', 'Soln Conc', self.parent.original_df['Soln Conc'].to_numpy(copy=True)))
                     self.parent.original_df.loc[mask, 'Soln Conc'] = self.parent.original_df[mask].apply(
                         lambda row: (
                             (float(row['Soln Conc']) - 
@@ -435,6 +496,10 @@ class PivotPlotDialog(QDialog):
                 self.logger.warning("original_df is empty or None")
                 self.status_label.setText("Warning: No original_df to update")
 
+            marked, stage_change = self.parent.mark_crm_correction(column_to_correct, {'blank': round(float(recommended_blank), 6), 'scale': round(float(recommended_scale), 6)})
+            edit_changes.extend(marked)
+            self.parent.record_edit(f"CRM correction of {column_to_correct}", edit_changes, stage_change)
+
             # Refresh parent's table view
             if hasattr(self.parent, 'update_pivot_display'):
                 try:
@@ -462,17 +527,15 @@ class PivotPlotDialog(QDialog):
             return
 
         try:
-            self.main_plot.clear()
-            self.legend.clear()
             self.annotations.clear()
-            added_legend_names = set()
 
             def extract_crm_id(label):
                 m = re.search(r'(?i)(?:\bCRM\b|\bOREAS\b)?[\s-]*(\d+[a-zA-Z]?)[\s-]*(?:\bpar\b)?', str(label))
                 return m.group(1) if m else str(label)
 
-            element_name = self.selected_element.split()[0]
-            wavelength = ' '.join(self.selected_element.split()[1:]) if len(self.selected_element.split()) > 1 else ""
+            col_info = self.parent.element_registry.info(self.selected_element)
+            element_names = self.parent.element_registry.raw_names_for(col_info.element)
+            wavelength = col_info.line
             analysis_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
             std_data = self.parent.original_df[
@@ -541,7 +604,7 @@ class PivotPlotDialog(QDialog):
                         pivot_val_float = float(pivot_val)
                         for row_data, _ in self.parent._inline_crm_rows_display[sol_label]:
                             if isinstance(row_data, list) and row_data and row_data[0].endswith("CRM"):
-                                val = row_data[self.parent.pivot_data.columns.get_loc(self.selected_element)] if self.selected_element in self.parent.pivot_data.columns else ""
+                                val = self.crm_value(row_data, self.selected_element)
                                 if not self.is_numeric(val):
                                     continue
                                 crm_val = float(val)
@@ -571,7 +634,7 @@ class PivotPlotDialog(QDialog):
                             pivot_val_float = float(pivot_val)
                             for row_data, _ in self.parent._inline_crm_rows_display[sol_label]:
                                 if isinstance(row_data, list) and row_data and row_data[0].endswith("CRM"):
-                                    val = row_data[self.parent.pivot_data.columns.get_loc(self.selected_element)] if self.selected_element in self.parent.pivot_data.columns else ""
+                                    val = self.crm_value(row_data, self.selected_element)
                                     if not self.is_numeric(val):
                                         continue
                                     crm_val = float(val)
@@ -585,11 +648,7 @@ class PivotPlotDialog(QDialog):
                 selected_blank_label = best_blank_label
                 blank_correction_status = "Applied" if blank_val != 0 else "Not Applied"
 
-            crm_labels = [
-                label for label in self.parent._inline_crm_rows_display.keys()
-                if label not in blank_rows['Solution Label'].values
-                and label in self.parent.included_crms and self.parent.included_crms[label].isChecked()
-            ]
+            crm_labels = self.included_crm_labels()
 
             crm_id_to_labels = {}
             for sol_label in crm_labels:
@@ -631,14 +690,14 @@ class PivotPlotDialog(QDialog):
 
                     sample_rows = self.parent.original_df[
                         (self.parent.original_df['Solution Label'] == sol_label) &
-                        (self.parent.original_df['Element'].str.startswith(element_name)) &
+                        (self.parent.original_df['Element'].isin(element_names)) &
                         (self.parent.original_df['Type'].isin(['Samp', 'Sample']))
                     ]
                     soln_conc = sample_rows['Soln Conc'].iloc[0] if not sample_rows.empty else '---'
                     int_val = sample_rows['Int'].iloc[0] if not sample_rows.empty else '---'
                     
-                    int_values_list = sample_rows['Int'].dropna().astype(float).tolist()
-                    rsd_percent = (np.std(int_values_list) / np.mean(int_values_list) * 100) if int_values_list and np.mean(int_values_list) != 0 else 0.0
+                    # Instrument RSD kept by the loader; NaN for files without uncertainty columns
+                    rsd_percent = sample_rows['Corr Con RSD'].iloc[0] if not sample_rows.empty and 'Corr Con RSD' in sample_rows.columns else np.nan
                     
                     detection_limit = 0.2
                     crm_source = "NIST"
@@ -646,7 +705,7 @@ class PivotPlotDialog(QDialog):
                     
                     for row_data, _ in self.parent._inline_crm_rows_display[sol_label]:
                         if isinstance(row_data, list) and row_data and row_data[0].endswith("CRM"):
-                            val = row_data[self.parent.pivot_data.columns.get_loc(self.selected_element)] if self.selected_element in self.parent.pivot_data.columns else ""
+                            val = self.crm_value(row_data, self.selected_element)
                             if not val or not self.is_numeric(val):
                                 self.logger.warning(f"Invalid CRM value for {sol_label}: {val}")
                                 annotation = f"Verification ID: {crm_id} (Label: {sol_label})"
@@ -723,6 +782,8 @@ class PivotPlotDialog(QDialog):
                             
                             annotation += f"\n  - Soln Conc: {soln_conc if isinstance(soln_conc, str) else self.format_number(soln_conc)} {'in_range' if in_calibration_range_soln else 'out_range'}"
                             annotation += f"\n  - Int: {int_val if isinstance(int_val, str) else self.format_number(int_val)}"
+                            if pd.notna(rsd_percent):
+                                annotation += f"\n  - RSD: {self.format_number(rsd_percent)}%"
                             annotation += f"\n  - Calibration Range: {calibration_range} {'in_range' if in_calibration_range_soln else 'out_range'}"
                             annotation += f"\n  - CRM Source: {crm_source}"
                             annotation += f"\n  - Sample Matrix: {sample_matrix}"
@@ -740,8 +801,7 @@ class PivotPlotDialog(QDialog):
                             int_values[crm_id].append(int_val)
 
             if not unique_crm_ids:
-                self.main_plot.clear()
-                self.legend.clear()
+                self.clear_series()
                 self.logger.warning(f"No valid Verification data for {self.selected_element}")
                 self.status_label.setText(f"No valid Verification data for {self.selected_element}")
                 QMessageBox.warning(self, "Warning", f"No valid Verification data for {self.selected_element}")
@@ -766,75 +826,37 @@ class PivotPlotDialog(QDialog):
                 self.initial_ranges['main_x'] = (-0.5, len(unique_crm_ids) - 0.5)
                 self.initial_ranges['main_y'] = (y_min - margin, y_max + margin)
 
-            if self.show_check_crm.isChecked():
-                for crm_id in unique_crm_ids:
-                    x_pos = x_pos_map[crm_id]
-                    cert_vals = certificate_values.get(crm_id, [])
-                    if cert_vals:
-                        x_vals = [x_pos] * len(cert_vals)
-                        scatter = pg.PlotDataItem(
-                            x=x_vals, y=cert_vals, pen=None, symbol='o', symbolSize=8,
-                            symbolPen='g', symbolBrush='g'
-                        )
-                        self.main_plot.addItem(scatter)
-                if 'Certificate Value' not in added_legend_names:
-                    scatter = pg.PlotDataItem(
-                        x=[-10], y=[0], pen=None, symbol='o', symbolSize=8,
-                        symbolPen='g', symbolBrush='g', name='Certificate Value'
-                    )
-                    self.legend.addItem(scatter, 'Certificate Value')
-                    added_legend_names.add('Certificate Value')
-
-            if self.show_pivot_crm.isChecked():
-                for crm_id in unique_crm_ids:
-                    x_pos = x_pos_map[crm_id]
-                    samp_vals = sample_values.get(crm_id, [])
-                    if samp_vals:
-                        x_vals = [x_pos] * len(samp_vals)
-                        scatter = pg.PlotDataItem(
-                            x=x_vals, y=samp_vals, pen=None, symbol='t', symbolSize=8,
-                            symbolPen='b', symbolBrush='b'
-                        )
-                        self.main_plot.addItem(scatter)
-                if 'Sample Value' not in added_legend_names:
-                    scatter = pg.PlotDataItem(
-                        x=[-10], y=[0], pen=None, symbol='t', symbolSize=8,
-                        symbolPen='b', symbolBrush='b', name='Sample Value'
-                    )
-                    self.legend.addItem(scatter, 'Sample Value')
-                    added_legend_names.add('Sample Value')
-
-            if self.show_range.isChecked():
-                for crm_id in unique_crm_ids:
-                    x_pos = x_pos_map[crm_id]
-                    low_bounds = lower_bounds.get(crm_id, [])
-                    up_bounds = upper_bounds.get(crm_id, [])
-                    if low_bounds and up_bounds:
-                        for low, up in zip(low_bounds, up_bounds):
-                            line_lower = pg.PlotDataItem(
-                                x=[x_pos - 0.2, x_pos + 0.2], y=[low, low],
-                                pen=pg.mkPen('r', width=2)
-                            )
-                            line_upper = pg.PlotDataItem(
-                                x=[x_pos - 0.2, x_pos + 0.2], y=[up, up],
-                                pen=pg.mkPen('r', width=2)
-                            )
-                            self.main_plot.addItem(line_lower)
-                            self.main_plot.addItem(line_upper)
-                if 'Acceptable Range' not in added_legend_names:
-                    range_item = pg.PlotDataItem(
-                        x=[-10 - 0.2, -10 + 0.2], y=[0, 0],
-                        pen=pg.mkPen('r', width=2), name='Acceptable Range'
-                    )
-                    self.legend.addItem(range_item, 'Acceptable Range')
-                    added_legend_names.add('Acceptable Range')
+            def flat(values):
+                x = [x_pos_map[crm_id] for crm_id in unique_crm_ids for _ in values.get(crm_id, [])]
+                y = [v for crm_id in unique_crm_ids for v in values.get(crm_id, [])]
+                return np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+
+            cert_x, cert_y = flat(certificate_values)
+            samp_x, samp_y = flat(sample_values)
+            range_x, low_y = flat(lower_bounds)
+            _, up_y = flat(upper_bounds)
+            # Range ticks: (low, high) segments drawn as pairs of one item
+            offsets = np.tile([-0.2, 0.2, -0.2, 0.2], len(range_x))
+            self.series_items['Certificate Value'].setData(cert_x, cert_y)
+            self.series_items['Sample Value'].setData(samp_x, samp_y)
+            self.series_items['Acceptable Range'].setData(
+                np.repeat(range_x, 4) + offsets,
+                np.column_stack([low_y, low_y, up_y, up_y]).ravel()
+            )
+            self.legend.clear()
+            for name, item in self.series_items.items():
+                shown = self.series_checks[name].isChecked()
+                item.setVisible(shown)
+                if shown:
+                    self.legend.addItem(item, name)
 
             self.main_plot.showGrid(x=True, y=True, alpha=0.3)
             self.status_label.setText("Plot updated successfully")
+            if self.small_multiples is not None and self.small_multiples.isVisible():
+                self.small_multiples.refresh()
 
         except Exception as e:
-            self.main_plot.clear()
-            self.legend.clear()
+            self.clear_series()
             self.logger.error(f"Failed to update plot: {str(e)}")
             self.status_label.setText(f"Error updating plot: {str(e)}")
             QMessageBox.warning(self, "Error", f"Failed to update plot: {str(e)}")
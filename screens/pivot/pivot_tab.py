@@ -1,13 +1,20 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QMessageBox, QComboBox, QLabel, QFrame, QLineEdit, QCheckBox, QDialog, QHeaderView, QTableView, QScrollArea)
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QMessageBox, QComboBox, QLabel, QFrame, QLineEdit, QCheckBox, QDialog, QHeaderView, QTableView, QScrollArea, QAbstractItemView)
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt
 from .freeze_table_widget import FreezeTableWidget
 from .pivot_table_model import PivotTableModel
 from .pivot_plot_dialog import PivotPlotDialog
+from .run_heatmap import RunHeatmapDialog
 from .crm_manager import CRMManager
 from .pivot_creator import PivotCreator
 from .pivot_exporter import PivotExporter
+from .line_selector import LineSelector
+from .line_agreement import line_agreement, LineAgreementModel
 from .oxide_factors import oxide_factors
+from utils.element_registry import ElementRegistry
+from utils.replicates import HIGH_RSD
+from utils.undo import Edit, column_delta, apply_deltas, delta_size
+from utils.provenance import PROVENANCE_COLUMN, PARAMETERS_ATTR, CRM_SCALE, FLAG_NAMES, ensure_provenance, mark, record_parameters, lineage, parameters
 import pandas as pd
 import logging
 import numpy as np
@@ -97,11 +104,16 @@ class PivotTab(QWidget):
         self.app = app
         self.parent_frame = parent_frame
         self.pivot_data = None
+        self.uncertainty_data = None
+        self.current_view_uncertainty = None
+        self.replicate_data = None
+        self.current_view_replicates = None
         self.solution_label_order = None
         self.element_order = None
         self.row_filter_values = {}
         self.column_filter_values = {}
         self.original_df = None
+        self.element_registry = ElementRegistry()
         self.column_widths = {}
         self.cached_formatted = {}
         self.current_view_df = None
@@ -109,12 +121,18 @@ class PivotTab(QWidget):
         self._inline_crm_rows_display = {}
         self._crm_inserted_for_index = set()
         self.current_plot_dialog = None
+        self.heatmap_dialog = None
         self.search_var = QLineEdit()
         self.row_filter_field = QComboBox()
         self.column_filter_field = QComboBox()
         self.decimal_places = QComboBox()
         self.use_int_var = QCheckBox("Use Int")
         self.use_oxide_var = QCheckBox("Use Oxide")
+        self.replicate_var = QCheckBox("Replicates")
+        self.rsd_limit = QLineEdit(f"{HIGH_RSD:g}")
+        self.best_line_var = QCheckBox("Best Line")
+        self.line_agreement_var = QCheckBox("Line Agreement")
+        self.line_tolerance = QLineEdit("10")
         self.diff_min = QLineEdit("-12")
         self.diff_max = QLineEdit("12")
         self.show_check_crm = QCheckBox("Show Check CRM", checked=True)
@@ -126,6 +144,7 @@ class PivotTab(QWidget):
         self.crm_manager = CRMManager(self)
         self.pivot_creator = PivotCreator(self)
         self.pivot_exporter = PivotExporter(self)
+        self.line_selector = LineSelector(self)
         self.setup_ui()
 
     def setup_ui(self):
@@ -145,6 +164,27 @@ class PivotTab(QWidget):
         
         self.use_oxide_var.toggled.connect(self.pivot_creator.create_pivot)
         control_layout.addWidget(self.use_oxide_var)
+
+        self.replicate_var.setToolTip("Average repeated measurements of a label/element and show their SD, RSD and count")
+        self.replicate_var.toggled.connect(self.pivot_creator.create_pivot)
+        control_layout.addWidget(self.replicate_var)
+        control_layout.addWidget(QLabel("Max RSD (%):"))
+        self.rsd_limit.setFixedWidth(40)
+        self.rsd_limit.setToolTip("Replicate cells with a higher RSD are highlighted")
+        self.rsd_limit.textChanged.connect(self.update_pivot_display)
+        control_layout.addWidget(self.rsd_limit)
+
+        self.best_line_var.setToolTip("Show only the best-scoring wavelength of each element (CRM recovery, R², blank, RSD)")
+        self.best_line_var.toggled.connect(self.update_pivot_display)
+        control_layout.addWidget(self.best_line_var)
+
+        self.line_agreement_var.setToolTip("Flag samples whose wavelengths of one element disagree by more than the tolerance")
+        self.line_agreement_var.toggled.connect(self.update_line_agreement)
+        control_layout.addWidget(self.line_agreement_var)
+        control_layout.addWidget(QLabel("Line Tol (%):"))
+        self.line_tolerance.setFixedWidth(40)
+        self.line_tolerance.textChanged.connect(self.update_line_agreement)
+        control_layout.addWidget(self.line_tolerance)
         
         control_layout.addWidget(QLabel("Diff Range (%):"))
         self.diff_min.textChanged.connect(self.validate_diff_range)
@@ -156,6 +196,11 @@ class PivotTab(QWidget):
         plot_btn = QPushButton("Show Plot")
         plot_btn.clicked.connect(self.show_element_plot)
         control_layout.addWidget(plot_btn)
+
+        heatmap_btn = QPushButton("Heatmap")
+        heatmap_btn.setToolTip("Whole pivot as one image in run order; click a pixel to jump to the cell")
+        heatmap_btn.clicked.connect(self.show_heatmap)
+        control_layout.addWidget(heatmap_btn)
         
         self.search_var.setPlaceholderText("Search...")
         self.search_var.textChanged.connect(self.update_pivot_display)
@@ -180,6 +225,19 @@ class PivotTab(QWidget):
         export_btn = QPushButton("Export")
         export_btn.clicked.connect(self.pivot_exporter.export_pivot)
         control_layout.addWidget(export_btn)
+
+        export_data_btn = QPushButton("Export Data")
+        export_data_btn.setToolTip("Export as Parquet/Arrow/CSV with CRM and Diff as columns")
+        export_data_btn.clicked.connect(self.pivot_exporter.export_columnar)
+        control_layout.addWidget(export_data_btn)
+
+        self.undo_btn = QPushButton("Undo")
+        self.undo_btn.clicked.connect(self.app.undo)
+        control_layout.addWidget(self.undo_btn)
+
+        self.redo_btn = QPushButton("Redo")
+        self.redo_btn.clicked.connect(self.app.redo)
+        control_layout.addWidget(self.redo_btn)
         
         layout.addWidget(control_frame)
         
@@ -190,6 +248,21 @@ class PivotTab(QWidget):
         self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         self.table_view.doubleClicked.connect(self.on_cell_double_click)
         layout.addWidget(self.table_view)
+
+        # Inter-wavelength agreement heatmap, shown with the Line Agreement option
+        self.agreement_panel = QFrame()
+        agreement_layout = QVBoxLayout(self.agreement_panel)
+        agreement_layout.setContentsMargins(0, 0, 0, 0)
+        self.agreement_label = QLabel("")
+        self.agreement_label.setFont(QFont("Segoe UI", 11))
+        agreement_layout.addWidget(self.agreement_label)
+        self.agreement_view = QTableView()
+        self.agreement_view.setModel(LineAgreementModel())
+        self.agreement_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.agreement_view.setMaximumHeight(220)
+        agreement_layout.addWidget(self.agreement_view)
+        self.agreement_panel.setVisible(False)
+        layout.addWidget(self.agreement_panel)
         
         self.status_label = QLabel("Pivot table will be displayed here.")
         self.status_label.setFont(QFont("Segoe UI", 14))
@@ -259,8 +332,18 @@ class PivotTab(QWidget):
         if len(selected_cols) > 1:
             df = df[selected_cols]
 
+        if self.best_line_var.isChecked():
+            best = set(self.line_selector.best_columns())
+            df = df[[col for col in df.columns if col == 'Solution Label' or col in best]]
+
+        if self.uncertainty_data is not None:
+            self.current_view_uncertainty = self.uncertainty_data.reindex(index=df.index, columns=df.columns[1:]).reset_index(drop=True)
+        else:
+            self.current_view_uncertainty = None
+        self.current_view_replicates = self.view_replicates(df)
         df = df.reset_index(drop=True)
         self.current_view_df = df
+        self.element_registry.set_positions('view', df.columns)
         self.logger.debug(f"Current view data shape: {df.shape}")
 
         self._inline_crm_rows_display = self.crm_manager._build_crm_row_lists_for_columns(list(df.columns))
@@ -279,8 +362,63 @@ class PivotTab(QWidget):
         for col, width in self.column_widths.items():
             if col < len(df.columns):
                 self.table_view.horizontalHeader().resizeSection(col, width)
-        self.status_label.setText("Data loaded successfully")
+        if self.best_line_var.isChecked():
+            self.status_label.setText(f"Best line view: {len(df.columns) - 1} of {len(self.pivot_data.columns) - 1} lines")
+        else:
+            self.status_label.setText("Data loaded successfully")
         self.table_view.viewport().update()
+        self.update_line_agreement()
+        if self.heatmap_dialog is not None and self.heatmap_dialog.isVisible():
+            self.heatmap_dialog.refresh()
+
+    def view_replicates(self, df):
+        """RSD, count and high-RSD flags of the replicate pivot, aligned with the (not yet reset) view rows."""
+        if self.replicate_data is None:
+            return None
+        try:
+            limit = float(self.rsd_limit.text())
+        except ValueError:
+            limit = HIGH_RSD
+        view = {key: frame.reindex(index=df.index, columns=df.columns[1:]).reset_index(drop=True)
+                for key, frame in self.replicate_data.items()}
+        view['high'] = view['rsd'] > limit
+        return view
+
+    def update_line_agreement(self):
+        """Show the spread between the wavelength columns of each multi-line element as a heatmap."""
+        if not self.line_agreement_var.isChecked() or self.pivot_data is None or self.pivot_data.empty:
+            self.agreement_panel.setVisible(False)
+            return
+        try:
+            tolerance = float(self.line_tolerance.text())
+        except ValueError:
+            tolerance = 10.0
+
+        # All wavelength columns of the shown samples, also those hidden by the Best Line view
+        pivot = self.pivot_data
+        if self.current_view_df is not None:
+            pivot = pivot[pivot['Solution Label'].isin(self.current_view_df['Solution Label'])]
+        columns = [col for col in pivot.columns
+                   if col != 'Solution Label' and self.element_registry.info(col).line]
+        values = pivot[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        elements, spread, ratio = line_agreement(values, [self.element_registry.element_of(col) for col in columns])
+        labels = pivot['Solution Label'].to_numpy(dtype=object)
+
+        # Only samples with at least one element measured on two or more lines
+        measured = ~np.isnan(spread).all(axis=1) if spread.shape[1] else np.zeros(len(labels), dtype=bool)
+        spread, ratio, labels = spread[measured], ratio[measured], labels[measured]
+        with np.errstate(invalid='ignore'):
+            flagged = (spread > tolerance).any(axis=1)
+
+        self.agreement_view.setModel(LineAgreementModel(labels, elements, spread, ratio, tolerance))
+        if not elements:
+            self.agreement_label.setText("No element is measured on more than one wavelength.")
+        else:
+            self.agreement_label.setText(
+                f"Line agreement: {int(flagged.sum())} of {len(labels)} samples exceed {tolerance:g}% spread "
+                f"across {len(elements)} multi-line elements"
+            )
+        self.agreement_panel.setVisible(True)
 
     def calculate_dynamic_range(self, value):
         try:
@@ -322,13 +460,12 @@ class PivotTab(QWidget):
                 current_row += 1 + len(crm_data)
 
             solution_label = self.current_view_df.iloc[row]['Solution Label']
-            element = col_name
+            col_info = self.element_registry.info(col_name)
             if self.use_oxide_var.isChecked():
-                for el, (oxide_formula, _) in oxide_factors.items():
-                    if oxide_formula == col_name:
-                        element = el
-                        break
-            cond = (self.original_df['Solution Label'] == solution_label) & (self.original_df['Element'].str.startswith(element))
+                element_names = self.element_registry.raw_names_for(col_info.element)
+            else:
+                element_names = self.element_registry.raw_names_for(col_info.element, col_info.line)
+            cond = (self.original_df['Solution Label'] == solution_label) & (self.original_df['Element'].isin(element_names))
             cond &= (self.original_df['Type'] == 'Samp')
             match = self.original_df[cond]
             if match.empty:
@@ -345,8 +482,11 @@ class PivotTab(QWidget):
                 f"DF: {self.format_value(r.get('DF', 'N/A'))}",
                 f"Concentration: {self.format_value(value)}"
             ]
-            if element.split()[0] in oxide_factors and self.use_oxide_var.isChecked():
-                formula, factor = oxide_factors[element.split()[0]]
+            corrections = lineage(r.get(PROVENANCE_COLUMN, 0), parameters(self.original_df), (solution_label, col_name))
+            info.append(f"Corrections: {len(corrections) or 'none'}")
+            info.extend(f"  {line}" for line in corrections)
+            if col_info.oxide_formula is not None and self.use_oxide_var.isChecked():
+                formula, factor = col_info.oxide_formula, col_info.oxide_factor
                 try:
                     oxide_value = float(value) * factor
                     info.extend([f"Oxide Formula: {formula}", f"Oxide %: {self.format_value(oxide_value)}"])
@@ -384,14 +524,99 @@ class PivotTab(QWidget):
         dialog = FilterDialog(self, "Column Filter", is_row_filter=False)
         dialog.exec()
 
+    def update_undo_buttons(self, stack):
+        self.undo_btn.setEnabled(stack.can_undo())
+        self.undo_btn.setToolTip(f"Undo {stack.undo_text()} (Ctrl+Z)" if stack.can_undo() else "Nothing to undo")
+        self.redo_btn.setEnabled(stack.can_redo())
+        self.redo_btn.setToolTip(f"Redo {stack.redo_text()} (Ctrl+Y)" if stack.can_redo() else "Nothing to redo")
+
+    def record_edit(self, description, changes, stage_change=None):
+        """Push an in-place correction on the undo stack as column deltas.
+
+        changes: (attribute, column, values before the edit) for pivot_data / original_df; a
+        None column stands for the frame's correction-parameter table. stage_change is an
+        optional (stage, parameters before, parameters after) of the Process pipeline.
+        Only the changed rows are kept; rebuilding the pivot discards these edits (discard_edits).
+        """
+        targets = []
+        tables = []
+        for attr, column, before in changes:
+            frame = getattr(self, attr)
+            if column is None:
+                tables.append((attr, frame, before, dict(parameters(frame))))
+                continue
+            delta = column_delta(column, before, frame[column].to_numpy())
+            if delta is not None:
+                targets.append((attr, frame, delta))
+
+        def run(undo):
+            frames = [(attr, frame) for attr, frame, _ in targets] + [(attr, frame) for attr, frame, _, _ in tables]
+            for attr, frame in frames:
+                if getattr(self, attr) is not frame:
+                    raise ValueError("The pivot table was rebuilt since this correction")
+            for attr, frame, delta in targets:
+                apply_deltas(frame, [delta], undo)
+            for attr, frame, before, after in tables:
+                frame.attrs[PARAMETERS_ATTR] = before if undo else after
+            if stage_change is not None:
+                name, before, after = stage_change
+                self.app.set_stage_params(name, before if undo else after)
+            self.line_selector.invalidate()
+            self.update_pivot_display()
+            if self.current_plot_dialog:
+                self.current_plot_dialog.update_plot()
+
+        cells = delta_size([delta for _, _, delta in targets]) + len(tables) + (stage_change is not None)
+        self.app.undo_stack.push(Edit(description, lambda: run(True), lambda: run(False), cells, source='pivot'))
+
+    def discard_edits(self):
+        """The pivot was rebuilt or cleared: its corrections can no longer be undone."""
+        self.app.undo_stack.discard('pivot')
+
+    def mark_crm_correction(self, column, params):
+        """Set the CRM Scale bit on the sample rows behind a pivot column and record its parameters.
+
+        The pivot's long data is marked for the cell details, and the pipeline's CRM Scale stage
+        gets the parameters so the application data and its exports carry the bit too.
+        Returns (changes, stage change) for record_edit; ([], None) without long data or for a
+        column that is not an element column.
+        """
+        info = self.element_registry.info(column)
+        if self.original_df is None or self.original_df.empty or info is None:
+            return [], None
+        ensure_provenance(self.original_df)
+        before_bits = self.original_df[PROVENANCE_COLUMN].to_numpy(copy=True)
+        before_table = dict(parameters(self.original_df))
+        line = None if self.use_oxide_var.isChecked() else info.line
+        names = list(self.element_registry.raw_names_for(info.element, line))
+        rows = self.original_df['Element'].isin(names) & self.original_df['Type'].isin(['Samp', 'Sample'])
+        mark(self.original_df, rows, CRM_SCALE)
+        entry = {**params, 'elements': names}
+        scales = {**parameters(self.original_df).get(FLAG_NAMES[CRM_SCALE], {}), column: entry}
+        record_parameters(self.original_df, CRM_SCALE, scales)
+
+        stage = FLAG_NAMES[CRM_SCALE]
+        stage_before = self.app.stage_params(stage)
+        stage_after = {**(stage_before or {}), column: entry}
+        self.app.set_stage_params(stage, stage_after)
+        changes = [('original_df', PROVENANCE_COLUMN, before_bits), ('original_df', None, before_table)]
+        return changes, (stage, stage_before, stage_after)
+
     def reset_cache(self):
         self.logger.debug("Resetting PivotTab cache")
         self.pivot_data = None
+        self.uncertainty_data = None
+        self.current_view_uncertainty = None
+        self.replicate_data = None
+        self.current_view_replicates = None
         self.solution_label_order = None
         self.element_order = None
         self.column_widths.clear()
         self.cached_formatted.clear()
         self.original_df = None
+        self.discard_edits()
+        self.element_registry.clear()
+        self.line_selector.invalidate()
         self._inline_crm_rows.clear()
         self._inline_crm_rows_display.clear()
         self.row_filter_values.clear()
@@ -420,4 +645,24 @@ class PivotTab(QWidget):
             self.current_plot_dialog.close()
         annotations = []
         self.current_plot_dialog = PivotPlotDialog(self, annotations)
-        self.current_plot_dialog.show()
\ No newline at end of file
+        self.current_plot_dialog.show()
+
+    def show_heatmap(self):
+        if self.current_view_df is None or self.current_view_df.empty:
+            QMessageBox.warning(self, "Warning", "No data to plot!")
+            return
+        if self.heatmap_dialog is None:
+            self.heatmap_dialog = RunHeatmapDialog(self)
+        self.heatmap_dialog.refresh()
+        self.heatmap_dialog.show()
+        self.heatmap_dialog.raise_()
+
+    def focus_cell(self, row, column):
+        """Select and scroll to a cell of the displayed pivot, given its row in current_view_df."""
+        model = self.table_view.model()
+        if model is None or row >= len(self.current_view_df):
+            return
+        index = model.index(model.model_row(row), column)
+        self.table_view.setCurrentIndex(index)
+        self.table_view.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtCenter)
+        self.table_view.setFocus()
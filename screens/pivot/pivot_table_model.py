@@ -11,6 +11,7 @@ class PivotTableModel(QAbstractTableModel):
         self._df = df if df is not None else pd.DataFrame()
         self._crm_rows = crm_rows if crm_rows is not None else []
         self._row_info = []
+        self._pivot_rows = []
         self._column_widths = {}
         self._build_row_info()
 
@@ -23,7 +24,9 @@ class PivotTableModel(QAbstractTableModel):
 
     def _build_row_info(self):
         self._row_info = []
+        self._pivot_rows = []
         for row_idx in range(len(self._df)):
+            self._pivot_rows.append(len(self._row_info))
             self._row_info.append({'type': 'pivot', 'index': row_idx})
             sol_label = self._df.iloc[row_idx]['Solution Label']
             for grp_idx, (sl, cdata) in enumerate(self._crm_rows):
@@ -32,6 +35,10 @@ class PivotTableModel(QAbstractTableModel):
                         self._row_info.append({'type': 'crm', 'group': grp_idx, 'sub': sub})
                     break
 
+    def model_row(self, pivot_row):
+        """Table row of a data row, accounting for the inline CRM rows inserted above it."""
+        return self._pivot_rows[pivot_row]
+
     def rowCount(self, parent=QModelIndex()):
         return len(self._row_info)
 
@@ -92,8 +99,25 @@ class PivotTableModel(QAbstractTableModel):
                 elif tags[col] == "out_range":
                     return QColor("#FFCCCC")
                 return QColor("#E6E6FA")
+            replicates = self.pivot_tab.current_view_replicates
+            if replicates is not None and col_name in replicates['high'].columns and replicates['high'].iloc[pivot_row][col_name]:
+                return QColor("#FFE0B2")
             return QColor("#f9f9f9") if pivot_row % 2 == 0 else QColor("white")
 
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            uncertainty = self.pivot_tab.current_view_uncertainty
+            if is_crm_row or is_diff_row or uncertainty is None or col_name not in uncertainty.columns:
+                return None
+            sd = uncertainty.iloc[pivot_row][col_name]
+            value = pd.to_numeric(self._df.iloc[pivot_row, col], errors='coerce')
+            if pd.isna(sd) or pd.isna(value):
+                return None
+            dec = int(self.pivot_tab.decimal_places.currentText())
+            rsd = f" ({sd / abs(value) * 100:.1f}% RSD)" if value != 0 else ""
+            replicates = self.pivot_tab.current_view_replicates
+            count = f", n={int(replicates['count'].iloc[pivot_row][col_name])}" if replicates is not None and col_name in replicates['count'].columns else ""
+            return f"{value:.{dec}f} ± {sd:.{dec}f}{rsd}{count}"
+
         elif role == Qt.ItemDataRole.TextAlignmentRole:
             return Qt.AlignmentFlag.AlignLeft if col_name == "Solution Label" else Qt.AlignmentFlag.AlignCenter
 
@@ -1,13 +1,188 @@
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTextEdit, QCheckBox, QScrollArea, QWidget, QLabel, QMessageBox
 from PyQt6.QtGui import QGuiApplication
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
 import re
+import time
+import hashlib
+import threading
 import numpy as np
 from scipy.optimize import differential_evolution
 from scipy.special import huber
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import logging
 
+logger = logging.getLogger(__name__)
+
+# Default bound on the scale correction (fraction) explored by the optimizations
+MAX_CORRECTION = 0.3
+# Decision analyses kept, most recently used last
+DECISION_CACHE_SIZE = 32
+_decision_cache = OrderedDict()
+_decision_cache_lock = threading.Lock()
+# Analyses still running after their dialog closed, referenced until they finish
+_running_threads = set()
+
+
+def decision_fingerprint(crm_data, max_corr):
+    """Hash of the CRM values the optimizations read, plus the scale bound."""
+    values = np.array([[d['cert_val'], d['sample_val'], d['lower'], d['upper'], d['blank_val']] for d in crm_data], dtype=np.float64)
+    digest = hashlib.sha1(values.tobytes())
+    digest.update("\x1f".join(str(d['id']) for d in crm_data).encode())
+    digest.update(repr(float(max_corr)).encode())
+    return digest.hexdigest()
+
+
+def cached_decisions(key):
+    with _decision_cache_lock:
+        decisions = _decision_cache.get(key)
+        if decisions is not None:
+            _decision_cache.move_to_end(key)
+        return decisions
+
+
+def remember_decisions(key, decisions):
+    with _decision_cache_lock:
+        _decision_cache[key] = decisions
+        _decision_cache.move_to_end(key)
+        while len(_decision_cache) > DECISION_CACHE_SIZE:
+            _decision_cache.popitem(last=False)
+
+
+def range_distances(crm_data, blank_adjust, scale):
+    """In-range count and distance of each adjusted value to its acceptable range."""
+    distances = []
+    in_range = 0
+    for d in crm_data:
+        adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust) * scale
+        if d['lower'] <= adjusted_val <= d['upper']:
+            in_range += 1
+            distances.append(0)
+        else:
+            distances.append(min(abs(adjusted_val - d['lower']), abs(adjusted_val - d['upper'])))
+    return in_range, distances
+
+
+def optimize_decisions(crm_data, max_corr=MAX_CORRECTION):
+    """Run the differential_evolution optimizations of the decision analysis.
+
+    Returns the Condition 2 blank adjustment and, per model (A, B, C), either its
+    {'blank', 'scale', 'in_range', 'avg_distance'} result, {'failed': True} or {'error': message}.
+    Only depends on crm_data and max_corr, so the result can be cached by their fingerprint.
+    """
+    total = len(crm_data)
+    in_range_with_blank = sum(d['lower'] <= (d['sample_val'] - d['blank_val']) <= d['upper'] for d in crm_data)
+
+    # Condition 2: Try dynamic blank adjustment
+    def objective_cond2(p):
+        adjust = p[0]
+        in_range = sum(d['lower'] <= (d['sample_val'] - d['blank_val'] + adjust) <= d['upper'] for d in crm_data)
+        return -in_range
+
+    max_val = max([abs(d['sample_val']) for d in crm_data] + [abs(d['blank_val']) for d in crm_data] + [1])
+    adjust_bounds = [(-10 * max_val, 10 * max_val)]
+
+    try:
+        res_cond2 = differential_evolution(objective_cond2, adjust_bounds)
+        best_blank_adjust = res_cond2.x[0] if res_cond2.success else 0
+        best_in_range = -res_cond2.fun if res_cond2.success else in_range_with_blank
+    except Exception as e:
+        logger.error(f"Error in Condition 2 optimization: {str(e)}")
+        best_blank_adjust = 0
+        best_in_range = in_range_with_blank
+
+    # Compute bounds for optimization
+    avg_cert = np.mean([d['cert_val'] for d in crm_data])
+    max_val = max([abs(d['sample_val']) for d in crm_data] + [abs(d['blank_val']) for d in crm_data] + [abs(avg_cert), 1])
+    blank_bounds_wide = (-10 * max_val, 10 * max_val)
+    scale_bounds = (1 - max_corr, 1 + max_corr)
+    mean_abs_sample = np.mean([abs(d['sample_val']) for d in crm_data])
+
+    # Model 1: Maximize in-range count
+    def objective_a(params):
+        blank_adjust, scale = params
+        in_range_count = 0
+        for d in crm_data:
+            adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust) * scale
+            if d['lower'] <= adjusted_val <= d['upper']:
+                in_range_count += 1
+        reg = 10 * abs(scale - 1)
+        return -in_range_count + reg / total
+
+    # Model 2: Minimize distances with Huber loss
+    def objective_b(params):
+        blank_adjust, scale = params
+        total_distance = 0.0
+        for d in crm_data:
+            adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust) * scale
+            if adjusted_val < d['lower']:
+                dist = d['lower'] - adjusted_val
+            elif adjusted_val > d['upper']:
+                dist = adjusted_val - d['upper']
+            else:
+                dist = 0.0
+            total_distance += huber(1.0, dist)
+        reg = 0.1 * (abs(scale - 1) * mean_abs_sample)
+        return (total_distance / total) + reg
+
+    # Model 3: Minimize sum of squared errors
+    def objective_c(params):
+        blank_adjust, scale = params
+        total_sse = 0.0
+        for d in crm_data:
+            adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust) * scale
+            total_sse += (adjusted_val - d['cert_val']) ** 2
+        reg = 0.1 * (abs(scale - 1) * mean_abs_sample)
+        return (total_sse / total) + reg
+
+    models = {}
+    for name, objective in (('A', objective_a), ('B', objective_b), ('C', objective_c)):
+        try:
+            res = differential_evolution(objective, [blank_bounds_wide, scale_bounds])
+            if not res.success:
+                logger.warning(f"Model {name} optimization failed")
+                models[name] = {'failed': True}
+                continue
+            blank_adjust, scale = res.x
+            in_range, distances = range_distances(crm_data, blank_adjust, scale)
+            # Prefer a blank-only correction when it does at least as well
+            res_blank = differential_evolution(lambda p: objective([p[0], 1]), [blank_bounds_wide])
+            if res_blank.success:
+                in_range_blank, distances_blank = range_distances(crm_data, res_blank.x[0], 1)
+                if in_range_blank > in_range or (in_range_blank == in_range and in_range_blank / total >= 0.75):
+                    blank_adjust, scale = res_blank.x[0], 1.0
+                    in_range, distances = in_range_blank, distances_blank
+            models[name] = {'blank': blank_adjust, 'scale': scale, 'in_range': in_range, 'avg_distance': np.mean(distances)}
+        except Exception as e:
+            logger.error(f"Error in Model {name} optimization: {str(e)}")
+            models[name] = {'error': str(e)}
+
+    return {'best_blank_adjust': best_blank_adjust, 'best_in_range': best_in_range, 'models': models}
+
+
+class DecisionAnalysisThread(QThread):
+    """Thread for running the decision-analysis optimizations in the background."""
+    # QThread.finished is kept for the thread's own cleanup
+    analysis_ready = pyqtSignal(str, object)
+    analysis_failed = pyqtSignal(str, str)
+
+    def __init__(self, key, crm_data, max_corr):
+        super().__init__()
+        self.key = key
+        self.crm_data = crm_data
+        self.max_corr = max_corr
+
+    def run(self):
+        try:
+            start_time = time.time()
+            decisions = optimize_decisions(self.crm_data, self.max_corr)
+            remember_decisions(self.key, decisions)
+            logger.debug(f"Decision analysis of {len(self.crm_data)} CRMs took {time.time() - start_time:.2f} seconds")
+            self.analysis_ready.emit(self.key, decisions)
+        except Exception as e:
+            logger.error(f"Decision analysis failed: {str(e)}")
+            self.analysis_failed.emit(self.key, str(e))
+
+
 class ReportDialog(QDialog):
     """Dialog to display table-based CRM analysis report with scrollable column visibility toggles and textual decision analysis."""
     def __init__(self, parent, annotations):
@@ -48,6 +223,11 @@ class ReportDialog(QDialog):
             'recommended_avg_distance': "N/A",
             'final_decision': "Calculating..."
         }
+        self.max_corr = MAX_CORRECTION
+        self.crm_data = []
+        # Fingerprint of crm_data whose optimizations are not cached yet
+        self.pending_key = None
+        self.decision_thread = None
         
         self.setup_ui()
         self.logger.debug(f"Initialized ReportDialog with {len(annotations)} annotations")
@@ -119,6 +299,60 @@ class ReportDialog(QDialog):
             self.logger.error(f"Error updating report: {str(e)}")
             QMessageBox.warning(self, "Error", f"Failed to update report: {str(e)}")
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.start_decision_analysis()
+
+    def done(self, result):
+        self.release_decision_thread()
+        super().done(result)
+
+    def release_decision_thread(self):
+        """Let a running analysis finish into the cache without updating this dialog."""
+        thread = self.decision_thread
+        if thread is None:
+            return
+        thread.analysis_ready.disconnect(self.on_decisions_ready)
+        thread.analysis_failed.disconnect(self.on_decisions_error)
+        self.decision_thread = None
+        if not thread.isFinished():
+            _running_threads.add(thread)
+            thread.finished.connect(lambda: _running_threads.discard(thread))
+
+    def start_decision_analysis(self):
+        """Run the optimizations of the pending crm_data in the background, once per fingerprint."""
+        if self.pending_key is None:
+            return
+        if self.decision_thread is not None:
+            if self.decision_thread.key == self.pending_key:
+                return
+            self.release_decision_thread()
+        self.decision_thread = DecisionAnalysisThread(self.pending_key, list(self.crm_data), self.max_corr)
+        self.decision_thread.analysis_ready.connect(self.on_decisions_ready)
+        self.decision_thread.analysis_failed.connect(self.on_decisions_error)
+        self.decision_thread.start()
+
+    def on_decisions_ready(self, key, decisions):
+        self.release_decision_thread()
+        if key == self.pending_key:
+            # Cache hit now: only the HTML is rebuilt
+            self.generate_html_report()
+
+    def on_decisions_error(self, key, message):
+        self.release_decision_thread()
+        if key == self.pending_key:
+            self.text_edit.append(f"<p>Decision analysis failed: {message}</p>")
+            QMessageBox.warning(self, "Error", f"Decision analysis failed: {message}")
+
+    def decisions_for(self, crm_data):
+        """Optimization results of crm_data from the cache, computed in this thread on a miss."""
+        key = decision_fingerprint(crm_data, self.max_corr)
+        decisions = cached_decisions(key)
+        if decisions is None:
+            decisions = optimize_decisions(crm_data, self.max_corr)
+            remember_decisions(key, decisions)
+        return decisions
+
     def is_numeric(self, value):
         """Check if a value is numeric."""
         try:
@@ -292,8 +526,18 @@ class ReportDialog(QDialog):
             
             html += "</table>"
             
-            # Add textual decision analysis section
-            html += self.generate_decision_analysis(crm_data)
+            # Add textual decision analysis section; optimizations run in the background on a cache miss
+            self.crm_data = crm_data
+            key = decision_fingerprint(crm_data, self.max_corr) if crm_data else None
+            decisions = cached_decisions(key) if key else None
+            if crm_data and decisions is None:
+                self.pending_key = key
+                html += "<div class='decision-section'><h2>Decision Analysis</h2><p>Running optimizations...</p></div>"
+                if self.isVisible():
+                    self.start_decision_analysis()
+            else:
+                self.pending_key = None
+                html += self.generate_decision_analysis(crm_data, decisions)
             
             html += """
             </body>
@@ -306,12 +550,46 @@ class ReportDialog(QDialog):
             self.text_edit.setHtml(f"<html><body><p>Error generating report: {str(e)}</p></body></html>")
             QMessageBox.warning(self, "Error", f"Failed to generate report: {str(e)}")
 
-    def generate_decision_analysis(self, crm_data):
-        """Generate textual decision analysis based on conditions, line by line, with final professional decision using three models."""
+    def wavelength_condition(self):
+        """Describe the wavelength choice for the plotted element using the pivot's line scores."""
+        default = "Assuming single wavelength. If multiple, select best Soln Conc."
+        plot_dialog = self.parentWidget()
+        pivot_tab = getattr(plot_dialog, 'parent', None)
+        selector = getattr(pivot_tab, 'line_selector', None)
+        column = getattr(plot_dialog, 'selected_element', '')
+        if selector is None or not column:
+            return default
+        try:
+            scores = selector.scores()
+        except Exception as e:
+            self.logger.warning(f"Line scores unavailable: {str(e)}")
+            return default
+        if scores.empty or column not in scores.index:
+            return default
+        element = scores.at[column, 'Element']
+        lines = scores[scores['Element'] == element]
+        if len(lines) <= 1:
+            return f"Single wavelength measured for {element}."
+        best = lines.index[lines['Best']][0]
+        ranked = ", ".join(f"{col} ({score:.2f})" for col, score in lines['Score'].fillna(0).sort_values(ascending=False).items())
+        if best == column:
+            return f"{len(lines)} wavelengths for {element}; {column} is the best-scoring line. Scores: {ranked}."
+        return f"{len(lines)} wavelengths for {element}; best-scoring line is {best}, not {column}. Scores: {ranked}."
+
+    def generate_decision_analysis(self, crm_data, decisions=None):
+        """Generate textual decision analysis based on conditions, line by line, with final professional decision using three models.
+
+        The optimization results come from the decision cache, or are computed here when not given.
+        """
         if not crm_data:
             self.logger.warning("No sufficient data for decision analysis")
             self.decision_data['final_decision'] = "No sufficient data for analysis."
             return "<div class='decision-section'><h2>Decision Analysis</h2><p>No sufficient data for analysis.</p></div>"
+        if decisions is None:
+            decisions = self.decisions_for(crm_data)
+        max_corr = self.max_corr
+        best_blank_adjust = decisions['best_blank_adjust']
+        best_in_range = decisions['best_in_range']
         
         analysis_html = "<div class='decision-section'><h2>Decision Analysis</h2><ul>"
         
@@ -324,24 +602,7 @@ class ReportDialog(QDialog):
         else:
             analysis_html += "Insufficient; consider additional adjustments.</li>"
         
-        # Condition 2: Try dynamic blank adjustment
-        def objective_cond2(p):
-            adjust = p[0]
-            in_range = sum(d['lower'] <= (d['sample_val'] - d['blank_val'] + adjust) <= d['upper'] for d in crm_data)
-            return -in_range
-        
-        max_val = max([abs(d['sample_val']) for d in crm_data] + [abs(d['blank_val']) for d in crm_data] + [1])
-        adjust_bounds = [(-10 * max_val, 10 * max_val)]
-        
-        try:
-            res_cond2 = differential_evolution(objective_cond2, adjust_bounds)
-            best_blank_adjust = res_cond2.x[0] if res_cond2.success else 0
-            best_in_range = -res_cond2.fun if res_cond2.success else in_range_with_blank
-        except Exception as e:
-            self.logger.error(f"Error in Condition 2 optimization: {str(e)}")
-            best_blank_adjust = 0
-            best_in_range = in_range_with_blank
-        
+        # Condition 2: Dynamic blank adjustment (optimized in optimize_decisions)
         analysis_html += f"<li>Condition 2: Adjusting blank by {best_blank_adjust:.3f}, achieves {best_in_range}/{total} in range. "
         if best_in_range / total >= 0.75:
             analysis_html += "No scaling needed; apply this blank adjustment globally.</li>"
@@ -384,10 +645,9 @@ class ReportDialog(QDialog):
             analysis_html += "Uniform magnitude; global adjustment safe.</li>"
         
         # Condition 6: Multiple wavelengths
-        analysis_html += "<li>Condition 6: Assuming single wavelength. If multiple, select best Soln Conc.</li>"
+        analysis_html += f"<li>Condition 6: {self.wavelength_condition()}</li>"
         
         # Condition 7: Average scaling
-        max_corr = 0.3
         possible_scales = [d['cert_val'] / d['sample_val'] if d['sample_val'] != 0 else 1 for d in crm_data]
         possible_scales = [s for s in possible_scales if 1 - max_corr <= s <= 1 + max_corr]
         if possible_scales:
@@ -402,185 +662,29 @@ class ReportDialog(QDialog):
         
         analysis_html += "</ul>"
         
-        # Compute bounds for optimization
-        avg_cert = np.mean([d['cert_val'] for d in crm_data])
-        max_val = max([abs(d['sample_val']) for d in crm_data] + [abs(d['blank_val']) for d in crm_data] + [abs(avg_cert), 1])
-        blank_bounds_wide = (-10 * max_val, 10 * max_val)
-        scale_bounds = (1 - max_corr, 1 + max_corr)
-        
-        # Model 1: Maximize in-range count
-        def objective_a(params):
-            blank_adjust, scale = params
-            in_range_count = 0
-            for d in crm_data:
-                adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust) * scale
-                if d['lower'] <= adjusted_val <= d['upper']:
-                    in_range_count += 1
-            reg = 10 * abs(scale - 1)
-            return -in_range_count + reg / total
-        
-        bounds_a = [blank_bounds_wide, scale_bounds]
-        
-        try:
-            res_a = differential_evolution(objective_a, bounds_a)
-            if res_a.success:
-                blank_adjust_a, scale_a = res_a.x
-                in_range_after_a = 0
-                for d in crm_data:
-                    adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust_a) * scale_a
-                    if d['lower'] <= adjusted_val <= d['upper']:
-                        in_range_after_a += 1
-                def objective_blank_a(p):
-                    return objective_a([p[0], 1])
-                res_blank_a = differential_evolution(objective_blank_a, [blank_bounds_wide])
-                if res_blank_a.success:
-                    blank_adjust_blank_a = res_blank_a.x[0]
-                    in_range_blank_a = 0
-                    for d in crm_data:
-                        adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust_blank_a) * 1
-                        if d['lower'] <= adjusted_val <= d['upper']:
-                            in_range_blank_a += 1
-                    if in_range_blank_a > in_range_after_a or (in_range_blank_a == in_range_after_a and in_range_blank_a / total >= 0.75):
-                        blank_adjust_a = blank_adjust_blank_a
-                        scale_a = 1.0
-                        in_range_after_a = in_range_blank_a
-                analysis_html += f'<div class="model-comparison"><strong>Model A (In-Range Maximization):</strong> Blank adjust: {blank_adjust_a:.3f}, Scale: {scale_a:.3f}, In-range: {in_range_after_a}/{total}.</div>'
-            else:
-                analysis_html += '<div class="model-comparison"><strong>Model A:</strong> Optimization failed.</div>'
-                self.logger.warning("Model A optimization failed")
-        except Exception as e:
-            analysis_html += f'<div class="model-comparison"><strong>Model A:</strong> Error: {str(e)}.</div>'
-            self.logger.error(f"Error in Model A optimization: {str(e)}")
-        
-        # Model 2: Minimize distances with Huber loss
-        def objective_b(params):
-            blank_adjust, scale = params
-            total_distance = 0.0
-            for d in crm_data:
-                adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust) * scale
-                if adjusted_val < d['lower']:
-                    dist = d['lower'] - adjusted_val
-                elif adjusted_val > d['upper']:
-                    dist = adjusted_val - d['upper']
-                else:
-                    dist = 0.0
-                total_distance += huber(1.0, dist)
-            reg = 0.1 * (abs(scale - 1) * np.mean([abs(d['sample_val']) for d in crm_data]))
-            return (total_distance / total) + reg
-        
-        bounds_b = [blank_bounds_wide, scale_bounds]
-        
-        try:
-            res_b = differential_evolution(objective_b, bounds_b)
-            if res_b.success:
-                blank_adjust_b, scale_b = res_b.x
-                distances_b = []
-                in_range_after_b = 0
-                for d in crm_data:
-                    adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust_b) * scale_b
-                    if d['lower'] <= adjusted_val <= d['upper']:
-                        in_range_after_b += 1
-                        distances_b.append(0)
-                    else:
-                        dist = min(abs(adjusted_val - d['lower']), abs(adjusted_val - d['upper']))
-                        distances_b.append(dist)
-                avg_distance_b = np.mean(distances_b)
-                def objective_blank_b(p):
-                    return objective_b([p[0], 1])
-                res_blank_b = differential_evolution(objective_blank_b, [blank_bounds_wide])
-                if res_blank_b.success:
-                    blank_adjust_blank_b = res_blank_b.x[0]
-                    distances_blank_b = []
-                    in_range_blank_b = 0
-                    for d in crm_data:
-                        adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust_blank_b) * 1
-                        if d['lower'] <= adjusted_val <= d['upper']:
-                            in_range_blank_b += 1
-                            distances_blank_b.append(0)
-                        else:
-                            dist = min(abs(adjusted_val - d['lower']), abs(adjusted_val - d['upper']))
-                            distances_blank_b.append(dist)
-                    avg_distance_blank_b = np.mean(distances_blank_b)
-                    if in_range_blank_b > in_range_after_b or (in_range_blank_b == in_range_after_b and in_range_blank_b / total >= 0.75):
-                        blank_adjust_b = blank_adjust_blank_b
-                        scale_b = 1.0
-                        in_range_after_b = in_range_blank_b
-                        avg_distance_b = avg_distance_blank_b
-                analysis_html += f'<div class="model-comparison"><strong>Model B (Distance Minimization):</strong> Blank adjust: {blank_adjust_b:.3f}, Scale: {scale_b:.3f}, In-range: {in_range_after_b}/{total}, Avg distance: {avg_distance_b:.3f}.</div>'
+        for name, title in (('A', 'Model A (In-Range Maximization)'), ('B', 'Model B (Distance Minimization)'), ('C', 'Model C (SSE Minimization to Cert Val)')):
+            result = decisions['models'].get(name, {})
+            if 'error' in result:
+                analysis_html += f'<div class="model-comparison"><strong>Model {name}:</strong> Error: {result["error"]}.</div>'
+            elif 'in_range' not in result:
+                analysis_html += f'<div class="model-comparison"><strong>Model {name}:</strong> Optimization failed.</div>'
+            elif name == 'A':
+                analysis_html += f'<div class="model-comparison"><strong>{title}:</strong> Blank adjust: {result["blank"]:.3f}, Scale: {result["scale"]:.3f}, In-range: {result["in_range"]}/{total}.</div>'
             else:
-                analysis_html += '<div class="model-comparison"><strong>Model B:</strong> Optimization failed.</div>'
-                self.logger.warning("Model B optimization failed")
-        except Exception as e:
-            analysis_html += f'<div class="model-comparison"><strong>Model B:</strong> Error: {str(e)}.</div>'
-            self.logger.error(f"Error in Model B optimization: {str(e)}")
-
-        # Model 3: Minimize sum of squared errors
-        def objective_c(params):
-            blank_adjust, scale = params
-            total_sse = 0.0
-            for d in crm_data:
-                adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust) * scale
-                total_sse += (adjusted_val - d['cert_val']) ** 2
-            reg = 0.1 * (abs(scale - 1) * np.mean([abs(d['sample_val']) for d in crm_data]))
-            return (total_sse / total) + reg
-        
-        bounds_c = [blank_bounds_wide, scale_bounds]
-        
-        try:
-            res_c = differential_evolution(objective_c, bounds_c)
-            if res_c.success:
-                blank_adjust_c, scale_c = res_c.x
-                distances_c = []
-                in_range_after_c = 0
-                for d in crm_data:
-                    adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust_c) * scale_c
-                    if d['lower'] <= adjusted_val <= d['upper']:
-                        in_range_after_c += 1
-                        distances_c.append(0)
-                    else:
-                        dist = min(abs(adjusted_val - d['lower']), abs(adjusted_val - d['upper']))
-                        distances_c.append(dist)
-                avg_distance_c = np.mean(distances_c)
-                def objective_blank_c(p):
-                    return objective_c([p[0], 1])
-                res_blank_c = differential_evolution(objective_blank_c, [blank_bounds_wide])
-                if res_blank_c.success:
-                    blank_adjust_blank_c = res_blank_c.x[0]
-                    distances_blank_c = []
-                    in_range_blank_c = 0
-                    for d in crm_data:
-                        adjusted_val = (d['sample_val'] - d['blank_val'] - blank_adjust_blank_c) * 1
-                        if d['lower'] <= adjusted_val <= d['upper']:
-                            in_range_blank_c += 1
-                            distances_blank_c.append(0)
-                        else:
-                            dist = min(abs(adjusted_val - d['lower']), abs(adjusted_val - d['upper']))
-                            distances_blank_c.append(dist)
-                    avg_distance_blank_c = np.mean(distances_blank_c)
-                    if in_range_blank_c > in_range_after_c or (in_range_blank_c == in_range_after_c and in_range_blank_c / total >= 0.75):
-                        blank_adjust_c = blank_adjust_blank_c
-                        scale_c = 1.0
-                        in_range_after_c = in_range_blank_c
-                        avg_distance_c = avg_distance_blank_c
-                analysis_html += f'<div class="model-comparison"><strong>Model C (SSE Minimization to Cert Val):</strong> Blank adjust: {blank_adjust_c:.3f}, Scale: {scale_c:.3f}, In-range: {in_range_after_c}/{total}, Avg distance: {avg_distance_c:.3f}.</div>'
-            else:
-                analysis_html += '<div class="model-comparison"><strong>Model C:</strong> Optimization failed.</div>'
-                self.logger.warning("Model C optimization failed")
-        except Exception as e:
-            analysis_html += f'<div class="model-comparison"><strong>Model C:</strong> Error: {str(e)}.</div>'
-            self.logger.error(f"Error in Model C optimization: {str(e)}")
+                analysis_html += f'<div class="model-comparison"><strong>{title}:</strong> Blank adjust: {result["blank"]:.3f}, Scale: {result["scale"]:.3f}, In-range: {result["in_range"]}/{total}, Avg distance: {result["avg_distance"]:.3f}.</div>'
         
         # Model Comparison and Final Decision
         initial_distances = [0 if d['lower'] <= d['sample_val'] <= d['upper'] else min(abs(d['sample_val'] - d['lower']), abs(d['sample_val'] - d['upper'])) for d in crm_data]
         avg_distance_initial = np.mean(initial_distances)
         
+        results = {name: result for name, result in decisions['models'].items() if 'in_range' in result}
         models = []
-        if 'in_range_after_a' in locals():
-            models.append(('A', in_range_after_a, blank_adjust_a, scale_a, 'N/A' if scale_a == 1 else avg_distance_b if 'avg_distance_b' in locals() else float('inf')))
-        if 'in_range_after_b' in locals():
-            models.append(('B', in_range_after_b, blank_adjust_b, scale_b, avg_distance_b))
-        if 'in_range_after_c' in locals():
-            models.append(('C', in_range_after_c, blank_adjust_c, scale_c, avg_distance_c))
+        if 'A' in results:
+            result_a = results['A']
+            models.append(('A', result_a['in_range'], result_a['blank'], result_a['scale'], 'N/A' if result_a['scale'] == 1 else results['B']['avg_distance'] if 'B' in results else float('inf')))
+        for name in ('B', 'C'):
+            if name in results:
+                models.append((name, results[name]['in_range'], results[name]['blank'], results[name]['scale'], results[name]['avg_distance']))
         
         if models:
             best_model = max(models, key=lambda m: (m[1], -m[4] if isinstance(m[4], float) else float('inf')))
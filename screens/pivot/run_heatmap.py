@@ -0,0 +1,167 @@
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+import pyqtgraph as pg
+import pandas as pd
+import numpy as np
+import logging
+import math
+import time
+
+VALUE = "Value"
+RATIO = "Ratio to Certificate (%)"
+ZSCORE = "Z-score per Element"
+HEATMAP_MODES = [VALUE, RATIO, ZSCORE]
+# Sequential map for raw values, diverging map centred on the target for ratio and z-score
+VALUE_LUT = pg.colormap.get('viridis').getLookupTable(nPts=256)
+DIVERGING_LUT = pg.ColorMap([0.0, 0.5, 1.0], [(33, 102, 172), (247, 247, 247), (178, 24, 43)]).getLookupTable(nPts=256)
+ZSCORE_LEVELS = (-3.0, 3.0)
+
+
+def certificate_rows(pivot_tab, elements):
+    """{label: certificate cell of each element} from the first inline CRM row of every label."""
+    positions = [pivot_tab.element_registry.position('view', element) for element in elements]
+    certificates = {}
+    for label, rows in pivot_tab._inline_crm_rows_display.items():
+        for row_data, _ in rows:
+            if isinstance(row_data, list) and row_data and row_data[0].endswith("CRM"):
+                certificates[label] = [row_data[pos] if pos is not None and pos < len(row_data) else None
+                                       for pos in positions]
+                break
+    return certificates
+
+
+def heatmap_matrix(pivot_tab, mode):
+    """(n_rows, n_elements) float matrix of the displayed pivot in run order, and its colour levels.
+
+    Rows and columns are those of pivot_tab.current_view_df, so a pixel maps straight to a
+    table cell. The ratio is each row's value over the certificate of its label, so it is only
+    defined for CRM labels; other rows are NaN and drawn transparent.
+    """
+    df = pivot_tab.current_view_df
+    elements = [col for col in df.columns if col != 'Solution Label']
+    values = df[elements].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    finite = np.isfinite(values)
+
+    if mode == ZSCORE:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nanmean(np.where(finite, values, np.nan), axis=0)
+            sd = np.nanstd(np.where(finite, values, np.nan), axis=0)
+            matrix = np.where(sd > 0, (values - mean) / sd, 0.0)
+        matrix[~finite] = np.nan
+        return matrix, ZSCORE_LEVELS
+
+    if mode == RATIO:
+        matrix = np.full(values.shape, np.nan)
+        certificates = certificate_rows(pivot_tab, elements)
+        labels = df['Solution Label'].to_numpy(dtype=object)
+        # Every measurement of a CRM in run order gets its own ratio, so drift stays visible
+        rows = np.flatnonzero(pd.Series(labels).isin(certificates).to_numpy())
+        if len(rows):
+            certificate = pd.DataFrame([certificates[labels[i]] for i in rows], columns=elements)
+            certificate = certificate.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+            certificate = certificate.reshape(len(rows), len(elements))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                matrix[rows] = np.where(certificate != 0, values[rows] / certificate * 100, np.nan)
+        try:
+            levels = (100 + float(pivot_tab.diff_min.text()), 100 + float(pivot_tab.diff_max.text()))
+        except ValueError:
+            levels = (88.0, 112.0)
+        return matrix, levels
+
+    matrix = np.where(finite, values, np.nan)
+    if not finite.any():
+        return matrix, (0.0, 1.0)
+    # Robust levels so a few contaminated cells do not wash out the rest of the image
+    low, high = np.nanpercentile(matrix, [1, 99])
+    return matrix, (low, high if high > low else low + 1)
+
+
+class RunHeatmapDialog(QDialog):
+    """Whole label x element matrix as one image, samples in run order top to bottom.
+
+    A single ImageItem with a lookup table draws the matrix in one call; clicking a pixel
+    selects that cell in the pivot table.
+    """
+    def __init__(self, pivot_tab):
+        super().__init__(pivot_tab)
+        self.pivot_tab = pivot_tab
+        self.logger = logging.getLogger(__name__)
+        self.setWindowTitle("Run-Order Heatmap")
+        self.setGeometry(150, 150, 1200, 850)
+        self.setModal(False)
+        self.matrix = np.empty((0, 0))
+        self.labels = []
+        self.elements = []
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("Show:"))
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(HEATMAP_MODES)
+        self.mode_combo.currentTextChanged.connect(self.refresh)
+        control_layout.addWidget(self.mode_combo)
+        self.info_label = QLabel("")
+        control_layout.addWidget(self.info_label)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+        self.plot_widget = pg.PlotWidget()
+        self.plot_widget.setBackground('w')
+        self.plot = self.plot_widget.getPlotItem()
+        self.plot.invertY(True)
+        self.plot.setMenuEnabled(False)
+        self.plot.setLabel('left', 'Run Order')
+        self.image = pg.ImageItem()
+        self.plot.addItem(self.image)
+        self.plot_widget.scene().sigMouseMoved.connect(self.on_mouse_moved)
+        self.plot_widget.scene().sigMouseClicked.connect(self.on_mouse_clicked)
+        layout.addWidget(self.plot_widget)
+
+    def refresh(self):
+        """Rebuild the matrix from the current pivot view and replace the image data."""
+        start_time = time.time()
+        df = self.pivot_tab.current_view_df
+        if df is None or df.empty:
+            self.image.clear()
+            self.info_label.setText("No pivot data")
+            return
+        mode = self.mode_combo.currentText()
+        self.matrix, levels = heatmap_matrix(self.pivot_tab, mode)
+        self.labels = df['Solution Label'].astype(str).tolist()
+        self.elements = [col for col in df.columns if col != 'Solution Label']
+        self.image.setLookupTable(VALUE_LUT if mode == VALUE else DIVERGING_LUT)
+        # ImageItem indexes [x, y]: elements across, rows down
+        self.image.setImage(self.matrix.T, levels=levels, autoLevels=False)
+        self.plot.getAxis('bottom').setTicks([[(j + 0.5, element) for j, element in enumerate(self.elements)]])
+        self.plot.setXRange(0, len(self.elements), padding=0)
+        self.plot.setYRange(0, len(self.labels), padding=0)
+        self.info_label.setText(f"{len(self.labels)} rows x {len(self.elements)} elements, levels {levels[0]:.3g} to {levels[1]:.3g}")
+        self.logger.debug(f"Heatmap of {self.matrix.shape} built in {time.time() - start_time:.3f} seconds")
+
+    def cell_at(self, scene_pos):
+        """(row, element column) under a scene position, or None outside the image."""
+        if not self.plot.sceneBoundingRect().contains(scene_pos):
+            return None
+        point = self.plot.vb.mapSceneToView(scene_pos)
+        row, col = math.floor(point.y()), math.floor(point.x())
+        if 0 <= row < self.matrix.shape[0] and 0 <= col < self.matrix.shape[1]:
+            return row, col
+        return None
+
+    def on_mouse_moved(self, pos):
+        cell = self.cell_at(pos)
+        if cell is None:
+            return
+        row, col = cell
+        value = self.matrix[row, col]
+        text = "" if np.isnan(value) else f"{value:.4g}"
+        self.plot_widget.setToolTip(f"{self.labels[row]} / {self.elements[col]}: {text}")
+
+    def on_mouse_clicked(self, event):
+        cell = self.cell_at(event.scenePos())
+        if cell is None:
+            return
+        row, col = cell
+        # Column 0 of the table is the Solution Label
+        self.pivot_tab.focus_cell(row, col + 1)
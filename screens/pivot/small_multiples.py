@@ -0,0 +1,147 @@
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QSpinBox, QScrollArea
+from PyQt6.QtCore import Qt
+import pyqtgraph as pg
+import pandas as pd
+import numpy as np
+import logging
+import math
+import time
+
+# Height of one element plot in the grid (px)
+CELL_HEIGHT = 170
+IN_RANGE_BRUSH = pg.mkBrush('#2e7d32')
+OUT_RANGE_BRUSH = pg.mkBrush('#d32f2f')
+
+
+def verification_matrix(pivot_tab, labels, elements):
+    """Certificate, sample and acceptable-range arrays of every CRM row x element.
+
+    One row per inline CRM row of the given labels; values are gathered column-wise from the
+    pivot and the CRM rows, so all elements are computed at once. Returns a dict of
+    (n_rows, n_elements) float arrays plus the row labels.
+    """
+    rows = [(label, row_data) for label in labels
+            for row_data, _ in pivot_tab._inline_crm_rows_display.get(label, [])
+            if isinstance(row_data, list) and row_data and row_data[0].endswith("CRM")]
+    row_labels = [label for label, _ in rows]
+
+    pivot = pivot_tab.pivot_data.drop_duplicates('Solution Label').set_index('Solution Label')
+    sample = pivot.reindex(row_labels)[elements].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+    positions = [pivot_tab.element_registry.position('view', element) for element in elements]
+    certificate_cells = [
+        [row_data[pos] if pos is not None and pos < len(row_data) else None for pos in positions]
+        for _, row_data in rows
+    ]
+    certificate = pd.DataFrame(certificate_cells, columns=elements).apply(pd.to_numeric, errors='coerce')
+    certificate = certificate.to_numpy(dtype=np.float64).reshape(len(rows), len(elements))
+
+    valid = np.isfinite(certificate)
+    half_range = np.zeros_like(certificate)
+    half_range[valid] = [pivot_tab.calculate_dynamic_range(value) for value in certificate[valid]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        recovery = np.where(certificate != 0, sample / certificate * 100, np.nan)
+        low = np.where(certificate != 0, (certificate - half_range) / certificate * 100, np.nan)
+        high = np.where(certificate != 0, (certificate + half_range) / certificate * 100, np.nan)
+    in_range = (sample >= certificate - half_range) & (sample <= certificate + half_range)
+    return {
+        'labels': row_labels,
+        'certificate': certificate,
+        'sample': sample,
+        'recovery': recovery,
+        'low': low,
+        'high': high,
+        'in_range': in_range,
+    }
+
+
+class SmallMultiplesDialog(QDialog):
+    """Grid of the CRM recovery (%) of every displayed element, one small plot per element.
+
+    The plots and their items are created once per element list; refresh() only
+    recomputes the verification arrays and calls setData, so it can follow corrections live.
+    """
+    def __init__(self, plot_dialog):
+        super().__init__(plot_dialog)
+        self.plot_dialog = plot_dialog
+        self.pivot_tab = plot_dialog.parent
+        self.logger = logging.getLogger(__name__)
+        self.setWindowTitle("Verification Recovery - All Elements")
+        self.setGeometry(120, 120, 1400, 900)
+        self.setModal(False)
+        self.elements = []
+        self.cells = {}
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("Columns:"))
+        self.columns_spin = QSpinBox()
+        self.columns_spin.setRange(1, 12)
+        self.columns_spin.setValue(6)
+        self.columns_spin.valueChanged.connect(self.rebuild)
+        control_layout.addWidget(self.columns_spin)
+        self.summary_label = QLabel("")
+        control_layout.addWidget(self.summary_label)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+        self.graphics = pg.GraphicsLayoutWidget()
+        self.graphics.setBackground('w')
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(self.graphics)
+        layout.addWidget(scroll)
+
+    def rebuild(self):
+        """Lay out one plot per element; items are reused by refresh()."""
+        self.graphics.clear()
+        self.cells = {}
+        n_columns = self.columns_spin.value()
+        for i, element in enumerate(self.elements):
+            plot = self.graphics.addPlot(row=i // n_columns, col=i % n_columns, title=element)
+            plot.setMenuEnabled(False)
+            plot.hideButtons()
+            plot.addLine(y=100, pen=pg.mkPen('#6c757d', style=Qt.PenStyle.DashLine))
+            band = pg.PlotDataItem(pen=pg.mkPen('#ff9800', width=2), connect='pairs')
+            points = pg.ScatterPlotItem(size=7, pen=None)
+            plot.addItem(band)
+            plot.addItem(points)
+            self.cells[element] = (plot, band, points)
+        n_rows = math.ceil(len(self.elements) / n_columns) if self.elements else 0
+        self.graphics.setMinimumHeight(max(n_rows * CELL_HEIGHT, CELL_HEIGHT))
+        self.refresh()
+
+    def refresh(self):
+        """Recompute the recovery arrays for all elements and update the plots in place."""
+        start_time = time.time()
+        pivot_data = self.pivot_tab.pivot_data
+        view = self.pivot_tab.current_view_df
+        if pivot_data is None or pivot_data.empty or view is None:
+            return
+        # The certificate rows are built for the displayed columns only (column filter, Best Line)
+        elements = [col for col in view.columns if col != 'Solution Label']
+        if elements != self.elements:
+            self.elements = elements
+            self.rebuild()
+            return
+
+        data = verification_matrix(self.pivot_tab, self.plot_dialog.included_crm_labels(), elements)
+        n = len(data['labels'])
+        x = np.arange(n, dtype=np.float64)
+        for j, element in enumerate(elements):
+            plot, band, points = self.cells[element]
+            recovery = data['recovery'][:, j]
+            valid = np.isfinite(recovery)
+            brushes = [IN_RANGE_BRUSH if flag else OUT_RANGE_BRUSH for flag in data['in_range'][valid, j]]
+            points.setData(x[valid], recovery[valid], brush=brushes)
+            # Range ticks as (low, high) segment pairs of one item
+            has_band = np.isfinite(data['low'][:, j])
+            low, high = data['low'][has_band, j], data['high'][has_band, j]
+            band_x = np.repeat(x[has_band], 4) + np.tile([-0.2, 0.2, -0.2, 0.2], int(has_band.sum()))
+            band.setData(band_x, np.column_stack([low, low, high, high]).ravel())
+        in_range = int(np.sum(data['in_range']))
+        measured = int(np.sum(np.isfinite(data['recovery'])))
+        self.summary_label.setText(f"{n} verification rows, {len(elements)} elements: {in_range}/{measured} values in range")
+        self.logger.debug(f"Small multiples refreshed in {time.time() - start_time:.3f} seconds")
@@ -1,5 +1,5 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox, QProgressDialog
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox
+from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QStandardItemModel, QStandardItem
 import pandas as pd
 import re
@@ -10,40 +10,10 @@ import logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-class DFCorrectionThread(QThread):
-    """Thread for applying DF corrections in the background."""
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(str, int)
-    error = pyqtSignal(str)
-
-    def __init__(self, df, solution_labels, new_df, apply_to_all=False):
-        super().__init__()
-        self.df = df.copy()
-        self.solution_labels = solution_labels
-        self.new_df = new_df
-        self.apply_to_all = apply_to_all
-
-    def run(self):
-        try:
-            corrected_rows = 0
-            total_rows = len(self.solution_labels)
-            for i, solution_label in enumerate(self.solution_labels):
-                mask = (self.df['Solution Label'] == solution_label) & (self.df['Type'] == 'Samp')
-                matching_rows = self.df[mask]
-                if not matching_rows.empty:
-                    self.df.loc[mask, 'DF'] = self.new_df
-                    corrected_rows += len(matching_rows)
-                if self.apply_to_all:
-                    self.progress.emit(int((i + 1) / total_rows * 100))
-            self.finished.emit(self.df.to_json(), corrected_rows)
-        except Exception as e:
-            self.error.emit(str(e))
-
 class DFCheckFrame(QWidget):
     def __init__(self, app, parent=None):
         super().__init__(parent)
         self.app = app
-        self.df_cache = None
         self.bad_dfs = None
         self.correction_df = {}
         self.selected_solution_label = None
@@ -228,12 +198,10 @@ class DFCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", f"Invalid DF: {e}")
             return
 
-        if self.df_cache is None:
-            data_start = time.time()
-            self.df_cache = self.app.get_data()
-            logger.debug(f"Data loading took {time.time() - data_start:.3f} seconds")
-
-        df = self.df_cache
+        # Output of the stage, so labels that were corrected drop out of the table
+        data_start = time.time()
+        df = self.app.stage_output('DF')
+        logger.debug(f"Data loading took {time.time() - data_start:.3f} seconds")
         if df is None or df.empty:
             QMessageBox.warning(self, "Warning", "No data loaded!")
             return
@@ -317,7 +285,7 @@ class DFCheckFrame(QWidget):
             logger.debug(f"Toggle exclude for {solution_label} took {time.time() - start_time:.3f} seconds")
 
     def apply_df_correction(self):
-        """Apply DF correction to the selected solution label using a thread."""
+        """Apply DF correction to the selected solution label."""
         start_time = time.time()
         if not self.selected_solution_label:
             QMessageBox.warning(self, "Warning", "No solution label selected!")
@@ -331,12 +299,7 @@ class DFCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", f"Invalid DF: {e}")
             return
 
-        if self.df_cache is None:
-            data_start = time.time()
-            self.df_cache = self.app.get_data()
-            logger.debug(f"Data loading in apply_df_correction took {time.time() - data_start:.3f} seconds")
-
-        df = self.df_cache
+        df = self.app.stage_input('DF')
         if df is None or df.empty:
             QMessageBox.warning(self, "Warning", "No data loaded!")
             return
@@ -350,21 +313,11 @@ class DFCheckFrame(QWidget):
                     return
                 break
 
-        # Start thread
-        self.thread = DFCorrectionThread(df, [self.selected_solution_label], self.new_df, apply_to_all=False)
-        self.progress_dialog = QProgressDialog("Applying DF correction...", "Cancel", 0, 100, self)
-        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.progress_dialog.setAutoClose(True)
-        self.progress_dialog.canceled.connect(self.thread.terminate)
-        self.thread.progress.connect(self.progress_dialog.setValue)
-        self.thread.finished.connect(self.on_correction_finished)
-        self.thread.error.connect(self.on_correction_error)
-        self.thread.start()
-
-        logger.debug(f"Starting apply_df_correction took {time.time() - start_time:.3f} seconds")
+        self.commit_correction([self.selected_solution_label], self.new_df)
+        logger.debug(f"apply_df_correction took {time.time() - start_time:.3f} seconds")
 
     def apply_to_all(self):
-        """Apply the new DF to all non-excluded samples in the bad DFs table using a thread."""
+        """Apply the new DF to all non-excluded samples in the bad DFs table."""
         start_time = time.time()
         if self.bad_dfs is None or self.bad_dfs.empty:
             QMessageBox.warning(self, "Warning", "No bad DFs to correct!")
@@ -378,12 +331,7 @@ class DFCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", f"Invalid DF: {e}")
             return
 
-        if self.df_cache is None:
-            data_start = time.time()
-            self.df_cache = self.app.get_data()
-            logger.debug(f"Data loading in apply_to_all took {time.time() - data_start:.3f} seconds")
-
-        df = self.df_cache
+        df = self.app.stage_input('DF')
         if df is None or df.empty:
             QMessageBox.warning(self, "Warning", "No data loaded!")
             return
@@ -399,33 +347,20 @@ class DFCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", "All samples are excluded!")
             return
 
-        # Start thread
-        self.thread = DFCorrectionThread(df, non_excluded_labels, self.new_df, apply_to_all=True)
-        self.progress_dialog = QProgressDialog("Applying DF corrections to all samples...", "Cancel", 0, 100, self)
-        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.progress_dialog.setAutoClose(True)
-        self.progress_dialog.canceled.connect(self.thread.terminate)
-        self.thread.progress.connect(self.progress_dialog.setValue)
-        self.thread.finished.connect(self.on_correction_finished)
-        self.thread.error.connect(self.on_correction_error)
-        self.thread.start()
-
-        logger.debug(f"Starting apply_to_all took {time.time() - start_time:.3f} seconds")
-
-    def on_correction_finished(self, df_json, corrected_rows):
-        """Handle thread completion."""
-        self.df_cache = pd.read_json(df_json)
-        self.app.set_data(self.df_cache)
+        self.commit_correction(non_excluded_labels, self.new_df)
+        logger.debug(f"apply_to_all took {time.time() - start_time:.3f} seconds")
+
+    def commit_correction(self, solution_labels, new_df):
+        """Record the new DF of the labels as DF stage parameters; the pipeline applies them to its current input."""
+        df = self.app.stage_input('DF')
+        corrected_rows = int(((df['Type'] == 'Samp') & df['Solution Label'].isin(solution_labels)).sum())
+        factors = dict(self.app.stage_params('DF') or {})
+        factors.update({label: new_df for label in solution_labels})
+        self.app.apply_stage_params('DF', factors)
         self.app.notify_data_changed()
         self.bad_dfs = None
         self.check_df_values()
         QMessageBox.information(self, "Success", f"Corrected DF values for {corrected_rows} rows")
-        self.progress_dialog.close()
-
-    def on_correction_error(self, error_msg):
-        """Handle thread errors."""
-        QMessageBox.warning(self, "Error", f"Failed to apply corrections: {error_msg}")
-        self.progress_dialog.close()
 
 if __name__ == "__main__":
     from PyQt6.QtWidgets import QApplication
@@ -446,6 +381,14 @@ if __name__ == "__main__":
             pass
         def set_data(self, df):
             pass
+        def stage_input(self, name):
+            return self.get_data()
+        def stage_output(self, name):
+            return self.get_data()
+        def stage_params(self, name):
+            return None
+        def apply_stage_params(self, name, params, for_results=False):
+            pass
         def notify_data_changed(self):
             pass
 
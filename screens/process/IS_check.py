@@ -0,0 +1,244 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QStandardItemModel, QStandardItem, QColor
+import pandas as pd
+import time
+import logging
+from utils.element_registry import ElementRegistry
+from utils.internal_standard import internal_standard_lines, apply_internal_standard, RECOVERY_RANGE
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+class ISCheckFrame(QWidget):
+    """Process step rescaling Corr Con by the recovery of an internal-standard line."""
+    def __init__(self, app, parent=None):
+        super().__init__(parent)
+        self.app = app
+        self.preview_df = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Set up the UI with enhanced controls and a modern layout."""
+        start_time = time.time()
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #F5F7FA;
+                font-family: 'Inter', 'Segoe UI', sans-serif;
+                font-size: 13px;
+            }
+            QGroupBox {
+                font-weight: bold;
+                color: #1A3C34;
+                margin-top: 15px;
+                border: 1px solid #D0D7DE;
+                border-radius: 6px;
+                padding: 10px;
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                subcontrol-position: top left;
+                padding: 0 5px;
+                left: 10px;
+            }
+            QLineEdit {
+                background-color: #FFFFFF;
+                border: 1px solid #D0D7DE;
+                padding: 6px;
+                border-radius: 6px;
+                font-size: 13px;
+            }
+            QLineEdit:focus {
+                border: 1px solid #2E7D32;
+                box-shadow: 0 0 5px rgba(46, 125, 50, 0.3);
+            }
+            QPushButton {
+                background-color: #2E7D32;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                font-weight: 600;
+                font-size: 13px;
+                border-radius: 6px;
+            }
+            QPushButton:hover {
+                background-color: #1B5E20;
+            }
+            QPushButton:disabled {
+                background-color: #E0E0E0;
+                color: #6B7280;
+            }
+            QLabel {
+                color: #1A3C34;
+                font-size: 13px;
+            }
+            QTableView {
+                background-color: #FFFFFF;
+                border: 1px solid #D0D7DE;
+                gridline-color: #E5E7EB;
+                font-size: 12px;
+                selection-background-color: #DBEAFE;
+                selection-color: #1A3C34;
+            }
+            QHeaderView::section {
+                background-color: #F9FAFB;
+                font-weight: 600;
+                color: #1A3C34;
+                border: 1px solid #D0D7DE;
+                padding: 6px;
+            }
+            QTableView::item:selected {
+                background-color: #DBEAFE;
+                color: #1A3C34;
+            }
+            QTableView::item {
+                padding: 0px;
+            }
+        """)
+
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(15, 15, 15, 15)
+        main_layout.setSpacing(15)
+
+        # Input group
+        input_group = QGroupBox("Internal Standard Correction")
+        input_layout = QHBoxLayout(input_group)
+        input_layout.setSpacing(10)
+
+        input_layout.addWidget(QLabel("IS Line:"))
+        self.is_combo = QComboBox()
+        self.is_combo.setMinimumWidth(160)
+        self.is_combo.setToolTip("Internal-standard wavelength (Y or Sc lines are listed first)")
+        self.is_combo.currentTextChanged.connect(self.clear_preview)
+        input_layout.addWidget(self.is_combo)
+
+        refresh_button = QPushButton("Refresh Lines")
+        refresh_button.setToolTip("Reload the element lines from the current data")
+        refresh_button.clicked.connect(self.refresh_lines)
+        input_layout.addWidget(refresh_button)
+
+        preview_button = QPushButton("Preview")
+        preview_button.setToolTip("Compute the IS recovery of every solution against the calibration standards")
+        preview_button.clicked.connect(self.preview_is_correction)
+        input_layout.addWidget(preview_button)
+
+        self.apply_button = QPushButton("Apply Correction")
+        self.apply_button.setToolTip("Divide Corr Con of all other elements by the IS recovery")
+        self.apply_button.clicked.connect(self.apply_is_correction)
+        self.apply_button.setEnabled(False)
+        input_layout.addWidget(self.apply_button)
+        input_layout.addStretch()
+
+        main_layout.addWidget(input_group)
+
+        # Preview group
+        preview_group = QGroupBox("IS Recovery per Solution")
+        preview_layout = QVBoxLayout(preview_group)
+        preview_layout.setSpacing(10)
+        self.status_label = QLabel("Select an internal-standard line and press Preview.")
+        preview_layout.addWidget(self.status_label)
+
+        self.preview_table = QTableView()
+        self.preview_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.preview_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.preview_table.verticalHeader().setVisible(False)
+        self.preview_table.setToolTip("IS intensity and recovery of each solution in run order")
+        preview_layout.addWidget(self.preview_table)
+
+        main_layout.addWidget(preview_group, stretch=1)
+
+        logger.debug(f"UI setup took {time.time() - start_time:.3f} seconds")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.is_combo.count() == 0:
+            self.refresh_lines()
+
+    def refresh_lines(self):
+        """List the element lines of the data, internal-standard candidates first."""
+        df = self.app.stage_input('IS')
+        current = self.is_combo.currentText()
+        self.is_combo.blockSignals(True)
+        self.is_combo.clear()
+        if df is not None and 'Element' in df.columns:
+            names = [name for name in pd.unique(df['Element'].dropna())]
+            candidates = internal_standard_lines(names, ElementRegistry(names))
+            self.is_combo.addItems(candidates + [name for name in names if name not in candidates])
+            if current:
+                self.is_combo.setCurrentText(current)
+        self.is_combo.blockSignals(False)
+        self.clear_preview()
+
+    def clear_preview(self):
+        self.preview_df = None
+        self.apply_button.setEnabled(False)
+        self.preview_table.setModel(QStandardItemModel())
+        self.status_label.setText("Select an internal-standard line and press Preview.")
+
+    def preview_is_correction(self):
+        """Compute recoveries and corrected data without changing the application data."""
+        start_time = time.time()
+        df = self.app.stage_input('IS')
+        if df is None or df.empty:
+            QMessageBox.warning(self, "Warning", "No data loaded!")
+            return
+
+        is_line = self.is_combo.currentText()
+        if not is_line:
+            QMessageBox.warning(self, "Warning", "No internal-standard line selected!")
+            return
+        required_columns = ['Solution Label', 'Element', 'Type', 'Int', 'Corr Con']
+        missing = [col for col in required_columns if col not in df.columns]
+        if missing:
+            QMessageBox.warning(self, "Warning", f"Data is missing columns: {', '.join(missing)}")
+            return
+
+        try:
+            _, self.preview_df = apply_internal_standard(df, is_line)
+        except Exception as e:
+            logger.error(f"IS correction failed: {str(e)}")
+            QMessageBox.warning(self, "Error", f"Failed to compute IS recovery: {str(e)}")
+            return
+
+        self.update_preview_table()
+        recovery = self.preview_df['Recovery (%)']
+        outside = int(((recovery < RECOVERY_RANGE[0]) | (recovery > RECOVERY_RANGE[1])).sum())
+        corrected = int(self.preview_df['Corrected'].sum())
+        self.status_label.setText(
+            f"{corrected} solutions corrected with {is_line}; {outside} recoveries outside "
+            f"{RECOVERY_RANGE[0]:g}-{RECOVERY_RANGE[1]:g}%"
+        )
+        self.apply_button.setEnabled(corrected > 0)
+        logger.debug(f"IS preview took {time.time() - start_time:.3f} seconds")
+
+    def update_preview_table(self):
+        """Fill the preview table, marking recoveries outside the accepted range."""
+        model = QStandardItemModel()
+        model.setHorizontalHeaderLabels(["Solution Label", "Type", "IS Int", "Recovery (%)", "Corrected"])
+        for row in self.preview_df.itertuples(index=False):
+            recovery = row[3]
+            items = [
+                QStandardItem(str(row[0])),
+                QStandardItem(str(row[1])),
+                QStandardItem("" if pd.isna(row[2]) else f"{row[2]:.1f}"),
+                QStandardItem("" if pd.isna(recovery) else f"{recovery:.1f}"),
+                QStandardItem("Yes" if row[4] else "No"),
+            ]
+            for item in items:
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            if pd.notna(recovery) and not RECOVERY_RANGE[0] <= recovery <= RECOVERY_RANGE[1]:
+                items[3].setBackground(QColor("#FFCCCC"))
+            model.appendRow(items)
+        self.preview_table.setModel(model)
+
+    def apply_is_correction(self):
+        """Apply the previewed IS correction to the current input of the IS stage."""
+        if self.preview_df is None:
+            QMessageBox.warning(self, "Warning", "Run Preview first!")
+            return
+        # Only the parameters are stored; the pipeline recomputes from the stage's current input
+        self.app.apply_stage_params('IS', {'line': self.is_combo.currentText()})
+        self.app.notify_data_changed()
+        QMessageBox.information(self, "Success", f"IS correction applied with {self.is_combo.currentText()}")
+        self.clear_preview()
+        self.status_label.setText("IS correction applied. Preview again to recompute.")
@@ -4,12 +4,12 @@ from PyQt6.QtGui import QFont, QStandardItemModel, QStandardItem
 import pyqtgraph as pg
 import pandas as pd
 import numpy as np
-import json
-import os
 import time
 import logging
-import uuid
 from scipy.stats import median_abs_deviation
+from utils import provenance
+from utils.corrections_store import CorrectionsStore, dataset_key, OUTLIER, NON_OUTLIER
+from screens.process.diff_view import DiffDialog
 
 # Enable antialiasing globally for pyqtgraph
 pg.setConfigOptions(antialias=True)
@@ -24,61 +24,49 @@ class PlotWindow(QMainWindow):
         super().__init__()
         self.setWindowTitle(title)
         self.setGeometry(150, 150, 800, 600)
-        self.df = df
         self.x_column = x_column
         self.y_column = y_column
         self.setup_plot()
+        self.set_data(df)
         logger.debug(f"PlotWindow created for {y_column}")
 
     def setup_plot(self):
-        """Setup the scatter plot in the window."""
-        logger.debug(f"Setting up scatter plot for {self.y_column} vs {self.x_column}")
-        valid_data = 0
-        x_values = []
-        y_values = []
-        for _, row in self.df.iterrows():
-            x_value = row[self.x_column]
-            y_value = row[self.y_column]
-            if pd.notna(x_value) and pd.notna(y_value):
-                try:
-                    x_float = float(x_value)
-                    y_float = float(y_value)
-                    x_values.append(x_float)
-                    y_values.append(y_float)
-                    valid_data += 1
-                except (ValueError, TypeError) as e:
-                    logger.debug(f"Skipping invalid data point ({x_value}, {y_value}) for {self.y_column}: {e}")
-                    continue
-        if valid_data == 0:
-            logger.warning(f"No valid data to plot for {self.y_column}")
-            self.setCentralWidget(QLabel("No valid data to plot"))
-            return
-
+        """Create the plot once; set_data only replaces the points of its scatter item."""
         layout_widget = pg.GraphicsLayoutWidget()
         layout_widget.setBackground('w')
         title_item = pg.LabelItem(f"Scatter Plot of {self.y_column} vs {self.x_column}", size='12pt', bold=True)
         layout_widget.addItem(title_item, row=0, col=0)
-        plot = layout_widget.addPlot(row=1, col=0)
-        plot.plot(x_values, y_values, pen=None, symbol='o', symbolSize=8, symbolBrush='b', name=f"{self.y_column} Data")
-        plot.setLabel('bottom', self.x_column)
-        plot.setLabel('left', self.y_column)
-        x_values = pd.to_numeric(self.df[self.x_column], errors='coerce').dropna()
-        if not x_values.empty:
-            plot.setXRange(x_values.min(), x_values.max())
-        y_values = pd.to_numeric(self.df[self.y_column], errors='coerce').dropna()
-        if not y_values.empty:
-            plot.setYRange(y_values.min(), y_values.max())
-        legend = plot.addLegend(offset=(10, 10))
+        self.plot = layout_widget.addPlot(row=1, col=0)
+        self.plot.setLabel('bottom', self.x_column)
+        self.plot.setLabel('left', self.y_column)
+        self.plot.addLegend(offset=(10, 10))
+        self.scatter = pg.ScatterPlotItem(pen=None, symbol='o', size=8, brush='b', name=f"{self.y_column} Data")
+        self.plot.addItem(self.scatter)
+        self.empty_label = pg.TextItem("No valid data to plot", color='k', anchor=(0.5, 0.5))
+        self.plot.addItem(self.empty_label)
         self.setCentralWidget(layout_widget)
-        logger.debug(f"Scatter plot setup completed for {self.y_column}")
+
+    def set_data(self, df):
+        """Show the valid (x, y) pairs of df."""
+        x_values = pd.to_numeric(df[self.x_column], errors='coerce').to_numpy(dtype=np.float64)
+        y_values = pd.to_numeric(df[self.y_column], errors='coerce').to_numpy(dtype=np.float64)
+        valid = np.isfinite(x_values) & np.isfinite(y_values)
+        self.scatter.setData(x_values[valid], y_values[valid])
+        self.empty_label.setVisible(not valid.any())
+        if not valid.any():
+            logger.warning(f"No valid data to plot for {self.y_column}")
+            return
+        self.plot.setXRange(x_values[valid].min(), x_values[valid].max())
+        self.plot.setYRange(y_values[valid].min(), y_values[valid].max())
+        logger.debug(f"Scatter plot updated for {self.y_column} with {int(valid.sum())} points")
 
 class CheckRMFrame(QWidget):
     def __init__(self, app, parent=None):
         super().__init__(parent)
         self.app = app
         self.reset_state()
-        self.corrections_file = "user_corrections.json"
-        self.load_user_corrections()
+        self.corrections_store = None
+        self.trend_plot = None
         self.setup_ui()
         logger.debug("CheckRMFrame initialized")
 
@@ -157,23 +145,31 @@ class CheckRMFrame(QWidget):
         logger.debug("Styles configured")
 
     def load_user_corrections(self):
-        """Load user corrections from JSON file."""
-        if os.path.exists(self.corrections_file):
-            try:
-                with open(self.corrections_file, 'r') as f:
-                    self.user_corrections = json.load(f)
-                logger.info("User corrections loaded successfully")
-            except Exception as e:
-                logger.error(f"Error loading user corrections: {e}")
+        """Load the outlier overrides of the current dataset from the corrections store."""
+        try:
+            if self.corrections_store is None:
+                self.corrections_store = CorrectionsStore()
+            self.user_corrections = self.corrections_store.load(dataset_key(self.app.file_path))
+        except Exception as e:
+            logger.error(f"Error loading user corrections: {e}")
 
-    def save_user_corrections(self):
-        """Save user corrections to JSON file."""
+    def save_user_correction(self, row_id, kind):
+        """Record one outlier/non-outlier mark of the selected label and element."""
+        user_key = f"{self.current_label}:{self.selected_element}"
+        marks = self.user_corrections.setdefault(user_key, {OUTLIER: [], NON_OUTLIER: []})
+        other = NON_OUTLIER if kind == OUTLIER else OUTLIER
+        marks[kind].append(row_id)
+        marks[other] = [x for x in marks[other] if x != row_id]
         try:
-            with open(self.corrections_file, 'w') as f:
-                json.dump(self.user_corrections, f, indent=4)
-            logger.info("User corrections saved successfully")
+            if self.corrections_store is not None:
+                self.corrections_store.mark(dataset_key(self.app.file_path), self.current_label, self.selected_element, row_id, kind)
         except Exception as e:
-            logger.error(f"Error saving user corrections: {e}")
+            logger.error(f"Error saving user correction: {e}")
+
+    def close_corrections_store(self):
+        if self.corrections_store is not None:
+            self.corrections_store.close()
+            self.corrections_store = None
 
     def setup_ui(self):
         """Setup UI with controls, tables, and plot area."""
@@ -222,6 +218,9 @@ class CheckRMFrame(QWidget):
         self.mark_non_outlier_button.clicked.connect(self.mark_as_non_outlier)
         self.mark_non_outlier_button.setEnabled(False)
         control_layout.addWidget(self.mark_non_outlier_button)
+        self.compare_button = QPushButton("Compare Before/After")
+        self.compare_button.clicked.connect(self.compare_corrections)
+        control_layout.addWidget(self.compare_button)
         main_layout.addWidget(control_frame)
 
         # Content frame
@@ -243,7 +242,6 @@ class CheckRMFrame(QWidget):
         self.outliers_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.outliers_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.outliers_table.verticalHeader().setVisible(False)
-        self.outliers_table.clicked.connect(self.on_outlier_select)
         left_layout.addWidget(self.outliers_table)
 
         # Ratios table
@@ -311,6 +309,10 @@ class CheckRMFrame(QWidget):
         main_layout.addWidget(content_frame)
         logger.debug("UI setup completed")
 
+    def drift_params(self):
+        """Parameters the RM Drift stage output is keyed by."""
+        return {'keyword': self.keyword_entry.text().strip(), 'threshold': self.threshold_entry.text().strip()}
+
     def open_plot_window(self, column):
         """Open a new scatter plot window for the selected column using data from current_between_df."""
         logger.debug(f"open_plot_window called for column: {column}")
@@ -330,13 +332,16 @@ class CheckRMFrame(QWidget):
                 logger.debug(f"No valid data to plot for column {column}")
                 QMessageBox.warning(self, "Warning", f"No valid data to plot for {column}.")
                 return
-            window = PlotWindow(f"Scatter Plot for {column}", valid_data, "index", column)
+            window = self.plot_windows.get(column)
+            if window is not None and window.isVisible():
+                window.set_data(valid_data)
+            else:
+                window = PlotWindow(f"Scatter Plot for {column}", valid_data, "index", column)
+                self.plot_windows[column] = window
             window.show()
             window.raise_()
             window.activateWindow()
-            window_id = str(uuid.uuid4())
-            self.plot_windows[window_id] = window
-            logger.debug(f"Plot window opened for {column} with ID {window_id}")
+            logger.debug(f"Plot window shown for {column}")
         except Exception as e:
             logger.error(f"Error creating plot window for {column}: {e}")
             QMessageBox.critical(self, "Error", f"Error plotting {column}: {str(e)}")
@@ -345,6 +350,7 @@ class CheckRMFrame(QWidget):
         """Check for RM changes and detect outliers."""
         start_time = time.time()
         self.reset_state()
+        self.load_user_corrections()
         try:
             threshold = float(self.threshold_entry.text())
         except ValueError:
@@ -354,7 +360,7 @@ class CheckRMFrame(QWidget):
         if not keyword:
             QMessageBox.critical(self, "Error", "Please enter a valid keyword.")
             return
-        df = self.app.get_data()
+        df = self.app.stage_input('RM Drift')
         if df is None or df.empty:
             QMessageBox.critical(self, "Error", "No data loaded.")
             return
@@ -510,7 +516,7 @@ class CheckRMFrame(QWidget):
             self.mark_non_outlier_button.setEnabled(True)
         std_data = self.original_df[self.original_df['Type'] == 'Std'].copy(deep=True)
         updated_df = pd.concat([self.corrected_df, std_data], ignore_index=True)
-        self.app.set_data(updated_df, for_results=True)
+        self.app.commit_stage('RM Drift', updated_df, self.drift_params(), for_results=True)
         logger.debug(f"Check RM changes took {time.time() - start_time:.3f} seconds")
 
     def display_outliers(self, df):
@@ -530,6 +536,7 @@ class CheckRMFrame(QWidget):
             model.appendRow([select_item, label_item, element_item, count_item])
             self.selected_outliers[index] = select_item
         self.outliers_table.setModel(model)
+        self.connect_outlier_navigation()
         self.outliers_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         self.outliers_table.setColumnWidth(0, 60)
         self.outliers_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
@@ -539,6 +546,10 @@ class CheckRMFrame(QWidget):
         self.outliers_table.clicked.connect(self.toggle_checkbox)
         logger.debug("Outliers table displayed")
 
+    def connect_outlier_navigation(self):
+        """Follow the current row of the outliers table, so clicks and arrow keys both select a label/element."""
+        self.outliers_table.selectionModel().currentRowChanged.connect(lambda current, previous: self.on_outlier_select(current))
+
     def toggle_checkbox(self, index):
         """Toggle checkbox state in the outliers table."""
         if index.column() == 0:
@@ -594,10 +605,11 @@ class CheckRMFrame(QWidget):
             condition = (self.corrected_df['Solution Label'] == label) & (self.corrected_df['Element'] == element)
             valid_rows = self.corrected_df[condition]['row_id'].isin(non_outlier_row_ids)
             self.corrected_df.loc[condition & valid_rows, 'Corr Con'] = mean_value
+            provenance.mark(self.corrected_df, condition & valid_rows, provenance.DRIFT)
             logger.debug(f"Applied mean correction ({mean_value:.3f}) to {np.sum(condition & valid_rows)} rows for {label}:{element}")
             std_data = self.original_df[self.original_df['Type'] == 'Std'].copy(deep=True)
             updated_df = pd.concat([self.corrected_df, std_data], ignore_index=True)
-            self.app.set_data(updated_df, for_results=True)
+            self.app.commit_stage('RM Drift', updated_df, self.drift_params(), for_results=True)
             self.app.notify_data_changed()
 
     def get_non_outlier_condition(self, label, element, old_id, new_id):
@@ -828,6 +840,7 @@ class CheckRMFrame(QWidget):
                     key = f"{label}:{element}:{old_id}->{new_id}"
                     self.non_outlier_ratios[key] = ratio
                     self.corrected_df.loc[condition & (self.corrected_df['Element'] == element), 'Corr Con'] *= ratio
+                    provenance.mark(self.corrected_df, condition & (self.corrected_df['Element'] == element), provenance.DRIFT)
                     corrections_applied += condition.sum()
                     logger.debug(f"Applied ratio {ratio:.3f} to {condition.sum()} rows from after {old_id} to including {new_id} for {label}:{element}")
         if corrections_applied > 0:
@@ -843,7 +856,7 @@ class CheckRMFrame(QWidget):
                 self.rm_df[col] = pd.to_numeric(self.rm_df[col], errors='coerce')
             std_data = self.original_df[self.original_df['Type'] == 'Std'].copy(deep=True)
             updated_df = pd.concat([self.corrected_df, std_data], ignore_index=True)
-            self.app.set_data(updated_df, for_results=True)
+            self.app.commit_stage('RM Drift', updated_df, self.drift_params(), for_results=True)
             self.app.notify_data_changed()
             if self.current_label and self.selected_element:
                 self.apply_corrections_for_label(self.current_label, self.selected_element)
@@ -925,6 +938,7 @@ class CheckRMFrame(QWidget):
                     continue
                 ratio = reference_value / current_value if current_value != 0 else 1.0
                 self.corrected_df.loc[condition & (self.corrected_df['Element'] == element), 'Corr Con'] *= ratio
+                provenance.mark(self.corrected_df, condition & (self.corrected_df['Element'] == element), provenance.DRIFT)
                 corrections_applied += condition.sum()
         if corrections_applied > 0:
             self.corrections_applied = True
@@ -939,7 +953,7 @@ class CheckRMFrame(QWidget):
                 self.rm_df[col] = pd.to_numeric(self.rm_df[col], errors='coerce')
             std_data = self.original_df[self.original_df['Type'] == 'Std'].copy(deep=True)
             updated_df = pd.concat([self.corrected_df, std_data], ignore_index=True)
-            self.app.set_data(updated_df, for_results=True)
+            self.app.commit_stage('RM Drift', updated_df, self.drift_params(), for_results=True)
             self.apply_corrections_for_label(self.current_label, self.selected_element)
             self.display_non_outlier_ratios(self.current_label, self.selected_element)
             between_condition = self.get_first_non_outlier_condition(self.current_label, self.selected_element)
@@ -965,12 +979,8 @@ class CheckRMFrame(QWidget):
             return
         row_id = int(point_display.replace("Non-Outlier Point ", "").split('->')[0])
         user_key = f"{self.current_label}:{self.selected_element}"
-        if user_key not in self.user_corrections:
-            self.user_corrections[user_key] = {'outliers': [], 'non_outliers': []}
-        if row_id not in self.user_corrections[user_key]['outliers']:
-            self.user_corrections[user_key]['outliers'].append(row_id)
-            self.user_corrections[user_key]['non_outliers'] = [x for x in self.user_corrections[user_key]['non_outliers'] if x != row_id]
-            self.save_user_corrections()
+        if row_id not in self.user_corrections.get(user_key, {}).get(OUTLIER, []):
+            self.save_user_correction(row_id, OUTLIER)
             self.update_outlier_status()
             QMessageBox.information(self, "Info", f"Marked row {row_id} as outlier for {user_key}.")
             logger.debug(f"Marked row {row_id} as outlier for {user_key}")
@@ -989,16 +999,26 @@ class CheckRMFrame(QWidget):
             return
         row_id = int(point_display.replace("Outlier Point ", ""))
         user_key = f"{self.current_label}:{self.selected_element}"
-        if user_key not in self.user_corrections:
-            self.user_corrections[user_key] = {'outliers': [], 'non_outliers': []}
-        if row_id not in self.user_corrections[user_key]['non_outliers']:
-            self.user_corrections[user_key]['non_outliers'].append(row_id)
-            self.user_corrections[user_key]['outliers'] = [x for x in self.user_corrections[user_key]['outliers'] if x != row_id]
-            self.save_user_corrections()
+        if row_id not in self.user_corrections.get(user_key, {}).get(NON_OUTLIER, []):
+            self.save_user_correction(row_id, NON_OUTLIER)
             self.update_outlier_status()
             QMessageBox.information(self, "Info", f"Marked row {row_id} as non-outlier for {user_key}.")
             logger.debug(f"Marked row {row_id} as non-outlier for {user_key}")
 
+    def compare_corrections(self):
+        """Show every sample value changed by the RM corrections, aligned on label and element."""
+        if self.original_df is None or self.corrected_df is None:
+            QMessageBox.warning(self, "Warning", "Run Check RM Changes first.")
+            return
+        # corrected_df holds the Samp rows of original_df in the same order, with normalised RM labels
+        samples = self.original_df[self.original_df['Type'] == 'Samp']
+        if len(samples) != len(self.corrected_df):
+            QMessageBox.warning(self, "Warning", "The corrected data no longer matches the checked data.")
+            return
+        before = self.corrected_df[['Solution Label', 'Element']].copy()
+        before['Corr Con'] = samples['Corr Con'].to_numpy()
+        DiffDialog(self, before, self.corrected_df, title="RM Corrections: Before/After").exec()
+
     def skip_selected_outlier(self):
         """Skip a selected outlier."""
         selection = self.ratios_table.selectionModel().selectedRows()
@@ -1104,20 +1124,50 @@ class CheckRMFrame(QWidget):
         self.display_between_df(between_df)
         logger.debug("Outlier status updated")
 
+    def ensure_trend_plot(self):
+        """Create the trend plot and its items once; plot_trend only updates them with setData."""
+        if self.trend_plot is not None:
+            return
+        layout_widget = pg.GraphicsLayoutWidget()
+        layout_widget.setBackground('w')
+        self.trend_title = pg.LabelItem("", size='12pt', bold=True)
+        layout_widget.addItem(self.trend_title, row=0, col=0)
+        self.trend_plot = layout_widget.addPlot(row=1, col=0)
+        self.trend_plot.setLabel('bottom', "Index")
+        self.trend_legend = self.trend_plot.addLegend(offset=(10, 10))
+        self.trend_items = {
+            'original': pg.PlotDataItem(pen=pg.mkPen('b', width=2)),
+            'outliers': pg.ScatterPlotItem(pen=None, symbol='o', size=8, brush='r'),
+            'before': pg.PlotDataItem(pen=pg.mkPen('b', style=Qt.PenStyle.DashLine)),
+            'after': pg.PlotDataItem(pen=pg.mkPen('g', style=Qt.PenStyle.DashLine)),
+        }
+        for item in self.trend_items.values():
+            self.trend_plot.addItem(item)
+        self.plot_layout.addWidget(layout_widget)
+
+    def clear_trend_plot(self):
+        if self.trend_plot is None:
+            return
+        for item in self.trend_items.values():
+            item.setData([], [])
+        self.trend_legend.clear()
+        self.trend_title.setText("")
+
     def plot_trend(self, element):
         """Plot trend for the specified element in the current label."""
         if self.current_label is None:
             QMessageBox.critical(self, "Error", "No label selected.")
             return
         def render_plot():
-            for widget in self.plot_frame.findChildren(QWidget):
-                widget.deleteLater()
+            start_time = time.time()
+            self.ensure_trend_plot()
             try:
                 threshold = float(self.threshold_entry.text())
             except ValueError:
                 threshold = 5.0
             label_df_original = self.rm_df[self.rm_df['Solution Label'] == self.current_label].sort_values('row_id')
             if label_df_original.empty:
+                self.clear_trend_plot()
                 QMessageBox.critical(self, "Error", f"No data found for {self.current_label}.")
                 return
             label_df_original = label_df_original.reset_index(drop=True)
@@ -1125,6 +1175,7 @@ class CheckRMFrame(QWidget):
             values_original = pd.to_numeric(label_df_original[element], errors='coerce').values
             valid_mask = ~np.isnan(values_original)
             if np.sum(valid_mask) < 2:
+                self.clear_trend_plot()
                 QMessageBox.information(self, "Info", f"Insufficient valid data for {element} in {self.current_label}.")
                 return
             valid_sample_index = sample_index[valid_mask]
@@ -1133,6 +1184,7 @@ class CheckRMFrame(QWidget):
             corrected_df_label = self.corrected_df[corrected_condition].sort_values('row_id')
             values_corrected = pd.to_numeric(corrected_df_label['Corr Con'], errors='coerce').values
             if len(values_corrected) != len(values_original):
+                self.clear_trend_plot()
                 QMessageBox.warning(self, "Warning", "Mismatch in original and corrected data lengths.")
                 return
             valid_values_corrected = values_corrected[valid_mask]
@@ -1155,37 +1207,40 @@ class CheckRMFrame(QWidget):
             outlier_mask |= np.isin(valid_sample_index, list(ignored_outliers))
             non_outlier_mask = ~outlier_mask
             valid_sample_index_no_outliers = valid_sample_index[non_outlier_mask]
-            valid_values_original_no_outliers = valid_values_original[non_outlier_mask]
             valid_values_corrected_no_outliers = valid_values_corrected[non_outlier_mask]
             if len(valid_values_corrected_no_outliers) < 1:
+                self.clear_trend_plot()
                 QMessageBox.information(self, "Info", f"No non-outlier data available for {element} in {self.current_label}.")
                 return
-            coefficients_before = np.polyfit(valid_sample_index, valid_values_original, 1)
-            trendline_before = np.polyval(coefficients_before, valid_sample_index)
+            coefficients_before = coefficients
+            trendline_before = trendline
             if len(valid_sample_index_no_outliers) >= 2:
                 coefficients_after = np.polyfit(valid_sample_index_no_outliers, valid_values_corrected_no_outliers, 1)
             else:
                 mean_val = np.mean(valid_values_corrected_no_outliers) if len(valid_values_corrected_no_outliers) > 0 else 0
                 coefficients_after = [0, mean_val]
             trendline_after = np.polyval(coefficients_after, valid_sample_index)
-            layout_widget = pg.GraphicsLayoutWidget()
-            layout_widget.setBackground('w')
-            title_item = pg.LabelItem(f"Trend for {element} ({self.current_label})", size='12pt', bold=True)
-            layout_widget.addItem(title_item, row=0, col=0)
-            plot = layout_widget.addPlot(row=1, col=0)
-            plot.plot(valid_sample_index_no_outliers, valid_values_original_no_outliers, name=f"Original {element}", pen=pg.mkPen('b', width=2))
-            plot.plot(valid_sample_index[outlier_mask], valid_values_original[outlier_mask], pen=None, symbol='o', symbolSize=8, symbolBrush='r', name="Outlier Points")
-            plot.plot(valid_sample_index, trendline_before, name=f"Trend Before (slope={coefficients_before[0]:.3f})", pen=pg.mkPen('b', style=Qt.PenStyle.DashLine))
-            plot.plot(valid_sample_index, trendline_after, name=f"Trend After (slope={coefficients_after[0]:.3f})", pen=pg.mkPen('g', style=Qt.PenStyle.DashLine))
-            plot.setLabel('bottom', "Index")
-            plot.setLabel('left', element)
-            y_min = min(np.min(valid_values_original), np.min(valid_values_corrected)) - 0.1 * (max(np.max(valid_values_original), np.max(valid_values_corrected)) - min(np.min(valid_values_original), np.min(valid_values_corrected)))
-            y_max = max(np.max(valid_values_original), np.max(valid_values_corrected)) + 0.1 * (max(np.max(valid_values_original), np.max(valid_values_corrected)) - min(np.min(valid_values_original), np.min(valid_values_corrected)))
-            plot.setXRange(valid_sample_index.min(), valid_sample_index.max())
-            plot.setYRange(y_min, y_max)
-            plot.addLegend(offset=(10, 10))
-            self.plot_layout.addWidget(layout_widget)
-            logger.debug(f"Trend plot rendered for {element} in {self.current_label}")
+
+            # Outlier and non-outlier layers are masks over the same index/value arrays
+            items = self.trend_items
+            items['original'].setData(valid_sample_index[non_outlier_mask], valid_values_original[non_outlier_mask])
+            items['outliers'].setData(valid_sample_index[outlier_mask], valid_values_original[outlier_mask])
+            items['before'].setData(valid_sample_index, trendline_before)
+            items['after'].setData(valid_sample_index, trendline_after)
+            self.trend_legend.clear()
+            self.trend_legend.addItem(items['original'], f"Original {element}")
+            self.trend_legend.addItem(items['outliers'], "Outlier Points")
+            self.trend_legend.addItem(items['before'], f"Trend Before (slope={coefficients_before[0]:.3f})")
+            self.trend_legend.addItem(items['after'], f"Trend After (slope={coefficients_after[0]:.3f})")
+            self.trend_title.setText(f"Trend for {element} ({self.current_label})")
+            self.trend_plot.setLabel('left', element)
+
+            y_low = min(np.min(valid_values_original), np.min(valid_values_corrected))
+            y_high = max(np.max(valid_values_original), np.max(valid_values_corrected))
+            margin = 0.1 * (y_high - y_low)
+            self.trend_plot.setXRange(valid_sample_index.min(), valid_sample_index.max())
+            self.trend_plot.setYRange(y_low - margin, y_high + margin)
+            logger.debug(f"Trend plot updated for {element} in {self.current_label} in {time.time() - start_time:.4f} seconds")
         QTimer.singleShot(0, render_plot)
 
     def display_ratios(self, label, element):
@@ -0,0 +1,220 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QStandardItemModel, QStandardItem, QColor
+import time
+import logging
+from utils.blank_correction import subtract_blank
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+class BlankCheckFrame(QWidget):
+    """Process step subtracting a run-order interpolated blank baseline from every sample."""
+    def __init__(self, app, parent=None):
+        super().__init__(parent)
+        self.app = app
+        self.preview_df = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Set up the UI with enhanced controls and a modern layout."""
+        start_time = time.time()
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #F5F7FA;
+                font-family: 'Inter', 'Segoe UI', sans-serif;
+                font-size: 13px;
+            }
+            QGroupBox {
+                font-weight: bold;
+                color: #1A3C34;
+                margin-top: 15px;
+                border: 1px solid #D0D7DE;
+                border-radius: 6px;
+                padding: 10px;
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                subcontrol-position: top left;
+                padding: 0 5px;
+                left: 10px;
+            }
+            QLineEdit {
+                background-color: #FFFFFF;
+                border: 1px solid #D0D7DE;
+                padding: 6px;
+                border-radius: 6px;
+                font-size: 13px;
+            }
+            QLineEdit:focus {
+                border: 1px solid #2E7D32;
+                box-shadow: 0 0 5px rgba(46, 125, 50, 0.3);
+            }
+            QPushButton {
+                background-color: #2E7D32;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                font-weight: 600;
+                font-size: 13px;
+                border-radius: 6px;
+            }
+            QPushButton:hover {
+                background-color: #1B5E20;
+            }
+            QPushButton:disabled {
+                background-color: #E0E0E0;
+                color: #6B7280;
+            }
+            QLabel {
+                color: #1A3C34;
+                font-size: 13px;
+            }
+            QTableView {
+                background-color: #FFFFFF;
+                border: 1px solid #D0D7DE;
+                gridline-color: #E5E7EB;
+                font-size: 12px;
+                selection-background-color: #DBEAFE;
+                selection-color: #1A3C34;
+            }
+            QHeaderView::section {
+                background-color: #F9FAFB;
+                font-weight: 600;
+                color: #1A3C34;
+                border: 1px solid #D0D7DE;
+                padding: 6px;
+            }
+            QTableView::item:selected {
+                background-color: #DBEAFE;
+                color: #1A3C34;
+            }
+            QTableView::item {
+                padding: 0px;
+            }
+        """)
+
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(15, 15, 15, 15)
+        main_layout.setSpacing(15)
+
+        # Input group
+        input_group = QGroupBox("Blank Subtraction")
+        input_layout = QHBoxLayout(input_group)
+        input_layout.setSpacing(10)
+
+        input_layout.addWidget(QLabel("Value Column:"))
+        self.value_combo = QComboBox()
+        self.value_combo.addItems(["Corr Con", "Int"])
+        self.value_combo.setFixedWidth(120)
+        self.value_combo.setToolTip("Column the blank baseline is computed from and subtracted from")
+        self.value_combo.currentTextChanged.connect(self.clear_preview)
+        input_layout.addWidget(self.value_combo)
+
+        preview_button = QPushButton("Preview")
+        preview_button.setToolTip("Interpolate the blanks in run order and show the change per element")
+        preview_button.clicked.connect(self.preview_blank_subtraction)
+        input_layout.addWidget(preview_button)
+
+        self.apply_button = QPushButton("Apply Subtraction")
+        self.apply_button.setToolTip("Subtract the previewed baseline from all samples")
+        self.apply_button.clicked.connect(self.apply_blank_subtraction)
+        self.apply_button.setEnabled(False)
+        input_layout.addWidget(self.apply_button)
+        input_layout.addStretch()
+
+        main_layout.addWidget(input_group)
+
+        # Preview group
+        preview_group = QGroupBox("Before / After per Element")
+        preview_layout = QVBoxLayout(preview_group)
+        preview_layout.setSpacing(10)
+        self.status_label = QLabel("Press Preview to compute the blank baseline.")
+        preview_layout.addWidget(self.status_label)
+
+        self.preview_table = QTableView()
+        self.preview_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.preview_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.preview_table.verticalHeader().setVisible(False)
+        self.preview_table.setToolTip("Mean sample value of each element before and after blank subtraction")
+        preview_layout.addWidget(self.preview_table)
+
+        main_layout.addWidget(preview_group, stretch=1)
+
+        logger.debug(f"UI setup took {time.time() - start_time:.3f} seconds")
+
+    def clear_preview(self):
+        self.preview_df = None
+        self.apply_button.setEnabled(False)
+        self.preview_table.setModel(QStandardItemModel())
+        self.status_label.setText("Press Preview to compute the blank baseline.")
+
+    def preview_blank_subtraction(self):
+        """Compute the baseline and corrected data without changing the application data."""
+        start_time = time.time()
+        df = self.app.stage_input('Blank')
+        if df is None or df.empty:
+            QMessageBox.warning(self, "Warning", "No data loaded!")
+            return
+
+        value_column = self.value_combo.currentText()
+        required_columns = ['Solution Label', 'Element', 'Type', value_column]
+        missing = [col for col in required_columns if col not in df.columns]
+        if missing:
+            QMessageBox.warning(self, "Warning", f"Data is missing columns: {', '.join(missing)}")
+            return
+
+        try:
+            _, self.preview_df = subtract_blank(df, value_column)
+        except Exception as e:
+            logger.error(f"Blank subtraction failed: {str(e)}")
+            QMessageBox.warning(self, "Error", f"Failed to compute blank baseline: {str(e)}")
+            return
+
+        self.update_preview_table()
+        n_blanks = int(self.preview_df['Blanks'].sum())
+        without = int((self.preview_df['Blanks'] == 0).sum())
+        if n_blanks == 0:
+            self.status_label.setText("No blank rows found (Type 'Blk' or label containing BLANK).")
+            self.apply_button.setEnabled(False)
+        else:
+            text = f"{n_blanks} blank readings over {len(self.preview_df)} elements"
+            if without:
+                text += f"; {without} elements without blanks are left unchanged"
+            self.status_label.setText(text)
+            self.apply_button.setEnabled(True)
+        logger.debug(f"Blank preview took {time.time() - start_time:.3f} seconds")
+
+    def update_preview_table(self):
+        """Fill the preview table, colouring the change column by size."""
+        model = QStandardItemModel()
+        columns = list(self.preview_df.columns)
+        model.setHorizontalHeaderLabels(columns)
+        for row in self.preview_df.itertuples(index=False):
+            items = []
+            for col, value in zip(columns, row):
+                if col in ('Element', 'Blanks', 'Samples'):
+                    item = QStandardItem(str(value))
+                else:
+                    item = QStandardItem("" if value != value else f"{value:.3f}")
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                items.append(item)
+            change = row[columns.index('Change (%)')]
+            if change == change and abs(change) > 10:
+                items[-1].setBackground(QColor("#FFCCCC"))
+            elif change == change and abs(change) > 1:
+                items[-1].setBackground(QColor("#FFF3E0"))
+            model.appendRow(items)
+        self.preview_table.setModel(model)
+
+    def apply_blank_subtraction(self):
+        """Apply the previewed blank subtraction to the current input of the Blank stage."""
+        if self.preview_df is None:
+            QMessageBox.warning(self, "Warning", "Run Preview first!")
+            return
+        # Only the parameters are stored; the pipeline recomputes from the stage's current input
+        self.app.apply_stage_params('Blank', {'value_column': self.value_combo.currentText()})
+        self.app.notify_data_changed()
+        QMessageBox.information(self, "Success", f"Blank baseline subtracted for {len(self.preview_df)} elements")
+        self.clear_preview()
+        self.status_label.setText("Blank subtraction applied. Preview again to recompute.")
@@ -0,0 +1,141 @@
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QCheckBox, QPushButton, QTableView, QMessageBox
+from PyQt6.QtCore import Qt, QAbstractTableModel, QVariant
+from PyQt6.QtGui import QColor, QFont
+import numpy as np
+import time
+import logging
+from utils.dataset_diff import DatasetDiff
+from utils.columnar_export import ask_export_path, start_columnar_export
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Background of changed cells
+INCREASED_COLOR = QColor("#E8F5E9")
+DECREASED_COLOR = QColor("#FFEBEE")
+ADDED_REMOVED_COLOR = QColor("#FFF3E0")
+# Values shown in the table
+DISPLAY_MODES = ["After", "Before", "Change", "Change (%)"]
+
+class DiffTableModel(QAbstractTableModel):
+    """Lazy view over a DatasetDiff: cells are formatted only when Qt asks for them."""
+    def __init__(self, diff):
+        super().__init__()
+        self.diff = diff
+        self.mode = "After"
+        self.row_map = np.arange(diff.shape[0])
+
+    def set_view(self, mode, changed_only):
+        self.beginResetModel()
+        self.mode = mode
+        self.row_map = self.diff.changed_rows() if changed_only else np.arange(self.diff.shape[0])
+        self.endResetModel()
+
+    def matrix(self):
+        return {
+            "After": self.diff.after,
+            "Before": self.diff.before,
+            "Change": self.diff.absolute,
+            "Change (%)": self.diff.relative,
+        }[self.mode]
+
+    def rowCount(self, parent=None):
+        return len(self.row_map)
+
+    def columnCount(self, parent=None):
+        return self.diff.shape[1]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        r, c = self.row_map[index.row()], index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = self.matrix()[r, c]
+            return "" if np.isnan(value) else f"{value:.4g}"
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if not self.diff.changed[r, c]:
+                return QVariant()
+            if self.diff.added[r, c] or self.diff.removed[r, c]:
+                return ADDED_REMOVED_COLOR
+            return INCREASED_COLOR if self.diff.absolute[r, c] > 0 else DECREASED_COLOR
+        if role == Qt.ItemDataRole.ToolTipRole and self.diff.changed[r, c]:
+            before, after, relative = self.diff.before[r, c], self.diff.after[r, c], self.diff.relative[r, c]
+            text = f"{before:.6g} → {after:.6g}"
+            return text if np.isnan(relative) else f"{text} ({relative:+.2f}%)"
+        return QVariant()
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole:
+            if orientation == Qt.Orientation.Horizontal:
+                return str(self.diff.elements[section])
+            return str(self.diff.rows[self.row_map[section]])
+        return QVariant()
+
+class DiffDialog(QDialog):
+    """Cell-by-cell comparison of two versions of the data, e.g. before/after corrections or two runs."""
+    def __init__(self, parent, before, after, title="Compare Data", value_column='Corr Con'):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.resize(1100, 700)
+        start_time = time.time()
+        self.diff = DatasetDiff(before, after, value_column)
+        logger.debug(f"Dataset diff computed in {time.time() - start_time:.3f} seconds")
+        self.export_thread = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(10)
+
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("Show:"))
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(DISPLAY_MODES)
+        self.mode_combo.currentTextChanged.connect(self.update_view)
+        control_layout.addWidget(self.mode_combo)
+        self.changed_only = QCheckBox("Changed rows only")
+        self.changed_only.setChecked(True)
+        self.changed_only.toggled.connect(self.update_view)
+        control_layout.addWidget(self.changed_only)
+        control_layout.addStretch()
+        export_button = QPushButton("Export Changes")
+        export_button.clicked.connect(self.export_changes)
+        control_layout.addWidget(export_button)
+        layout.addLayout(control_layout)
+
+        self.summary_label = QLabel(self.diff.summary())
+        self.summary_label.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
+        layout.addWidget(self.summary_label)
+
+        self.model = DiffTableModel(self.diff)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setAlternatingRowColors(True)
+        self.table.horizontalHeader().setDefaultSectionSize(90)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        layout.addWidget(self.table)
+        self.update_view()
+
+    def update_view(self):
+        self.model.set_view(self.mode_combo.currentText(), self.changed_only.isChecked())
+
+    def export_changes(self):
+        changes = self.diff.change_list()
+        if changes.empty:
+            QMessageBox.information(self, "Info", "No changed values to export.")
+            return
+        file_path, target = ask_export_path(self, "Export Changes", "changes")
+        if not file_path:
+            return
+        self.export_thread = start_columnar_export(
+            self, changes, file_path, target, self.on_exported, self.on_export_error, title="Exporting Changes"
+        )
+
+    def on_exported(self, file_path):
+        logger.info(f"Change list exported to {file_path}")
+        QMessageBox.information(self, "Success", f"Changes exported to {file_path}")
+
+    def on_export_error(self, message):
+        logger.error(f"Change list export failed: {message}")
+        QMessageBox.warning(self, "Error", f"Failed to export changes: {message}")
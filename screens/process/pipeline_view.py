@@ -0,0 +1,147 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QGroupBox, QTreeWidget, QTreeWidgetItem, QHeaderView, QFileDialog, QMessageBox
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont, QColor
+import time
+import logging
+from utils.pipeline import CACHED, STALE, RUNNING
+from utils.load_file import read_data_file
+from screens.process.diff_view import DiffDialog
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# (text colour, background, border) of each stage state
+STATE_STYLES = {
+    CACHED: ("#2e7d32", "#E8F5E9", "#A5D6A7"),
+    STALE: ("#ff9800", "#FFF3E0", "#FFE082"),
+    RUNNING: ("#6c757d", "#E3F2FD", "#BBDEFB"),
+}
+
+class PipelineView(QWidget):
+    """Shows which Process stages are cached, stale or recomputing, and their parameters."""
+    def __init__(self, app, parent=None):
+        super().__init__(parent)
+        self.app = app
+        self.pipeline = app.pipeline
+        self.stage_labels = {}
+        self.setup_ui()
+        self.pipeline.status_changed.connect(self.update_status)
+        self.update_status()
+
+    def setup_ui(self):
+        start_time = time.time()
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(15)
+
+        flow_group = QGroupBox("Processing Pipeline")
+        flow_layout = QHBoxLayout(flow_group)
+        flow_layout.setSpacing(6)
+        for i, (name, _, _, _) in enumerate(self.pipeline.status()):
+            if i:
+                arrow = QLabel("→")
+                arrow.setFont(QFont("Segoe UI", 14))
+                flow_layout.addWidget(arrow)
+            label = QLabel(name)
+            label.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
+            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            label.setMinimumWidth(90)
+            self.stage_labels[name] = label
+            flow_layout.addWidget(label)
+        flow_layout.addStretch()
+        layout.addWidget(flow_group)
+
+        self.stage_tree = QTreeWidget()
+        self.stage_tree.setHeaderLabels(["Stage", "State", "Parameters", "Last Recompute (s)"])
+        self.stage_tree.setRootIsDecorated(False)
+        self.stage_tree.header().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.stage_tree, stretch=1)
+
+        button_layout = QHBoxLayout()
+        recompute_button = QPushButton("Recompute Result")
+        recompute_button.setToolTip("Bring every stale stage up to date and refresh the Result")
+        recompute_button.clicked.connect(self.recompute)
+        button_layout.addWidget(recompute_button)
+        self.undo_button = QPushButton("Undo")
+        self.undo_button.clicked.connect(self.app.undo)
+        button_layout.addWidget(self.undo_button)
+        self.redo_button = QPushButton("Redo")
+        self.redo_button.clicked.connect(self.app.redo)
+        button_layout.addWidget(self.redo_button)
+        compare_loaded_button = QPushButton("Compare with Loaded")
+        compare_loaded_button.setToolTip("Show every value changed by the corrections since the file was loaded")
+        compare_loaded_button.clicked.connect(self.compare_with_loaded)
+        button_layout.addWidget(compare_loaded_button)
+        compare_file_button = QPushButton("Compare with File...")
+        compare_file_button.setToolTip("Compare the current data with another run of the same samples")
+        compare_file_button.clicked.connect(self.compare_with_file)
+        button_layout.addWidget(compare_file_button)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+
+        logger.debug(f"PipelineView UI setup took {time.time() - start_time:.3f} seconds")
+
+    def update_status(self):
+        self.stage_tree.clear()
+        for name, state, seconds, has_params in self.pipeline.status():
+            color, background, border = STATE_STYLES[state]
+            label = self.stage_labels[name]
+            label.setText(f"{name}\n{state}")
+            label.setStyleSheet(
+                f"color: {color}; background-color: {background}; border: 1px solid {border}; "
+                f"border-radius: 6px; padding: 6px;"
+            )
+            label.repaint()
+
+            params = self.pipeline.params(name) if has_params else None
+            item = QTreeWidgetItem([
+                name,
+                state,
+                self.describe_params(params),
+                "" if seconds is None else f"{seconds:.3f}",
+            ])
+            item.setForeground(1, QColor(color))
+            self.stage_tree.addTopLevelItem(item)
+        for col in (0, 1, 3):
+            self.stage_tree.resizeColumnToContents(col)
+
+    def update_undo_buttons(self, stack):
+        self.undo_button.setEnabled(stack.can_undo())
+        self.undo_button.setToolTip(f"Undo {stack.undo_text()} (Ctrl+Z)" if stack.can_undo() else "Nothing to undo")
+        self.redo_button.setEnabled(stack.can_redo())
+        self.redo_button.setToolTip(f"Redo {stack.redo_text()} (Ctrl+Y)" if stack.can_redo() else "Nothing to redo")
+
+    def describe_params(self, params):
+        if not params:
+            return "—"
+        if all(isinstance(value, (int, float)) for value in params.values()):
+            return f"{len(params)} labels: " + ", ".join(f"{k}={v:g}" for k, v in list(params.items())[:5]) + (" ..." if len(params) > 5 else "")
+        return ", ".join(f"{k}: {v}" for k, v in params.items())
+
+    def recompute(self):
+        if self.pipeline.source is None:
+            return
+        start_time = time.time()
+        self.app.set_data(self.pipeline.output('Result'), for_results=True)
+        logger.debug(f"Pipeline recompute took {time.time() - start_time:.3f} seconds")
+
+    def compare_with_loaded(self):
+        if self.pipeline.source is None or self.app.data is None:
+            QMessageBox.warning(self, "Warning", "No data loaded.")
+            return
+        DiffDialog(self, self.pipeline.source, self.app.data, title="Loaded vs Corrected").exec()
+
+    def compare_with_file(self):
+        if self.app.data is None:
+            QMessageBox.warning(self, "Warning", "No data loaded.")
+            return
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open Run to Compare", "", "CSV files (*.csv);;Excel files (*.xlsx *.xls)")
+        if not file_path:
+            return
+        try:
+            other = read_data_file(file_path)
+        except Exception as e:
+            logger.error(f"Failed to read {file_path}: {str(e)}")
+            QMessageBox.warning(self, "Error", f"Failed to read file:\n{str(e)}")
+            return
+        DiffDialog(self, other, self.app.data, title=f"Compare Runs: {file_path}").exec()
@@ -1,19 +1,21 @@
 import sys
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableView, QAbstractItemView,
-    QHeaderView, QScrollBar, QComboBox, QLineEdit, QDialog, QFileDialog, QMessageBox, QGroupBox
+    QHeaderView, QScrollBar, QComboBox, QLineEdit, QDialog, QFileDialog, QMessageBox, QGroupBox, QCheckBox
 )
 from PyQt6.QtCore import Qt, QAbstractTableModel, QVariant
 from PyQt6.QtGui import QStandardItemModel, QStandardItem, QFont, QColor
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 import time
 import numpy as np
 import os
 import platform
 import logging
+from utils.excel_export import SheetSpec, numeric_or_text, start_excel_export
+from utils.columnar_export import ask_export_path, start_columnar_export
+from utils.uncertainty import propagate_uncertainty
+from utils.provenance import describe_provenance
+from utils.replicates import replicate_stats
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -295,6 +297,23 @@ class ResultsFrame(QWidget):
         self.save_button.setFixedWidth(120)
         controls_layout.addWidget(self.save_button)
 
+        export_data_button = QPushButton("🗃 Export Data")
+        export_data_button.setToolTip("Export the pivot table as Parquet/Arrow/CSV without styling")
+        export_data_button.clicked.connect(lambda: self.export_columnar(long_table=False))
+        export_data_button.setFixedWidth(120)
+        controls_layout.addWidget(export_data_button)
+
+        export_long_button = QPushButton("🗃 Export Long")
+        export_long_button.setToolTip("Export the full corrected long table as Parquet/Arrow/CSV")
+        export_long_button.clicked.connect(lambda: self.export_columnar(long_table=True))
+        export_long_button.setFixedWidth(120)
+        controls_layout.addWidget(export_long_button)
+
+        self.replicate_check = QCheckBox("Average Replicates")
+        self.replicate_check.setToolTip("Show one row per Solution Label with the mean of repeated measurements")
+        self.replicate_check.toggled.connect(self.on_replicate_mode_changed)
+        controls_layout.addWidget(self.replicate_check)
+
         decimal_label = QLabel("Decimal Places:")
         decimal_label.setFont(QFont("Inter", 12))
         controls_layout.addWidget(decimal_label)
@@ -340,6 +359,38 @@ class ResultsFrame(QWidget):
         self._last_cache_key = None
         logger.debug("Filter cache reset")
 
+    def on_replicate_mode_changed(self):
+        self.reset_filter_cache()
+        self.data_hash = None
+        self.show_processed_data()
+
+    def filter_rows(self, df):
+        """Rows of the long table that feed the pivot: measured types minus excluded samples."""
+        df_filtered = df[df['Type'].isin(['Samp', 'Sample', 'RM', 'Std'])].copy()
+        return df_filtered[
+            (~df_filtered['Solution Label'].isin(self.app.get_excluded_samples())) &
+            (~df_filtered['Solution Label'].isin(self.app.get_excluded_volumes())) &
+            (~df_filtered['Solution Label'].isin(self.app.get_excluded_dfs()))
+        ]
+
+    def get_filtered_long_data(self):
+        """The corrected long table limited by the same row filters and label/element selection as the pivot."""
+        df = self.app.get_data()
+        if df is None or df.empty or 'Type' not in df.columns or 'Solution Label' not in df.columns:
+            return None
+        df_filtered = self.filter_rows(df)
+        selected_values = [k for k, v in self.filter_values.get(self.filter_field, {}).items() if v]
+        if self.filter_field in ('Solution Label', 'Element') and selected_values:
+            if self.filter_field == 'Solution Label':
+                df_filtered = df_filtered[df_filtered['Solution Label'].isin(selected_values)]
+            else:
+                elements = df_filtered['Element'].astype(str).str.split('_').str[0]
+                df_filtered = df_filtered[elements.isin(selected_values)]
+        if 'Corr Con RSD' in df_filtered.columns:
+            df_filtered = propagate_uncertainty(df_filtered)
+        df_filtered = describe_provenance(df_filtered)
+        return df_filtered.reset_index(drop=True)
+
     def get_filtered_data(self):
         start_time = time.time()
         df = self.app.get_data()
@@ -358,12 +409,7 @@ class ResultsFrame(QWidget):
             logger.debug(f"Using cached data (same hash), took {time.time() - start_time:.3f} seconds")
             return self.last_filtered_data
 
-        df_filtered = df[df['Type'].isin(['Samp', 'Sample', 'RM', 'Std'])].copy()
-        df_filtered = df_filtered[
-            (~df_filtered['Solution Label'].isin(self.app.get_excluded_samples())) &
-            (~df_filtered['Solution Label'].isin(self.app.get_excluded_volumes())) &
-            (~df_filtered['Solution Label'].isin(self.app.get_excluded_dfs()))
-        ]
+        df_filtered = self.filter_rows(df)
 
         if df_filtered.empty:
             logger.warning("No data after filtering in get_filtered_data")
@@ -389,18 +435,22 @@ class ResultsFrame(QWidget):
             QMessageBox.warning(self, "Error", f"Column '{value_column}' not found in data!")
             return None
 
-        pivot_data = df_filtered.pivot_table(
-            index=['Solution Label', 'unique_id'],
-            columns='Element',
-            values=value_column,
-            aggfunc='first'
-        ).reset_index()
-
-        pivot_data = pivot_data.merge(
-            df_filtered[['Solution Label', 'unique_id', 'original_index']].drop_duplicates(),
-            on=['Solution Label', 'unique_id'],
-            how='left'
-        ).sort_values('original_index').drop(columns=['unique_id'])
+        if self.replicate_check.isChecked():
+            # One row per label with the replicate mean of each element
+            pivot_data = replicate_stats(df_filtered, value_column)['mean'].reset_index()
+        else:
+            pivot_data = df_filtered.pivot_table(
+                index=['Solution Label', 'unique_id'],
+                columns='Element',
+                values=value_column,
+                aggfunc='first'
+            ).reset_index()
+
+            pivot_data = pivot_data.merge(
+                df_filtered[['Solution Label', 'unique_id', 'original_index']].drop_duplicates(),
+                on=['Solution Label', 'unique_id'],
+                how='left'
+            ).sort_values('original_index').drop(columns=['unique_id'])
 
         columns_to_keep = ['Solution Label'] + [col for col in self.element_order if col in pivot_data.columns]
         pivot_data = pivot_data[columns_to_keep]
@@ -556,72 +606,77 @@ class ResultsFrame(QWidget):
         )
         if file_path:
             try:
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Processed Pivot Table"
-
-                header_fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-                first_column_fill = PatternFill(start_color="FFF5E4", end_color="FFF5E4", fill_type="solid")
-                odd_row_fill = PatternFill(start_color="F9FAFB", end_color="F9FAFB", fill_type="solid")
-                even_row_fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-                header_font = Font(name="Inter", size=12, bold=True)
-                cell_font = Font(name="Inter", size=12)
-                cell_alignment = Alignment(horizontal="center", vertical="center")
-                thin_border = Border(
-                    left=Side(style="thin"), right=Side(style="thin"),
-                    top=Side(style="thin"), bottom=Side(style="thin")
-                )
-
-                headers = list(df.columns)
-                for col_idx, header in enumerate(headers, 1):
-                    cell = ws.cell(row=1, column=col_idx)
-                    cell.value = header
-                    cell.fill = header_fill
-                    cell.font = header_font
-                    cell.alignment = cell_alignment
-                    cell.border = thin_border
-                    ws.column_dimensions[get_column_letter(col_idx)].width = 15
-
                 decimal_places = int(self.decimal_combo.currentText())
-                for row_idx, (_, row) in enumerate(df.iterrows(), 2):
-                    fill = even_row_fill if (row_idx - 1) % 2 == 0 else odd_row_fill
-                    for col_idx, value in enumerate(row, 1):
-                        cell = ws.cell(row=row_idx, column=col_idx)
-                        try:
-                            cell.value = round(float(value), decimal_places)
-                            cell.number_format = f"0.{'0' * decimal_places}"
-                        except (ValueError, TypeError):
-                            cell.value = value
-                        cell.font = cell_font
-                        cell.alignment = cell_alignment
-                        cell.border = thin_border
-                        if col_idx == 1:
-                            cell.fill = first_column_fill
-                        else:
-                            cell.fill = fill
-
-                wb.save(file_path)
-                QMessageBox.information(self, "Success", "Processed pivot table saved successfully!")
-                logger.debug(f"Save processed excel took {time.time() - start_time:.3f} seconds")
-
-                if QMessageBox.question(self, "Open File", "Would you like to open the saved Excel file?") == QMessageBox.StandardButton.Yes:
-                    try:
-                        system = platform.system()
-                        if system == "Windows":
-                            os.startfile(file_path)
-                        elif system == "Darwin":
-                            os.system(f"open {file_path}")
-                        else:
-                            os.system(f"xdg-open {file_path}")
-                        logger.debug(f"Opened file: {file_path}")
-                    except Exception as e:
-                        QMessageBox.critical(self, "Error", f"Failed to open file: {str(e)}")
-                        logger.error(f"Failed to open file: {str(e)}")
-
+                number_format = f"0.{'0' * decimal_places}" if decimal_places else "0"
+                cell = {'font_name': 'Inter', 'font_size': 12, 'align': 'center', 'valign': 'vcenter', 'border': 1}
+                formats = {
+                    'header': {**cell, 'bold': True, 'bg_color': '#90EE90'},
+                    'first': {**cell, 'bg_color': '#FFF5E4', 'num_format': number_format},
+                    'odd': {**cell, 'bg_color': '#F9FAFB', 'num_format': number_format},
+                    'even': {**cell, 'bg_color': '#FFFFFF', 'num_format': number_format},
+                }
+
+                export_df = df.apply(numeric_or_text, decimals=decimal_places)
+                sheet = SheetSpec(
+                    "Processed Pivot Table", export_df,
+                    row_styles=np.where(np.arange(len(export_df)) % 2 == 1, 'even', 'odd').tolist(),
+                    first_column_style='first',
+                    column_widths=[15] * len(export_df.columns)
+                )
+                logger.debug(f"Prepared processed excel export in {time.time() - start_time:.3f} seconds")
+                self.export_thread = start_excel_export(
+                    self, file_path, [sheet], formats,
+                    self.on_excel_saved, self.on_excel_save_error, title="Saving Excel"
+                )
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to save: {str(e)}")
                 logger.error(f"Failed to save: {str(e)}")
 
+    def on_excel_saved(self, file_path):
+        QMessageBox.information(self, "Success", "Processed pivot table saved successfully!")
+        logger.debug(f"Saved processed excel to {file_path}")
+
+        if QMessageBox.question(self, "Open File", "Would you like to open the saved Excel file?") == QMessageBox.StandardButton.Yes:
+            try:
+                system = platform.system()
+                if system == "Windows":
+                    os.startfile(file_path)
+                elif system == "Darwin":
+                    os.system(f"open {file_path}")
+                else:
+                    os.system(f"xdg-open {file_path}")
+                logger.debug(f"Opened file: {file_path}")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Failed to open file: {str(e)}")
+                logger.error(f"Failed to open file: {str(e)}")
+
+    def on_excel_save_error(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to save: {message}")
+        logger.error(f"Failed to save: {message}")
+
+    def export_columnar(self, long_table=False):
+        """Export the filtered pivot, or the corrected long table, as Parquet/Arrow IPC/CSV."""
+        df = self.get_filtered_long_data() if long_table else self.get_filtered_data()
+        if df is None or df.empty:
+            QMessageBox.warning(self, "Warning", "No data to export!")
+            return
+
+        default_name = "corrected_long_table" if long_table else "processed_pivot"
+        file_path, target = ask_export_path(self, "Export Data", default_name)
+        if not file_path:
+            return
+        try:
+            self.columnar_thread = start_columnar_export(
+                self, df, file_path, target,
+                self.on_columnar_exported, self.on_excel_save_error, title="Exporting Data"
+            )
+        except Exception as e:
+            self.on_excel_save_error(str(e))
+
+    def on_columnar_exported(self, file_path):
+        QMessageBox.information(self, "Success", f"Data exported to {file_path}")
+        logger.debug(f"Exported data to {file_path}")
+
     def reset_cache(self):
         self.last_filtered_data = None
         self._last_cache_key = None
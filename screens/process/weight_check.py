@@ -1,5 +1,5 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox, QProgressDialog
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QGroupBox, QMessageBox
+from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QStandardItemModel, QStandardItem, QFont
 import pandas as pd
 import numpy as np
@@ -10,45 +10,10 @@ import logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-class WeightCorrectionThread(QThread):
-    """Thread for applying weight corrections in the background."""
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(str, int)
-    error = pyqtSignal(str)
-
-    def __init__(self, df, solution_labels, new_weight, apply_to_all=False):
-        super().__init__()
-        self.df = df.copy()
-        self.solution_labels = solution_labels
-        self.new_weight = new_weight
-        self.apply_to_all = apply_to_all
-
-    def run(self):
-        try:
-            corrected_rows = 0
-            total_rows = len(self.solution_labels)
-            for i, solution_label in enumerate(self.solution_labels):
-                mask = (self.df['Solution Label'] == solution_label) & (self.df['Type'] == 'Samp')
-                matching_rows = self.df[mask]
-                if not matching_rows.empty:
-                    for idx in matching_rows.index:
-                        current_weight = float(self.df.loc[idx, 'Act Wgt'])
-                        current_corr_con = float(self.df.loc[idx, 'Corr Con'])
-                        corrected_corr_con = (self.new_weight / current_weight) * current_corr_con
-                        self.df.loc[idx, 'Corr Con'] = corrected_corr_con
-                        self.df.loc[idx, 'Act Wgt'] = self.new_weight
-                    corrected_rows += len(matching_rows)
-                if self.apply_to_all:
-                    self.progress.emit(int((i + 1) / total_rows * 100))
-            self.finished.emit(self.df.to_json(), corrected_rows)
-        except Exception as e:
-            self.error.emit(str(e))
-
 class WeightCheckFrame(QWidget):
     def __init__(self, app, parent=None):
         super().__init__(parent)
         self.app = app
-        self.df_cache = None
         self.bad_weights = None
         self.correction_weight = {}
         self.selected_solution_label = None
@@ -243,20 +208,16 @@ class WeightCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", f"Invalid weight range: {e}")
             return
 
-        if self.df_cache is None:
-            data_start = time.time()
-            self.df_cache = self.app.get_data()
-            logger.debug(f"Data loading took {time.time() - data_start:.3f} seconds")
-
-        df = self.df_cache
+        # Output of the stage, so labels that were corrected drop out of the table
+        data_start = time.time()
+        df = self.app.stage_output('Weight')
+        logger.debug(f"Data loading took {time.time() - data_start:.3f} seconds")
         if df is None or df.empty:
             QMessageBox.warning(self, "Warning", "No data loaded!")
             return
 
-        # Convert 'Corr Con' to numeric and drop non-numeric rows
-        df['Corr Con'] = pd.to_numeric(df['Corr Con'], errors='coerce')
-        self.df_cache = df[df['Corr Con'].notna()].copy()
-        df = self.df_cache
+        # Skip rows with a non-numeric 'Corr Con'
+        df = df[pd.to_numeric(df['Corr Con'], errors='coerce').notna()]
 
         # Filter bad weights
         data_filter_start = time.time()
@@ -326,7 +287,7 @@ class WeightCheckFrame(QWidget):
             logger.debug(f"Toggle exclude for {solution_label} took {time.time() - start_time:.3f} seconds")
 
     def apply_weight_correction(self):
-        """Apply weight correction to the selected solution label using a thread."""
+        """Apply weight correction to the selected solution label."""
         start_time = time.time()
         if not self.selected_solution_label:
             QMessageBox.warning(self, "Warning", "No solution label selected!")
@@ -340,12 +301,7 @@ class WeightCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", f"Invalid weight: {e}")
             return
 
-        if self.df_cache is None:
-            data_start = time.time()
-            self.df_cache = self.app.get_data()
-            logger.debug(f"Data loading in apply_weight_correction took {time.time() - data_start:.3f} seconds")
-
-        df = self.df_cache
+        df = self.app.stage_input('Weight')
         if df is None or df.empty:
             QMessageBox.warning(self, "Warning", "No data loaded!")
             return
@@ -359,21 +315,11 @@ class WeightCheckFrame(QWidget):
                     return
                 break
 
-        # Start thread
-        self.thread = WeightCorrectionThread(df, [self.selected_solution_label], new_weight, apply_to_all=False)
-        self.progress_dialog = QProgressDialog("Applying weight correction...", "Cancel", 0, 100, self)
-        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.progress_dialog.setAutoClose(True)
-        self.progress_dialog.canceled.connect(self.thread.terminate)
-        self.thread.progress.connect(self.progress_dialog.setValue)
-        self.thread.finished.connect(self.on_correction_finished)
-        self.thread.error.connect(self.on_correction_error)
-        self.thread.start()
-
-        logger.debug(f"Starting apply_weight_correction took {time.time() - start_time:.3f} seconds")
+        self.commit_correction([self.selected_solution_label], new_weight)
+        logger.debug(f"apply_weight_correction took {time.time() - start_time:.3f} seconds")
 
     def apply_to_all(self):
-        """Apply the new weight to all non-excluded samples in the bad weights table using a thread."""
+        """Apply the new weight to all non-excluded samples in the bad weights table."""
         start_time = time.time()
         if self.bad_weights is None or self.bad_weights.empty:
             QMessageBox.warning(self, "Warning", "No bad weights to correct!")
@@ -387,12 +333,7 @@ class WeightCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", f"Invalid weight: {e}")
             return
 
-        if self.df_cache is None:
-            data_start = time.time()
-            self.df_cache = self.app.get_data()
-            logger.debug(f"Data loading in apply_to_all took {time.time() - data_start:.3f} seconds")
-
-        df = self.df_cache
+        df = self.app.stage_input('Weight')
         if df is None or df.empty:
             QMessageBox.warning(self, "Warning", "No data loaded!")
             return
@@ -408,30 +349,17 @@ class WeightCheckFrame(QWidget):
             QMessageBox.warning(self, "Warning", "All samples are excluded!")
             return
 
-        # Start thread
-        self.thread = WeightCorrectionThread(df, non_excluded_labels, new_weight, apply_to_all=True)
-        self.progress_dialog = QProgressDialog("Applying weight corrections to all samples...", "Cancel", 0, 100, self)
-        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.progress_dialog.setAutoClose(True)
-        self.progress_dialog.canceled.connect(self.thread.terminate)
-        self.thread.progress.connect(self.progress_dialog.setValue)
-        self.thread.finished.connect(self.on_correction_finished)
-        self.thread.error.connect(self.on_correction_error)
-        self.thread.start()
-
-        logger.debug(f"Starting apply_to_all took {time.time() - start_time:.3f} seconds")
-
-    def on_correction_finished(self, df_json, corrected_rows):
-        """Handle thread completion."""
-        self.df_cache = pd.read_json(df_json)
-        self.app.set_data(self.df_cache)
+        self.commit_correction(non_excluded_labels, new_weight)
+        logger.debug(f"apply_to_all took {time.time() - start_time:.3f} seconds")
+
+    def commit_correction(self, solution_labels, new_weight):
+        """Record the new weight of the labels as Weight stage parameters; the pipeline applies them to its current input."""
+        df = self.app.stage_input('Weight')
+        corrected_rows = int(((df['Type'] == 'Samp') & df['Solution Label'].isin(solution_labels)).sum())
+        weights = dict(self.app.stage_params('Weight') or {})
+        weights.update({label: new_weight for label in solution_labels})
+        self.app.apply_stage_params('Weight', weights)
         self.app.notify_data_changed()
         self.bad_weights = None
         self.check_weights()
-        QMessageBox.information(self, "Success", f"Corrected weights and Corr Con values for {corrected_rows} rows")
-        self.progress_dialog.close()
-
-    def on_correction_error(self, error_msg):
-        """Handle thread errors."""
-        QMessageBox.warning(self, "Error", f"Failed to apply corrections: {error_msg}")
-        self.progress_dialog.close()
\ No newline at end of file
+        QMessageBox.information(self, "Success", f"Corrected weights and Corr Con values for {corrected_rows} rows")
\ No newline at end of file
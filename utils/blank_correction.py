@@ -0,0 +1,137 @@
+import logging
+import numpy as np
+import pandas as pd
+from utils import provenance
+
+logger = logging.getLogger(__name__)
+
+# Column keeping the subtracted baseline, so the step can be recomputed instead of stacked
+BASELINE_COLUMN = 'Blank Baseline ({})'
+# Relative uncertainty (%) of the blank-corrected value: sample and blank SD in quadrature
+BLANK_RSD_COLUMN = 'Blank Corrected RSD ({})'
+SAMPLE_TYPES = ['Samp', 'Sample']
+# Columns the blank can be subtracted from, each with its own baseline column
+VALUE_COLUMNS = ['Corr Con', 'Int']
+
+
+def blank_mask(df):
+    """Blank rows: Type 'Blk' or a Solution Label containing BLANK (also 'CRM BLANK')."""
+    is_blk = df['Type'].eq('Blk') if 'Type' in df.columns else pd.Series(False, index=df.index)
+    return (is_blk | df['Solution Label'].astype(str).str.upper().str.contains('BLANK', na=False)).to_numpy()
+
+
+def run_order(labels):
+    """Run position of every row: a new position each time the Solution Label changes."""
+    labels = pd.Series(labels).astype(str)
+    return (labels != labels.shift()).cumsum().to_numpy(dtype=np.float64)
+
+
+def blank_baseline(df, value_column='Corr Con'):
+    """Blank level of every row, interpolated in run order between the blanks of the same element.
+
+    Rows before the first or after the last blank take the nearest blank; elements without
+    any blank get 0. Uses one stable sort by element and forward/backward fills, so the cost
+    stays linear in the number of rows. Returns (baseline, blank rows mask).
+    """
+    values = pd.to_numeric(df[value_column], errors='coerce').to_numpy(dtype=np.float64)
+    baseline_column = BASELINE_COLUMN.format(value_column)
+    if baseline_column in df.columns:
+        values = values + df[baseline_column].fillna(0).to_numpy(dtype=np.float64)
+    blanks = blank_mask(df) & ~np.isnan(values)
+    baseline = interpolate_blanks(df, values, blanks)
+    logger.debug(f"Blank baseline from {int(blanks.sum())} blank readings over {len(df)} rows")
+    return baseline, blanks
+
+
+def interpolate_blanks(df, values, blanks):
+    """Values of the blank rows interpolated in run order to every row of the same element."""
+    position = run_order(df['Solution Label'])
+    codes = pd.factorize(df['Element'])[0]
+
+    order = np.argsort(codes, kind='stable')
+    grouped = pd.DataFrame({
+        'code': codes[order],
+        'value': np.where(blanks, values, np.nan)[order],
+        'position': np.where(blanks, position, np.nan)[order],
+    })
+    by_element = grouped.groupby('code', sort=False)[['value', 'position']]
+    previous = by_element.ffill()
+    following = by_element.bfill()
+
+    prev_value, prev_pos = previous['value'].to_numpy(), previous['position'].to_numpy()
+    next_value, next_pos = following['value'].to_numpy(), following['position'].to_numpy()
+    here = position[order]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(next_pos > prev_pos, (here - prev_pos) / (next_pos - prev_pos), 0.0)
+    interpolated = prev_value + weight * (next_value - prev_value)
+    sorted_baseline = np.where(np.isnan(prev_value), next_value,
+                               np.where(np.isnan(next_value), prev_value, interpolated))
+
+    baseline = np.empty(len(df), dtype=np.float64)
+    baseline[order] = np.nan_to_num(sorted_baseline, nan=0.0)
+    baseline[codes < 0] = 0.0
+    return baseline
+
+
+def subtract_blank(df, value_column='Corr Con'):
+    """Copy of df with the interpolated baseline subtracted from every sample row in one operation.
+
+    A previously applied baseline is added back first, so reapplying replaces it.
+    Returns (corrected frame, preview table per element).
+    """
+    baseline, blanks = blank_baseline(df, value_column)
+    values = pd.to_numeric(df[value_column], errors='coerce').to_numpy(dtype=np.float64)
+    baseline_column = BASELINE_COLUMN.format(value_column)
+    previous = df[baseline_column].fillna(0).to_numpy(dtype=np.float64) if baseline_column in df.columns else 0.0
+    samples = df['Type'].isin(SAMPLE_TYPES).to_numpy() & ~blanks
+    applied = np.where(samples, baseline, 0.0)
+    before = values + previous
+    after = before - applied
+
+    corrected = df.copy()
+    corrected[value_column] = np.where(np.isnan(values), corrected[value_column], after)
+    # Kept in float64: it is added back exactly when the step is re-applied or undone
+    corrected[baseline_column] = applied
+    # The bit is per row: keep it where the other value column still has a baseline
+    blanked = applied != 0
+    for other in VALUE_COLUMNS:
+        other_column = BASELINE_COLUMN.format(other)
+        if other != value_column and other_column in corrected.columns:
+            blanked |= corrected[other_column].fillna(0).to_numpy(dtype=np.float64) != 0
+    provenance.mark(corrected, blanked, provenance.BLANK, exclusive=True)
+
+    rsd_column = f"{value_column} RSD"
+    if rsd_column in df.columns:
+        # Subtraction is additive: combine absolute SDs, then carry the result as a relative term
+        rsd = pd.to_numeric(df[rsd_column], errors='coerce').to_numpy(dtype=np.float64)
+        sd_before = np.abs(before) * rsd / 100
+        blank_sd = interpolate_blanks(df, sd_before, blanks & ~np.isnan(sd_before))
+        sd_after = np.sqrt(np.square(sd_before) + np.square(np.where(samples, blank_sd, 0.0)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            combined = np.where(after != 0, sd_after / np.abs(after) * 100, np.nan)
+        corrected[BLANK_RSD_COLUMN.format(value_column)] = np.where(applied != 0, combined, rsd).astype(np.float32)
+    return corrected, blank_preview(df['Element'], blanks, samples, baseline, before, after)
+
+
+def blank_preview(elements, blanks, samples, baseline, before, after):
+    """Per element: blank count, mean baseline and sample means before/after subtraction."""
+    frame = pd.DataFrame({
+        'Element': elements.to_numpy(),
+        'blank': blanks,
+        'baseline': np.where(samples, baseline, np.nan),
+        'before': np.where(samples, before, np.nan),
+        'after': np.where(samples, after, np.nan),
+    })
+    grouped = frame.groupby('Element', sort=False)
+    preview = pd.DataFrame({
+        'Blanks': grouped['blank'].sum().astype(int),
+        'Samples': grouped['before'].count(),
+        'Mean Baseline': grouped['baseline'].mean(),
+        'Mean Before': grouped['before'].mean(),
+        'Mean After': grouped['after'].mean(),
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        preview['Change (%)'] = np.where(preview['Mean Before'] != 0,
+                                         (preview['Mean After'] - preview['Mean Before']) / preview['Mean Before'].abs() * 100,
+                                         np.nan)
+    return preview.reset_index()
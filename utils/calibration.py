@@ -0,0 +1,134 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Minimum number of standards for a calibration line
+MIN_POINTS = 2
+# LOD/LOQ as multiples of the blank intensity SD divided by the slope
+LOD_FACTOR = 3.0
+LOQ_FACTOR = 10.0
+# Lines with a lower R² are flagged in the calibration summary
+MIN_R2 = 0.995
+
+
+class CalibrationIndex:
+    """Std rows grouped by element and wavelength into contiguous arrays, with batch calibration stats.
+
+    Built once per dataset from the cleaned ElementsTab frame (where -1.0 marks missing
+    Soln Conc/Int). Rows are stably sorted by (element, line), so every element and every
+    element/wavelength pair is a slice of the arrays.
+    """
+    def __init__(self, df, registry):
+        self.groups = {}
+        self.element_slices = {}
+        self.lines = {}
+        self.stats = pd.DataFrame()
+
+        std = df[df['Type'] == 'Std']
+        names = std['Element'].to_numpy(dtype=object)
+        infos = [registry.info(name) for name in names]
+        elements = np.array([info.element for info in infos], dtype=object)
+        lines = np.array([info.line for info in infos], dtype=object)
+        order = pd.DataFrame({'element': elements, 'line': lines}).sort_values(
+            ['element', 'line'], kind='mergesort').index.to_numpy()
+
+        self.labels = std['Solution Label'].to_numpy(dtype=object)[order]
+        self.elements = elements[order]
+        self.lines_of_rows = lines[order]
+        self.soln_conc = std['Soln Conc'].to_numpy(dtype=np.float64)[order]
+        self.intensity = std['Int'].to_numpy(dtype=np.float64)[order]
+        self.residuals = np.full(len(order), np.nan)
+
+        if len(order):
+            changed = (self.elements[1:] != self.elements[:-1]) | (self.lines_of_rows[1:] != self.lines_of_rows[:-1])
+            starts = np.flatnonzero(np.r_[True, changed])
+            bounds = np.r_[starts, len(order)]
+            for g, start in enumerate(starts):
+                element, line = self.elements[start], self.lines_of_rows[start]
+                self.groups[(element, line)] = slice(start, bounds[g + 1])
+                self.lines.setdefault(element, []).append(line)
+            for element, element_lines in self.lines.items():
+                first = self.groups[(element, element_lines[0])].start
+                last = self.groups[(element, element_lines[-1])].stop
+                self.element_slices[element] = slice(first, last)
+            self.stats = self._fit(starts, bounds, self._blank_sd(df, registry))
+        logger.info(f"Calibration index built: {len(self.groups)} lines from {len(order)} standards")
+
+    def _blank_sd(self, df, registry):
+        """Intensity SD of the blank rows per (element, line)."""
+        blk = df[(df['Type'] == 'Blk') & (df['Int'] != -1.0)]
+        if blk.empty:
+            return {}
+        infos = [registry.info(name) for name in blk['Element']]
+        keys = [np.array([i.element for i in infos], dtype=object), np.array([i.line for i in infos], dtype=object)]
+        return blk['Int'].groupby(keys).std(ddof=1).to_dict()
+
+    def _fit(self, starts, bounds, blank_sd):
+        """Least-squares Int = slope * Soln Conc + intercept for every line in one pass."""
+        x = np.where(self.soln_conc == -1.0, np.nan, self.soln_conc)
+        y = np.where(self.intensity == -1.0, np.nan, self.intensity)
+        valid = ~np.isnan(x) & ~np.isnan(y)
+        xv = np.where(valid, x, 0.0)
+        yv = np.where(valid, y, 0.0)
+        w = valid.astype(np.float64)
+
+        n = np.add.reduceat(w, starts)
+        sx = np.add.reduceat(xv, starts)
+        sy = np.add.reduceat(yv, starts)
+        sxx = np.add.reduceat(xv * xv, starts)
+        sxy = np.add.reduceat(xv * yv, starts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denom = n * sxx - sx * sx
+            slope = np.where((n >= MIN_POINTS) & (denom != 0), (n * sxy - sx * sy) / denom, np.nan)
+            intercept = np.where(n > 0, (sy - slope * sx) / n, np.nan)
+            mean_y = np.where(n > 0, sy / n, np.nan)
+
+        group_of = np.repeat(np.arange(len(starts)), np.diff(bounds))
+        predicted = slope[group_of] * x + intercept[group_of]
+        self.residuals = np.where(valid, y - predicted, np.nan)
+        ss_res = np.add.reduceat(np.where(valid, self.residuals ** 2, 0.0), starts)
+        ss_tot = np.add.reduceat(np.where(valid, (y - mean_y[group_of]) ** 2, 0.0), starts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r_squared = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, np.nan)
+            relative = np.where(valid & (predicted != 0), np.abs(self.residuals / predicted) * 100, np.nan)
+        max_residual = pd.Series(relative).groupby(group_of).max().reindex(range(len(starts))).to_numpy()
+
+        keys = list(self.groups.keys())
+        sd = np.array([blank_sd.get(key, np.nan) for key in keys], dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lod = np.where(slope > 0, LOD_FACTOR * sd / slope, np.nan)
+            loq = np.where(slope > 0, LOQ_FACTOR * sd / slope, np.nan)
+
+        return pd.DataFrame({
+            'Element': [k[0] for k in keys],
+            'Wavelength': [k[1] for k in keys],
+            'Points': n.astype(int),
+            'Slope': slope,
+            'Intercept': intercept,
+            'R2': r_squared,
+            'Max Residual (%)': max_residual,
+            'Blank SD': sd,
+            'LOD': lod,
+            'LOQ': loq,
+        }, index=pd.MultiIndex.from_tuples(keys, names=['element', 'line']))
+
+    def rows(self, element, line=None):
+        """Slice of the index arrays for an element, or one of its wavelengths."""
+        if line is None:
+            return self.element_slices.get(element, slice(0, 0))
+        return self.groups.get((element, line), slice(0, 0))
+
+    def wavelengths(self, element):
+        return [line for line in self.lines.get(element, []) if line]
+
+    def line_stats(self, element, line=None):
+        """Stats rows for an element's wavelengths (all, or one)."""
+        if self.stats.empty or element not in self.lines:
+            return self.stats.iloc[0:0]
+        if line is None:
+            return self.stats.loc[[(element, l) for l in self.lines[element]]]
+        if (element, line) not in self.groups:
+            return self.stats.iloc[0:0]
+        return self.stats.loc[[(element, line)]]
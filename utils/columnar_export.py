@@ -0,0 +1,148 @@
+import os
+import logging
+import pandas as pd
+from PyQt6.QtWidgets import QFileDialog, QProgressDialog
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    pq = None
+    HAS_PYARROW = False
+
+# Rows per written chunk/record batch
+CHUNK_ROWS = 50000
+
+FILE_FILTERS = {
+    'parquet': "Parquet files (*.parquet)",
+    'arrow': "Arrow IPC files (*.arrow)",
+    'csv': "CSV files (*.csv)",
+}
+EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv'}
+
+
+def available_targets():
+    """Targets that can be written here; Parquet/Arrow need pyarrow."""
+    return ['parquet', 'arrow', 'csv'] if HAS_PYARROW else ['csv']
+
+
+def ask_export_path(parent, title, default_name):
+    """Ask for an output file and return (path, target), or (None, None) if cancelled."""
+    targets = available_targets()
+    filters = ";;".join(FILE_FILTERS[t] for t in targets)
+    path, selected = QFileDialog.getSaveFileName(parent, title, default_name + EXTENSIONS[targets[0]], filters)
+    if not path:
+        return None, None
+    extension = os.path.splitext(path)[1].lower()
+    target = next((t for t in targets if EXTENSIONS[t] == extension), None)
+    if target is None:
+        target = next((t for t in targets if FILE_FILTERS[t] == selected), 'csv')
+        path += EXTENSIONS[target]
+    return path, target
+
+
+def typed_frame(frame):
+    """Frame with unique string column names and object columns as strings (None for blanks)."""
+    frame = frame.copy()
+    names = [str(col) for col in frame.columns]
+    seen = {}
+    for i, name in enumerate(names):
+        if name in seen:
+            seen[name] += 1
+            names[i] = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+    frame.columns = names
+    for col in frame.columns:
+        if frame[col].dtype == object or isinstance(frame[col].dtype, pd.CategoricalDtype):
+            series = frame[col].astype(object)
+            frame[col] = series.where(series.isna(), series.astype(str))
+    return frame
+
+
+def arrow_schema(frame):
+    """Arrow schema for a typed_frame, with object columns pinned to string."""
+    schema = pa.Schema.from_pandas(frame.iloc[:0], preserve_index=False)
+    for i, col in enumerate(frame.columns):
+        if frame[col].dtype == object:
+            schema = schema.set(i, pa.field(col, pa.string()))
+    return schema
+
+
+def write_columnar(frame, file_path, target, chunk_rows=CHUNK_ROWS, progress=None):
+    """Write a frame as Parquet, Arrow IPC or CSV in chunks, without any styling."""
+    if target in ('parquet', 'arrow') and not HAS_PYARROW:
+        logger.warning(f"pyarrow is not installed, writing CSV instead of {target}")
+        file_path = os.path.splitext(file_path)[0] + EXTENSIONS['csv']
+        target = 'csv'
+
+    frame = typed_frame(frame)
+    n_rows = len(frame)
+    starts = range(0, max(n_rows, 1), chunk_rows)
+
+    if target == 'csv':
+        for i, start in enumerate(starts):
+            frame.iloc[start:start + chunk_rows].to_csv(
+                file_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False, encoding='utf-8'
+            )
+            if progress is not None:
+                progress(min(start + chunk_rows, n_rows) / max(n_rows, 1))
+    else:
+        schema = arrow_schema(frame)
+        if target == 'parquet':
+            writer = pq.ParquetWriter(file_path, schema)
+        else:
+            writer = pa.ipc.new_file(file_path, schema)
+        try:
+            for start in starts:
+                chunk = pa.Table.from_pandas(frame.iloc[start:start + chunk_rows], schema=schema, preserve_index=False)
+                writer.write_table(chunk)
+                if progress is not None:
+                    progress(min(start + chunk_rows, n_rows) / max(n_rows, 1))
+        finally:
+            writer.close()
+    logger.info(f"Exported {n_rows} rows as {target} to {file_path}")
+    return file_path
+
+
+class ColumnarExportThread(QThread):
+    """Thread for writing a columnar export in the background."""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, frame, file_path, target):
+        super().__init__()
+        self.frame = frame
+        self.file_path = file_path
+        self.target = target
+
+    def run(self):
+        try:
+            path = write_columnar(self.frame, self.file_path, self.target,
+                                  progress=lambda fraction: self.progress.emit(int(fraction * 100)))
+            self.finished.emit(path)
+        except Exception as e:
+            logger.error(f"Columnar export failed: {str(e)}")
+            self.error.emit(str(e))
+
+
+def start_columnar_export(parent, frame, file_path, target, on_finished, on_error, title="Exporting"):
+    """Run a columnar export behind a progress dialog and return the thread (keep a reference)."""
+    progress_dialog = QProgressDialog("Writing data file...", None, 0, 100, parent)
+    progress_dialog.setWindowTitle(title)
+    progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    progress_dialog.setAutoClose(True)
+    progress_dialog.show()
+
+    thread = ColumnarExportThread(frame, file_path, target)
+    thread.progress.connect(progress_dialog.setValue)
+    thread.finished.connect(lambda path: (progress_dialog.close(), on_finished(path)))
+    thread.error.connect(lambda message: (progress_dialog.close(), on_error(message)))
+    thread.start()
+    return thread
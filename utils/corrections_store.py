@@ -0,0 +1,135 @@
+import os
+import json
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+CORRECTIONS_DB = "user_corrections.db"
+# Former store, imported once under LEGACY_DATASET; its marks were not tied to a file
+LEGACY_FILE = "user_corrections.json"
+LEGACY_IMPORTED = 'legacy_imported'
+# Not a path, so it cannot collide with a dataset_key
+LEGACY_DATASET = '<legacy>'
+OUTLIER = 'outliers'
+NON_OUTLIER = 'non_outliers'
+# Superseded marks kept before the log is compacted on open
+COMPACT_THRESHOLD = 5000
+
+
+def dataset_key(file_path):
+    """Dataset the overrides belong to: the loaded file's full path, size and modification time.
+
+    Row ids are positions in the file, so a file with the same name elsewhere or one that
+    has been rewritten gets its own set of overrides.
+    """
+    if not file_path:
+        return ''
+    path = os.path.abspath(file_path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path
+    return f"{path}|{stat.st_size}|{int(stat.st_mtime)}"
+
+
+class CorrectionsStore:
+    """Append-only SQLite log of the RM outlier/non-outlier marks, indexed by (dataset, label, element).
+
+    Every mark is one INSERT; the latest mark of a row id wins when a dataset is loaded.
+    Superseded marks are deleted when enough of them have accumulated. A dataset without
+    marks of its own shows the imported legacy marks, and takes a copy of them with its
+    first mark.
+    """
+    def __init__(self, path=CORRECTIONS_DB, legacy_file=LEGACY_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rm_overrides ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, dataset TEXT NOT NULL, label TEXT NOT NULL, "
+            "element TEXT NOT NULL, row_id INTEGER NOT NULL, kind TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS rm_overrides_key ON rm_overrides (dataset, label, element)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self.conn.commit()
+        self.import_legacy(legacy_file)
+        self.compact()
+
+    def import_legacy(self, legacy_file):
+        """Copy the marks of the old JSON file under LEGACY_DATASET, once; the file itself is left untouched."""
+        if not legacy_file or not os.path.exists(legacy_file):
+            return
+        if self.conn.execute("SELECT 1 FROM store_meta WHERE key = ?", (LEGACY_IMPORTED,)).fetchone():
+            return
+        try:
+            with open(legacy_file, 'r') as f:
+                legacy = json.load(f)
+            rows = []
+            for user_key, marks in legacy.items():
+                label, _, element = user_key.rpartition(':')
+                for kind in (OUTLIER, NON_OUTLIER):
+                    rows.extend((LEGACY_DATASET, label, element, int(row_id), kind) for row_id in marks.get(kind, []))
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO rm_overrides (dataset, label, element, row_id, kind) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self.conn.execute(
+                    "INSERT INTO store_meta (key, value) VALUES (?, ?)", (LEGACY_IMPORTED, os.path.abspath(legacy_file))
+                )
+            logger.info(f"Imported {len(rows)} user corrections from {legacy_file}")
+        except Exception as e:
+            logger.error(f"Error importing user corrections from {legacy_file}: {e}")
+
+    def load(self, dataset):
+        """Overrides of one dataset as {"label:element": {'outliers': [...], 'non_outliers': [...]}}."""
+        corrections = {}
+        latest = {}
+        source = dataset if self.has_marks(dataset) else LEGACY_DATASET
+        cursor = self.conn.execute(
+            "SELECT label, element, row_id, kind FROM rm_overrides WHERE dataset = ? ORDER BY id", (source,)
+        )
+        for label, element, row_id, kind in cursor:
+            latest[(f"{label}:{element}", row_id)] = kind
+        for (user_key, row_id), kind in latest.items():
+            corrections.setdefault(user_key, {OUTLIER: [], NON_OUTLIER: []})[kind].append(row_id)
+        logger.debug(f"Loaded {len(latest)} user corrections for dataset '{dataset}'"
+                     + (" from the legacy import" if source == LEGACY_DATASET else ""))
+        return corrections
+
+    def has_marks(self, dataset):
+        return self.conn.execute("SELECT 1 FROM rm_overrides WHERE dataset = ? LIMIT 1", (dataset,)).fetchone() is not None
+
+    def mark(self, dataset, label, element, row_id, kind):
+        with self.conn:
+            if not self.has_marks(dataset):
+                # The dataset was showing the legacy marks; keep them once it has marks of its own
+                self.conn.execute(
+                    "INSERT INTO rm_overrides (dataset, label, element, row_id, kind) "
+                    "SELECT ?, label, element, row_id, kind FROM rm_overrides WHERE dataset = ? ORDER BY id",
+                    (dataset, LEGACY_DATASET)
+                )
+            self.conn.execute(
+                "INSERT INTO rm_overrides (dataset, label, element, row_id, kind) VALUES (?, ?, ?, ?, ?)",
+                (dataset, label, element, int(row_id), kind)
+            )
+
+    def compact(self, threshold=COMPACT_THRESHOLD):
+        """Delete marks overridden by a later mark of the same row, once there are more than threshold."""
+        total, = self.conn.execute("SELECT COUNT(*) FROM rm_overrides").fetchone()
+        current, = self.conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM rm_overrides GROUP BY dataset, label, element, row_id)"
+        ).fetchone()
+        if total - current <= threshold:
+            return
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM rm_overrides WHERE id NOT IN "
+                "(SELECT MAX(id) FROM rm_overrides GROUP BY dataset, label, element, row_id)"
+            )
+        logger.info(f"Compacted user corrections: removed {total - current} superseded marks")
+
+    def close(self):
+        self.conn.close()
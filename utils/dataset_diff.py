@@ -0,0 +1,84 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Cells whose values agree within these tolerances are not reported as changed
+RTOL = 1e-9
+ATOL = 1e-12
+
+
+def cell_keys(df, value_column='Corr Con'):
+    """(row keys, element names, values) of a long table.
+
+    Repeated readings of a Solution Label/Element get their occurrence as a suffix
+    ("S1", "S1 #2", ...), so the nth reading of one run lines up with the nth of the other.
+    """
+    labels = df['Solution Label'].astype(str).to_numpy(dtype=object)
+    elements = df['Element'].astype(str).to_numpy(dtype=object)
+    occurrence = df.groupby([labels, elements], sort=False).cumcount().to_numpy()
+    suffix = np.where(occurrence > 0, pd.Series(occurrence + 1).map(" #{}".format).to_numpy(dtype=object), "")
+    rows = labels + suffix
+    values = pd.to_numeric(df[value_column], errors='coerce').to_numpy(dtype=np.float64)
+    return rows, elements, values
+
+
+class DatasetDiff:
+    """Two versions of a table aligned on (label, element) as before/after matrices.
+
+    Rows and columns are the union of both sides in first-seen order; a cell missing on
+    one side is NaN there. Absolute and relative changes are computed once for the whole
+    matrix, and the change list is built from the changed mask.
+    """
+    def __init__(self, before, after, value_column='Corr Con'):
+        b_rows, b_elements, b_values = cell_keys(before, value_column)
+        a_rows, a_elements, a_values = cell_keys(after, value_column)
+
+        self.rows = pd.Index(pd.unique(np.concatenate([b_rows, a_rows])))
+        self.elements = pd.Index(pd.unique(np.concatenate([b_elements, a_elements])))
+        shape = (len(self.rows), len(self.elements))
+        self.before = np.full(shape, np.nan)
+        self.after = np.full(shape, np.nan)
+        for matrix, rows, elements, values in ((self.before, b_rows, b_elements, b_values),
+                                               (self.after, a_rows, a_elements, a_values)):
+            r = pd.Categorical(rows, categories=self.rows).codes
+            c = pd.Categorical(elements, categories=self.elements).codes
+            matrix[r, c] = values
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.absolute = self.after - self.before
+            self.relative = np.where(self.before != 0, self.absolute / np.abs(self.before) * 100, np.nan)
+        before_nan, after_nan = np.isnan(self.before), np.isnan(self.after)
+        same = np.isclose(self.before, self.after, rtol=RTOL, atol=ATOL) | (before_nan & after_nan)
+        self.changed = ~same
+        self.added = before_nan & ~after_nan
+        self.removed = ~before_nan & after_nan
+        logger.debug(f"Diff of {shape[0]}x{shape[1]} cells: {int(self.changed.sum())} changed")
+
+    @property
+    def shape(self):
+        return self.before.shape
+
+    def changed_rows(self):
+        """Row positions with at least one changed cell."""
+        return np.flatnonzero(self.changed.any(axis=1))
+
+    def summary(self):
+        changed = int(self.changed.sum())
+        return (f"{changed} of {self.changed.size} cells changed in {len(self.changed_rows())} rows "
+                f"({int(self.added.sum())} added, {int(self.removed.sum())} removed)")
+
+    def change_list(self):
+        """One row per changed cell: label, element, before, after, change and change (%)."""
+        r, c = np.nonzero(self.changed)
+        status = np.where(self.added[r, c], 'added', np.where(self.removed[r, c], 'removed', 'changed'))
+        return pd.DataFrame({
+            'Solution Label': self.rows.to_numpy(dtype=object)[r],
+            'Element': self.elements.to_numpy(dtype=object)[c],
+            'Before': self.before[r, c],
+            'After': self.after[r, c],
+            'Change': self.absolute[r, c],
+            'Change (%)': self.relative[r, c],
+            'Status': status,
+        })
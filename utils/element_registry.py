@@ -0,0 +1,137 @@
+import re
+import logging
+from screens.pivot.oxide_factors import oxide_factors
+
+logger = logging.getLogger(__name__)
+
+# Reverse lookup: oxide formula -> element symbol (e.g. 'Al2O3' -> 'Al')
+OXIDE_TO_ELEMENT = {formula: el for el, (formula, _) in oxide_factors.items()}
+
+_WAVELENGTH_RE = re.compile(r'\s+\d+\.\d+')
+
+
+class ColumnInfo:
+    """Parsed metadata for a single element/wavelength column name."""
+    __slots__ = ('name', 'base', 'element', 'wavelength', 'line', 'stem',
+                 'oxide_formula', 'oxide_factor', 'is_oxide')
+
+    def __init__(self, name):
+        self.name = name
+        text = str(name).strip()
+        self.base = text.split('_')[0].strip()  # 'Cu 324.754_1' -> 'Cu 324.754'
+        self.stem = _WAVELENGTH_RE.split(text)[0].strip()  # 'Cu 324.754 ppm' -> 'Cu'
+        self.is_oxide = self.base in OXIDE_TO_ELEMENT
+        parts = self.base.split()
+        if self.is_oxide:
+            self.element = OXIDE_TO_ELEMENT[self.base]
+        else:
+            self.element = parts[0] if parts else self.base
+        self.line = ' '.join(parts[1:])  # wavelength text as displayed, e.g. '324.754'
+        try:
+            self.wavelength = float(parts[1]) if len(parts) > 1 else None
+        except ValueError:
+            self.wavelength = None
+        if self.element in oxide_factors:
+            self.oxide_formula, self.oxide_factor = oxide_factors[self.element]
+        else:
+            self.oxide_formula, self.oxide_factor = None, 1.0
+
+    def __repr__(self):
+        return f"ColumnInfo({self.name!r}, element={self.element!r}, wavelength={self.wavelength})"
+
+
+class ElementRegistry:
+    """Column metadata registry built once per dataset for O(1) element/wavelength lookups."""
+    def __init__(self, names=None):
+        self._info = {}
+        self._by_element = {}
+        self._raw_by_element = {}
+        self._positions = {}
+        if names is not None:
+            self.register(names)
+
+    @classmethod
+    def from_dataframe(cls, df, column='Element'):
+        """Build a registry from the unique values of a long-format Element column."""
+        if df is None or column not in df.columns:
+            return cls()
+        return cls(df[column].dropna().unique())
+
+    def register(self, names):
+        for name in names:
+            if name == 'Solution Label' or name in self._info:
+                continue
+            info = ColumnInfo(name)
+            self._info[name] = info
+            columns = self._by_element.setdefault(info.element, [])
+            if info.base not in columns:
+                columns.append(info.base)
+            self._raw_by_element.setdefault(info.element, []).append(name)
+
+    def info(self, name):
+        """Return the ColumnInfo for a column, parsing and caching unseen names.
+
+        Returns None for columns that are not element columns ('Solution Label').
+        """
+        info = self._info.get(name)
+        if info is None:
+            self.register([name])
+            info = self._info.get(name)
+        return info
+
+    def element_of(self, name):
+        info = self.info(name)
+        return info.element if info is not None else None
+
+    def wavelength_of(self, name):
+        info = self.info(name)
+        return info.wavelength if info is not None else None
+
+    def base_of(self, name):
+        info = self.info(name)
+        return info.base if info is not None else None
+
+    def stem_of(self, name):
+        info = self.info(name)
+        return info.stem if info is not None else None
+
+    def oxide_of(self, name):
+        """Return (oxide_formula, factor) for a column, or (None, 1.0) if it has no oxide."""
+        info = self.info(name)
+        if info is None:
+            return None, 1.0
+        return info.oxide_formula, info.oxide_factor
+
+    def elements(self):
+        return list(self._by_element.keys())
+
+    def columns_for(self, element):
+        """Return the base column names ('Cu 324.754', 'Cu 327.395') measured for an element."""
+        return list(self._by_element.get(element, []))
+
+    def raw_names_for(self, element, line=None):
+        """Return the original Element values for an element, optionally limited to one wavelength."""
+        names = self._raw_by_element.get(element, [])
+        if line is None:
+            return list(names)
+        return [n for n in names if self._info[n].line == line]
+
+    def set_positions(self, view, columns):
+        """Record the column positions of a pivot view (e.g. 'pivot', 'view')."""
+        self._positions[view] = {col: i for i, col in enumerate(columns)}
+
+    def position(self, view, name):
+        """Return the column index of name in the given view, or None."""
+        return self._positions.get(view, {}).get(name)
+
+    def clear(self):
+        self._info.clear()
+        self._by_element.clear()
+        self._raw_by_element.clear()
+        self._positions.clear()
+
+    def __contains__(self, name):
+        return name in self._info
+
+    def __len__(self):
+        return len(self._info)
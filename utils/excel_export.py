@@ -0,0 +1,157 @@
+import logging
+import pandas as pd
+from PyQt6.QtWidgets import QProgressDialog
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from xlsxwriter import Workbook
+
+logger = logging.getLogger(__name__)
+
+# Rows written between two progress updates
+PROGRESS_STEP = 500
+
+
+class SheetSpec:
+    """Everything the export engine needs to stream one worksheet.
+
+    frame holds the cell values (header = frame.columns). row_styles is an optional
+    per-row list of format names (default_style otherwise); first_column_style, when
+    set, overrides the style of column 0. cell_styles is an optional (rows x columns)
+    object array of format names overriding single cells (None keeps the row style).
+    conditional_formats is a list of
+    (first_row, first_col, last_row, last_col, options) in data-row coordinates,
+    where options['format'] is a format name.
+    """
+    def __init__(self, name, frame, header_style='header', default_style='cell', row_styles=None,
+                 first_column_style=None, cell_styles=None, conditional_formats=None, column_widths=None):
+        self.name = name
+        self.frame = frame
+        self.header_style = header_style
+        self.default_style = default_style
+        self.row_styles = row_styles
+        self.first_column_style = first_column_style
+        self.cell_styles = cell_styles
+        self.conditional_formats = conditional_formats or []
+        self.column_widths = column_widths
+
+
+def numeric_or_text(series, decimals=None):
+    """Column values as numbers where they parse, original values elsewhere, None for blanks."""
+    numeric = pd.to_numeric(series, errors='coerce')
+    if decimals is not None:
+        numeric = numeric.round(decimals)
+    values = series.astype(object).where(numeric.isna(), numeric.astype(object))
+    return values.where(series.notna() & (series.astype(str) != ''), None)
+
+
+def auto_widths(frame, minimum=8, maximum=60, scale=1.2):
+    """Column widths from the longest header/value text in each column."""
+    widths = []
+    for col in frame.columns:
+        lengths = frame[col].astype(str).str.len()
+        longest = max(len(str(col)), int(lengths.max()) if len(lengths) else 0)
+        widths.append(min(maximum, max(minimum, longest * scale)))
+    return widths
+
+
+def write_workbook(file_path, sheets, formats, progress=None):
+    """Stream sheets to an .xlsx file in constant-memory mode using shared named formats.
+
+    Values are prepared column by column up front; rows are then streamed in order since
+    constant_memory flushes each row as soon as the next one starts.
+    """
+    total_rows = max(1, sum(len(sheet.frame) for sheet in sheets))
+    done = 0
+    with Workbook(file_path, {'constant_memory': True, 'nan_inf_to_errors': True}) as workbook:
+        named = {name: workbook.add_format(props) for name, props in formats.items()}
+        for sheet in sheets:
+            worksheet = workbook.add_worksheet(sheet.name)
+            frame = sheet.frame
+            n_rows, n_cols = frame.shape
+
+            widths = sheet.column_widths or auto_widths(frame)
+            for ci, width in enumerate(widths):
+                worksheet.set_column(ci, ci, width)
+
+            worksheet.write_row(0, 0, [str(col) for col in frame.columns], named[sheet.header_style])
+
+            # Column-at-a-time conversion: NaN -> blank, numpy scalars -> python values
+            columns = []
+            for ci in range(n_cols):
+                col = frame.iloc[:, ci]
+                columns.append(col.astype(object).where(col.notna(), None).tolist())
+            rows = zip(*columns) if n_cols else iter([()] * n_rows)
+
+            row_styles = sheet.row_styles if sheet.row_styles is not None else [sheet.default_style] * n_rows
+            first_format = named[sheet.first_column_style] if sheet.first_column_style else None
+            cell_styles = sheet.cell_styles
+            styled_rows = pd.notna(cell_styles).any(axis=1) if cell_styles is not None else None
+            for r, (values, style) in enumerate(zip(rows, row_styles), 1):
+                row_format = named[style]
+                if styled_rows is not None and styled_rows[r - 1]:
+                    for ci, value in enumerate(values):
+                        cell_style = cell_styles[r - 1, ci]
+                        if cell_style is not None:
+                            cell_format = named[cell_style]
+                        elif ci == 0 and first_format is not None:
+                            cell_format = first_format
+                        else:
+                            cell_format = row_format
+                        worksheet.write(r, ci, value, cell_format)
+                elif first_format is not None and n_cols:
+                    worksheet.write(r, 0, values[0], first_format)
+                    worksheet.write_row(r, 1, values[1:], row_format)
+                else:
+                    worksheet.write_row(r, 0, values, row_format)
+                if progress is not None and r % PROGRESS_STEP == 0:
+                    progress((done + r) / total_rows)
+            done += n_rows
+
+            for first_row, first_col, last_row, last_col, options in sheet.conditional_formats:
+                options = dict(options)
+                if 'format' in options:
+                    options['format'] = named[options['format']]
+                worksheet.conditional_format(first_row + 1, first_col, last_row + 1, last_col, options)
+    if progress is not None:
+        progress(1.0)
+    logger.info(f"Exported {done} rows in {len(sheets)} sheet(s) to {file_path}")
+
+
+class ExcelExportThread(QThread):
+    """Thread for writing a workbook in the background."""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, file_path, sheets, formats):
+        super().__init__()
+        self.file_path = file_path
+        self.sheets = sheets
+        self.formats = formats
+
+    def run(self):
+        try:
+            write_workbook(self.file_path, self.sheets, self.formats,
+                           progress=lambda fraction: self.progress.emit(int(fraction * 100)))
+            self.finished.emit(self.file_path)
+        except Exception as e:
+            logger.error(f"Excel export failed: {str(e)}")
+            self.error.emit(str(e))
+
+
+def start_excel_export(parent, file_path, sheets, formats, on_finished, on_error, title="Exporting"):
+    """Run an export on an ExcelExportThread behind a progress dialog and return the thread.
+
+    The caller must keep a reference to the returned thread until it finishes.
+    """
+    progress_dialog = QProgressDialog("Writing Excel file...", None, 0, 100, parent)
+    progress_dialog.setWindowTitle(title)
+    progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    progress_dialog.setAutoClose(True)
+    progress_dialog.show()
+
+    thread = ExcelExportThread(file_path, sheets, formats)
+    thread.progress.connect(progress_dialog.setValue)
+    thread.finished.connect(lambda path: (progress_dialog.close(), on_finished(path)))
+    thread.error.connect(lambda message: (progress_dialog.close(), on_error(message)))
+    thread.start()
+    return thread
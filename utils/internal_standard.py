@@ -0,0 +1,80 @@
+import logging
+import numpy as np
+import pandas as pd
+from utils.blank_correction import run_order
+from utils import provenance
+
+logger = logging.getLogger(__name__)
+
+# Elements commonly added as internal standard
+IS_ELEMENTS = ['Y', 'Sc']
+# Column keeping the applied recovery, so the step can be recomputed instead of stacked
+RECOVERY_COLUMN = 'IS Recovery'
+CORRECTED_TYPES = ['Samp', 'Sample', 'RM']
+# Recoveries outside this range (%) are flagged in the preview
+RECOVERY_RANGE = (80.0, 120.0)
+
+
+def internal_standard_lines(elements, registry):
+    """Element names (with wavelength) of the usual internal standards, in data order."""
+    return [name for name in pd.unique(pd.Series(elements).dropna()) if registry.element_of(name) in IS_ELEMENTS]
+
+
+def is_recovery(df, is_line):
+    """Recovery of the IS line in every run segment, relative to its mean intensity in the standards.
+
+    A run segment is a stretch of consecutive rows with the same Solution Label. Returns
+    (segment of every row, recovery per segment, reference intensity); segments without
+    an IS reading get NaN.
+    """
+    segment = run_order(df['Solution Label']).astype(np.int64) - 1
+    intensity = pd.to_numeric(df['Int'], errors='coerce').to_numpy(dtype=np.float64)
+    is_rows = (df['Element'] == is_line).to_numpy() & ~np.isnan(intensity)
+
+    std_rows = is_rows & (df['Type'] == 'Std').to_numpy()
+    if not std_rows.any():
+        raise ValueError(f"No calibration standard has a reading for {is_line}")
+    reference = intensity[std_rows].mean()
+
+    n_segments = int(segment.max()) + 1 if len(segment) else 0
+    count = np.bincount(segment[is_rows], minlength=n_segments)
+    total = np.bincount(segment[is_rows], weights=intensity[is_rows], minlength=n_segments)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        recovery = np.where((count > 0) & (reference != 0), total / count / reference, np.nan)
+    return segment, recovery, reference
+
+
+def apply_internal_standard(df, is_line):
+    """Copy of df with Corr Con of every non-IS row divided by its segment's IS recovery.
+
+    The recovery is gathered per row from the segment vector, so the cost is one pass over
+    the rows whatever the number of elements. A previously applied recovery is undone first.
+    Returns (corrected frame, preview table per Solution Label).
+    """
+    segment, recovery, reference = is_recovery(df, is_line)
+    values = pd.to_numeric(df['Corr Con'], errors='coerce').to_numpy(dtype=np.float64)
+    if RECOVERY_COLUMN in df.columns:
+        values = values * df[RECOVERY_COLUMN].fillna(1.0).to_numpy(dtype=np.float64)
+
+    row_recovery = recovery[segment]
+    target = df['Type'].isin(CORRECTED_TYPES).to_numpy() & (df['Element'] != is_line).to_numpy()
+    applied = np.where(target & (row_recovery > 0), row_recovery, 1.0)
+
+    corrected = df.copy()
+    corrected['Corr Con'] = np.where(np.isnan(values), corrected['Corr Con'], values / applied)
+    # Kept in float64: it is divided back out exactly when the step is re-applied
+    corrected[RECOVERY_COLUMN] = applied
+    provenance.mark(corrected, applied != 1.0, provenance.IS, exclusive=True)
+
+    labels = df['Solution Label'].to_numpy(dtype=object)
+    first = np.unique(segment, return_index=True)[1]
+    corrected_segments = np.bincount(segment[target], minlength=len(recovery)) > 0
+    preview = pd.DataFrame({
+        'Solution Label': labels[first],
+        'Type': df['Type'].to_numpy(dtype=object)[first],
+        'IS Int': recovery * reference,
+        'Recovery (%)': recovery * 100,
+        'Corrected': corrected_segments & ~np.isnan(recovery),
+    })
+    logger.debug(f"IS correction with {is_line}: reference {reference:.1f}, {int(preview['Corrected'].sum())} solutions corrected")
+    return corrected, preview
@@ -0,0 +1,234 @@
+import json
+import time
+import logging
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import QObject, pyqtSignal
+from utils.blank_correction import subtract_blank
+from utils.internal_standard import apply_internal_standard
+from utils import provenance
+
+logger = logging.getLogger(__name__)
+
+CACHED = 'cached'
+STALE = 'stale'
+RUNNING = 'recomputing'
+
+
+def rescale_samples(df, new_values, column, flag):
+    """Set a per-label Act Wgt/Act Vol on the Samp rows, rescale their Corr Con by new/old and mark them.
+
+    Rows whose current value is missing, non-numeric or 0 cannot be rescaled; they are left
+    unchanged and logged.
+    """
+    df = df.copy()
+    target = (df['Type'] == 'Samp') & df['Solution Label'].isin(list(new_values))
+    current = pd.to_numeric(df[column], errors='coerce')
+    invalid = target & (~np.isfinite(current) | (current == 0))
+    if invalid.any():
+        labels = sorted(df.loc[invalid, 'Solution Label'].astype(str).unique())
+        logger.warning(f"Skipped {int(invalid.sum())} rows with an invalid current {column}: {', '.join(labels)}")
+        target &= ~invalid
+    new = df.loc[target, 'Solution Label'].map(new_values).astype(float)
+    current = current[target]
+    df.loc[target, 'Corr Con'] = pd.to_numeric(df.loc[target, 'Corr Con'], errors='coerce') * new / current
+    df.loc[target, column] = new
+    provenance.mark(df, target, flag)
+    return df
+
+
+def set_dilution_factors(df, factors):
+    """Set a per-label DF on the Samp rows."""
+    df = df.copy()
+    target = (df['Type'] == 'Samp') & df['Solution Label'].isin(list(factors))
+    df.loc[target, 'DF'] = df.loc[target, 'Solution Label'].map(factors).astype(float)
+    provenance.mark(df, target, provenance.DF)
+    return df
+
+
+def mark_crm_scale(df, corrections):
+    """Set the CRM Scale bit on the sample rows of the elements corrected in the pivot.
+
+    corrections is {pivot column: {'blank', 'scale', 'elements'}}; the values themselves are
+    corrected in the pivot only, so this stage just carries the bit and its parameters.
+    """
+    df = df.copy()
+    names = {name for correction in corrections.values() for name in correction.get('elements', [])}
+    target = df['Type'].isin(['Samp', 'Sample']) & df['Element'].isin(names)
+    provenance.mark(df, target, provenance.CRM_SCALE, exclusive=True)
+    return df
+
+
+class PipelineStage:
+    """One Process step: its parameters and the memoised output for (input version, parameters)."""
+    def __init__(self, name, compute=None):
+        self.name = name
+        self.compute = compute  # compute(df, params) -> df, or None for steps that can only be committed
+        self.params = None
+        self.key = None
+        self.output = None
+        self.version = 0
+        self.state = STALE
+        self.seconds = None
+        # Output is the unchanged input: an interactive stage not committed again, or a failed compute
+        self.passthrough = False
+
+
+class ProcessPipeline(QObject):
+    """Explicit Weight -> Volume -> DF -> Blank -> IS -> RM Drift -> CRM Scale -> Result chain over the loaded data.
+
+    Each stage keeps its output with the key (input version, parameters). Changing a stage's
+    parameters, or committing a new output from its tab, only invalidates that stage and the
+    ones after it; unchanged upstream outputs are reused. Stages without a compute function
+    (RM Drift) pass their input through while stale until their tab commits again.
+    """
+    status_changed = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.stages = [
+            PipelineStage('Weight', lambda df, p: rescale_samples(df, p, 'Act Wgt', provenance.WEIGHT)),
+            PipelineStage('Volume', lambda df, p: rescale_samples(df, p, 'Act Vol', provenance.VOLUME)),
+            PipelineStage('DF', set_dilution_factors),
+            PipelineStage('Blank', lambda df, p: subtract_blank(df, p['value_column'])[0]),
+            PipelineStage('IS', lambda df, p: apply_internal_standard(df, p['line'])[0]),
+            PipelineStage('RM Drift'),
+            PipelineStage('CRM Scale', mark_crm_scale),
+            PipelineStage('Result'),
+        ]
+        self.index = {stage.name: i for i, stage in enumerate(self.stages)}
+        self.source = None
+        self.source_version = 0
+        self._next_version = 0
+
+    def _new_version(self):
+        self._next_version += 1
+        return self._next_version
+
+    @staticmethod
+    def params_token(params):
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def set_source(self, df):
+        """New loaded data: every stage is stale, parameters are cleared."""
+        self.source = df
+        self.source_version = self._new_version()
+        for stage in self.stages:
+            stage.params = None
+            stage.key = None
+            stage.output = None
+            stage.passthrough = False
+        self.invalidate(0)
+
+    def invalidate(self, start):
+        for stage in self.stages[start:]:
+            stage.state = STALE
+        self.status_changed.emit()
+
+    def params(self, name):
+        return self.stages[self.index[name]].params
+
+    def set_params(self, name, params):
+        """Change a stage's parameters; it and the following stages recompute on the next output()."""
+        i = self.index[name]
+        self.stages[i].params = params or None
+        self.invalidate(i)
+
+    def commit(self, name, df, params):
+        """Store an output computed by a stage's own tab for its current input and the given parameters."""
+        i = self.index[name]
+        df_in, in_version = self._input(i)
+        stage = self.stages[i]
+        self.record_provenance(stage, df, df_in, params)
+        stage.params = params
+        stage.key = (in_version, self.params_token(params))
+        stage.output = df
+        stage.passthrough = False
+        stage.version = self._new_version()
+        stage.state = CACHED
+        self.invalidate(i + 1)
+
+    def restore(self, name, df, params):
+        """Put back an earlier output of a stage (undo/redo); a None output makes it recompute or pass through."""
+        i = self.index[name]
+        stage = self.stages[i]
+        if df is None:
+            stage.params, stage.key, stage.output = params, None, None
+            self.invalidate(i)
+        else:
+            self.commit(name, df, params)
+
+    def cached_output(self, name):
+        """Current output of a stage, or None when it only passes its input through while stale."""
+        stage = self._ensure(self.index[name])
+        return stage.output if stage.state == CACHED else None
+
+    def version(self, name):
+        """Version of a stage's current output, or None while it only passes its input through."""
+        stage = self._ensure(self.index[name])
+        return stage.version if stage.state == CACHED else None
+
+    def input_for(self, name):
+        return self._input(self.index[name])[0]
+
+    def output(self, name):
+        return self._ensure(self.index[name]).output
+
+    def _input(self, i):
+        if i == 0:
+            return self.source, self.source_version
+        previous = self._ensure(i - 1)
+        return previous.output, previous.version
+
+    def _ensure(self, i):
+        """Bring stage i up to date, recomputing only when its (input version, parameters) key changed."""
+        stage = self.stages[i]
+        df, in_version = self._input(i)
+        key = (in_version, self.params_token(stage.params))
+        if stage.key == key and stage.output is not None:
+            if stage.state != CACHED and not stage.passthrough:
+                stage.state = CACHED
+                self.status_changed.emit()
+            return stage
+
+        previous = stage.output
+        stage.key = key
+        stage.passthrough = False
+        if stage.params is None:
+            stage.output, stage.state = df, CACHED
+        elif stage.compute is None:
+            # Interactive stage whose input changed: pass through until its tab commits again
+            stage.output, stage.state, stage.passthrough = df, STALE, True
+        else:
+            stage.state = RUNNING
+            self.status_changed.emit()
+            start = time.time()
+            try:
+                stage.output = stage.compute(df, stage.params)
+                self.record_provenance(stage, stage.output, df, stage.params)
+                stage.state = CACHED
+            except Exception as e:
+                logger.error(f"Stage {stage.name} failed, passing its input through: {str(e)}")
+                stage.output, stage.state, stage.passthrough = df, STALE, True
+            stage.seconds = time.time() - start
+            logger.debug(f"Stage {stage.name} recomputed in {stage.seconds:.3f} seconds")
+        # Downstream keys follow the version, so keep it while the output object is unchanged
+        if stage.output is not previous:
+            stage.version = self._new_version()
+        self.status_changed.emit()
+        return stage
+
+    @staticmethod
+    def record_provenance(stage, df, df_in, params=None):
+        """Carry the correction-parameter side table into a stage output and add the stage's own entry."""
+        if df is None or df is df_in:
+            return
+        provenance.ensure_provenance(df)
+        if params is not None and stage.name in provenance.STAGE_FLAGS:
+            provenance.record_parameters(df, provenance.STAGE_FLAGS[stage.name], params, base=df_in)
+        elif df_in is not None:
+            df.attrs[provenance.PARAMETERS_ATTR] = {**provenance.parameters(df_in), **provenance.parameters(df)}
+
+    def status(self):
+        """(name, state, seconds of the last recompute, has parameters) of every stage in order."""
+        return [(stage.name, stage.state, stage.seconds, stage.params is not None) for stage in self.stages]
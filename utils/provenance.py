@@ -0,0 +1,103 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# uint16 bitmask next to Corr Con: which corrections touched each value
+PROVENANCE_COLUMN = 'Provenance'
+WEIGHT = 1
+VOLUME = 2
+DF = 4
+DRIFT = 8
+BLANK = 16
+IS = 32
+CRM_SCALE = 64
+# Bit -> correction name; the names match the Process pipeline stages
+FLAG_NAMES = {
+    WEIGHT: 'Weight',
+    VOLUME: 'Volume',
+    DF: 'DF',
+    DRIFT: 'RM Drift',
+    BLANK: 'Blank',
+    IS: 'IS',
+    CRM_SCALE: 'CRM Scale',
+}
+STAGE_FLAGS = {name: flag for flag, name in FLAG_NAMES.items()}
+# df.attrs key of the side table {correction name: parameters}
+PARAMETERS_ATTR = 'correction_parameters'
+
+
+def ensure_provenance(df):
+    """Add an all-zero Provenance column, or restore its uint16 dtype (lost e.g. in a JSON round trip)."""
+    if PROVENANCE_COLUMN not in df.columns:
+        df[PROVENANCE_COLUMN] = np.zeros(len(df), dtype=np.uint16)
+    elif df[PROVENANCE_COLUMN].dtype != np.uint16:
+        df[PROVENANCE_COLUMN] = pd.to_numeric(df[PROVENANCE_COLUMN], errors='coerce').fillna(0).astype(np.uint16)
+    return df
+
+
+def mark(df, mask, flag, exclusive=False):
+    """Set a correction bit on the masked rows in place; exclusive clears it on the other rows."""
+    ensure_provenance(df)
+    bits = df[PROVENANCE_COLUMN].to_numpy(dtype=np.uint16, copy=True)
+    if exclusive:
+        bits &= np.uint16(~flag & 0xFFFF)
+    bits[np.asarray(mask, dtype=bool)] |= np.uint16(flag)
+    df[PROVENANCE_COLUMN] = bits
+    return df
+
+
+def record_parameters(df, flag, params, base=None):
+    """Store the parameters of a correction in the side table of df (kept in df.attrs).
+
+    The table is replaced rather than updated, so frames sharing attrs are not affected;
+    base is a frame whose side table is carried over (e.g. the input of a stage).
+    """
+    table = dict(parameters(base)) if base is not None else {}
+    table.update(parameters(df))
+    table[FLAG_NAMES[flag]] = params
+    df.attrs[PARAMETERS_ATTR] = table
+    return df
+
+
+def parameters(df):
+    return df.attrs.get(PARAMETERS_ATTR, {}) if df is not None else {}
+
+
+def decode(bits):
+    """Names of the corrections set in one bitmask value."""
+    bits = int(bits) if not pd.isna(bits) else 0
+    return [name for flag, name in FLAG_NAMES.items() if bits & flag]
+
+
+def describe_provenance(df):
+    """Copy of df with a readable Corrections column; decoded once per distinct bitmask."""
+    df = df.copy()
+    if PROVENANCE_COLUMN not in df.columns:
+        df['Corrections'] = ''
+        return df
+    codes, uniques = pd.factorize(df[PROVENANCE_COLUMN])
+    names = np.array([', '.join(decode(bits)) for bits in uniques] + [''], dtype=object)
+    df['Corrections'] = names[codes]
+    return df
+
+
+def lineage(bits, table, keys=()):
+    """Lines describing every correction of one value with its parameters, for the cell information.
+
+    keys (e.g. Solution Label, element) pick the entry of per-label/per-element parameters.
+    """
+    lines = []
+    for name in decode(bits):
+        params = table.get(name)
+        key = next((k for k in keys if isinstance(params, dict) and k in params), None)
+        if key is not None:
+            detail = f"{params[key]}"
+        elif isinstance(params, dict) and params:
+            items = list(params.items())
+            detail = ", ".join(f"{k}={v}" for k, v in items[:4]) + (" ..." if len(items) > 4 else "")
+        else:
+            detail = ""
+        lines.append(f"{name}: {detail}" if detail else name)
+    return lines
@@ -0,0 +1,44 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Replicate RSD (%) above which a pivot cell is flagged
+HIGH_RSD = 10.0
+
+
+def replicate_stats(df, value_column, label_column='Solution Label', element_column='Element'):
+    """Mean, SD, RSD (%) and count of the replicates of every (label, element) cell.
+
+    Labels and elements are factorized once and the cells reduced with bincount over
+    the combined integer code, so all four statistics come from the same grouping.
+    Returns a dict of DataFrames ('mean', 'sd', 'rsd', 'count') indexed by label and
+    with one column per element, both in order of first appearance. SD/RSD need at
+    least two numeric replicates and are NaN otherwise.
+    """
+    label_codes, labels = pd.factorize(df[label_column])
+    element_codes, elements = pd.factorize(df[element_column])
+    values = pd.to_numeric(df[value_column], errors='coerce').to_numpy(dtype=np.float64)
+    n_labels, n_elements = len(labels), len(elements)
+
+    valid = (label_codes >= 0) & (element_codes >= 0) & ~np.isnan(values)
+    cell = label_codes[valid] * n_elements + element_codes[valid]
+    values = values[valid]
+    size = n_labels * n_elements
+
+    count = np.bincount(cell, minlength=size)
+    total = np.bincount(cell, weights=values, minlength=size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(count > 0, total / count, np.nan)
+        deviation = values - mean[cell]
+        sum_squares = np.bincount(cell, weights=deviation * deviation, minlength=size)
+        sd = np.where(count >= 2, np.sqrt(sum_squares / (count - 1)), np.nan)
+        rsd = np.where(mean != 0, sd / np.abs(mean) * 100, np.nan)
+
+    def frame(matrix):
+        return pd.DataFrame(matrix.reshape(n_labels, n_elements), index=pd.Index(labels, name=label_column),
+                            columns=list(elements))
+
+    logger.debug(f"Replicate stats for {n_labels} labels x {n_elements} elements from {len(values)} values")
+    return {'mean': frame(mean), 'sd': frame(sd), 'rsd': frame(rsd), 'count': frame(count)}
@@ -0,0 +1,356 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for the (samples x controls x columns) score block held in memory at once
+MAX_BLOCK_BYTES = 64 * 1024 * 1024
+# Upper bound for the cached per-group partial sums kept for instant re-weighting
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def to_feature_array(df, col_map, columns):
+    """Return a float64 (rows x columns) array of the mapped numeric columns, NaN where missing."""
+    if not columns:
+        return np.empty((len(df), 0), dtype=np.float64)
+    data = df[[col_map[col] for col in columns]].apply(pd.to_numeric, errors='coerce')
+    return data.to_numpy(dtype=np.float64)
+
+
+def pair_scores(s, c):
+    """Per-column scores 1/(1+|s-c|/|c|) for broadcastable sample/control arrays.
+
+    Pairs with a NaN on either side score 0; a zero control value scores 1 only if the
+    sample value is also zero.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = 1.0 / (1.0 + np.abs(s - c) / np.abs(c))
+    scores = np.where(c == 0, (s == 0).astype(np.float64), scores)
+    scores[np.isnan(scores)] = 0.0
+    return scores
+
+
+def column_scores(sample_block, controls):
+    """Unweighted per-column scores for a block of samples against all controls.
+
+    Returns a (block x controls x columns) array.
+    """
+    return pair_scores(sample_block[:, None, :], controls[None, :, :])
+
+
+def block_size(n_controls, n_columns, max_bytes=MAX_BLOCK_BYTES):
+    """Number of sample rows per block so one score block stays under max_bytes."""
+    per_row = max(1, n_controls * n_columns * 8)
+    return max(1, int(max_bytes // per_row))
+
+
+def similarity_matrix(samples, controls, weights, progress=None):
+    """Weighted similarity (%) of every sample against every control, computed in memory-bounded blocks.
+
+    weights is a per-column array; the denominator is the total weight of all columns,
+    matching the original per-pair formula.
+    """
+    n_samples, n_columns = samples.shape
+    n_controls = controls.shape[0]
+    weights = np.asarray(weights, dtype=np.float64)
+    total_weight = weights.sum()
+    sim = np.zeros((n_samples, n_controls), dtype=np.float64)
+    if n_samples == 0 or n_controls == 0 or total_weight <= 0:
+        return sim
+
+    step = block_size(n_controls, n_columns)
+    for start in range(0, n_samples, step):
+        stop = min(start + step, n_samples)
+        sim[start:stop] = column_scores(samples[start:stop], controls) @ weights
+        if progress is not None:
+            progress(stop / n_samples)
+    sim *= 100.0 / total_weight
+    return sim
+
+
+def greedy_match(sim, control_keys=None, min_similarity=0.0):
+    """Match samples to controls in sample order, each taking its best unused control.
+
+    A control is only taken when its similarity is strictly above zero and not below
+    min_similarity; ties go to the
+    first control in file order. Controls sharing a key in control_keys (e.g. duplicate
+    SAMPLE IDs) are used up together. Returns (control_index, similarity) arrays, -1 when unmatched.
+    """
+    n_samples, n_controls = sim.shape
+    matched = np.full(n_samples, -1, dtype=np.int64)
+    scores = np.zeros(n_samples, dtype=np.float64)
+    if n_controls == 0:
+        return matched, scores
+    codes = pd.factorize(pd.Series(control_keys))[0] if control_keys is not None else None
+    available = np.ones(n_controls, dtype=bool)
+    for i in range(n_samples):
+        row = np.where(available, sim[i], -np.inf)
+        j = int(np.argmax(row))
+        if row[j] > 0 and row[j] >= min_similarity:
+            matched[i] = j
+            scores[i] = row[j]
+            if codes is not None:
+                available[codes == codes[j]] = False
+            else:
+                available[j] = False
+    return matched, scores
+
+
+def optimal_match(sim, min_similarity=0.0, control_keys=None):
+    """Globally optimal one-to-one matching that maximises total similarity.
+
+    Solves the rectangular assignment problem once over the similarity matrix. Pairs whose
+    similarity is not above zero or below min_similarity are left unmatched. Controls sharing a
+    key are collapsed to their best-scoring row per sample first. Returns (control_index, similarity).
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    n_samples, n_controls = sim.shape
+    matched = np.full(n_samples, -1, dtype=np.int64)
+    scores = np.zeros(n_samples, dtype=np.float64)
+    if n_samples == 0 or n_controls == 0:
+        return matched, scores
+
+    if control_keys is not None:
+        codes = pd.factorize(pd.Series(control_keys))[0]
+    else:
+        codes = np.arange(n_controls)
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    if len(starts) == n_controls:
+        key_sim = sim
+        key_rows = np.broadcast_to(np.arange(n_controls), sim.shape)
+    else:
+        # Best row of each key group per sample, keeping the first row on ties
+        sorted_sim = sim[:, order]
+        key_sim = np.maximum.reduceat(sorted_sim, starts, axis=1)
+        key_rows = np.empty(key_sim.shape, dtype=np.int64)
+        bounds = np.r_[starts, n_controls]
+        for g in range(len(starts)):
+            block = sorted_sim[:, bounds[g]:bounds[g + 1]]
+            key_rows[:, g] = order[bounds[g] + np.argmax(block, axis=1)]
+
+    rows, cols = linear_sum_assignment(key_sim, maximize=True)
+    values = key_sim[rows, cols]
+    keep = (values > 0) & (values >= min_similarity)
+    rows, cols, values = rows[keep], cols[keep], values[keep]
+    matched[rows] = key_rows[rows, cols]
+    scores[rows] = values
+    return matched, scores
+
+
+
+def feature_vectors(values, weights, fill=None):
+    """Log-scaled, weight-scaled feature vectors for nearest-neighbour search.
+
+    Relative differences map to distances in log space, so sign(x)*log10(1+|x|) scaled by the
+    square root of each column's share of the total weight approximates the similarity ranking.
+    NaNs are replaced by fill (per-column values) or 0.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    total = weights.sum()
+    scale = np.sqrt(weights / total) if total > 0 else np.ones_like(weights)
+    logged = np.sign(values) * np.log10(1.0 + np.abs(values))
+    if fill is None:
+        fill = np.zeros(values.shape[1])
+    logged = np.where(np.isnan(logged), fill[None, :], logged)
+    return logged * scale[None, :]
+
+
+def candidate_controls(samples, controls, weights, k):
+    """Indices (samples x k) of the k nearest controls in log-scaled feature space via a KD-tree."""
+    from scipy.spatial import cKDTree
+
+    k = max(1, min(int(k), controls.shape[0]))
+    with np.errstate(invalid='ignore'):
+        logged_controls = np.sign(controls) * np.log10(1.0 + np.abs(controls))
+        fill = np.nanmean(logged_controls, axis=0) if len(controls) else np.zeros(controls.shape[1])
+    fill = np.nan_to_num(fill)
+    tree = cKDTree(feature_vectors(controls, weights, fill))
+    _, idx = tree.query(feature_vectors(samples, weights, fill), k=k)
+    return np.asarray(idx, dtype=np.int64).reshape(len(samples), k)
+
+
+def candidate_recall(samples, controls, weights, candidates, sample_size=200, seed=0):
+    """Fraction of a random sample of rows whose exhaustive best control is among its candidates."""
+    n_samples = len(samples)
+    if n_samples == 0 or len(controls) == 0:
+        return 1.0
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(n_samples, size=min(sample_size, n_samples), replace=False))
+    exhaustive = similarity_matrix(samples[rows], controls, weights)
+    best = np.argmax(exhaustive, axis=1)
+    hits = (candidates[rows] == best[:, None]).any(axis=1)
+    return float(hits.mean())
+
+
+def group_membership(columns, magnitude_groups, group_orders):
+    """(columns x groups) 0/1 matrix assigning each column to its magnitude group."""
+    membership = np.zeros((len(columns), len(group_orders)), dtype=np.float64)
+    position = {col: i for i, col in enumerate(columns)}
+    for g, order in enumerate(group_orders):
+        for col in magnitude_groups.get(order, []):
+            if col in position:
+                membership[position[col], g] = 1.0
+    return membership
+
+
+def group_partial_sums(samples, controls, membership, candidates=None, progress=None):
+    """Weight-independent per-group sums of column scores, computed in memory-bounded blocks.
+
+    Returns float32 partials of shape (samples x controls x groups), or (samples x k x groups)
+    holding only each sample's own k candidates when a (samples x k) candidates array is given.
+    """
+    n_samples, n_columns = samples.shape
+    n_groups = membership.shape[1]
+    per_sample = controls.shape[0] if candidates is None else candidates.shape[1]
+    partials = np.zeros((n_samples, per_sample, n_groups), dtype=np.float32)
+    if n_samples == 0 or per_sample == 0 or n_groups == 0:
+        return partials
+
+    step = block_size(per_sample, max(n_columns, n_groups))
+    for start in range(0, n_samples, step):
+        stop = min(start + step, n_samples)
+        if candidates is None:
+            partials[start:stop] = column_scores(samples[start:stop], controls) @ membership
+        else:
+            partials[start:stop] = pair_scores(samples[start:stop, None, :], controls[candidates[start:stop]]) @ membership
+        if progress is not None:
+            progress(stop / n_samples)
+    return partials
+
+
+def collapse_groups(membership, group_weights):
+    """Fold group weights into a single column so only one (samples x controls or k) sum is stored.
+
+    Used when the full per-group cache would exceed MAX_CACHE_BYTES; the result cannot be re-weighted.
+    """
+    column_weights = membership @ np.asarray(group_weights, dtype=np.float64)
+    total = float(column_weights.sum())
+    return column_weights[:, None], np.array([1.0]), np.array([total])
+
+
+def weighted_similarity(partials, group_weights, group_sizes):
+    """Similarity (%) from cached per-group partial sums: a single contraction over the group axis."""
+    group_weights = np.asarray(group_weights, dtype=np.float64)
+    total_weight = float((group_weights * np.asarray(group_sizes, dtype=np.float64)).sum())
+    if total_weight <= 0:
+        return np.zeros(partials.shape[:2], dtype=np.float64)
+    sim = partials @ group_weights.astype(np.float32)
+    return sim.astype(np.float64) * (100.0 / total_weight)
+
+
+def key_codes(control_keys, n_controls):
+    """Integer key of every control: shared by controls with the same key, else the control's own index."""
+    if control_keys is None:
+        return np.arange(n_controls)
+    return pd.factorize(pd.Series(control_keys))[0]
+
+
+def candidate_pairs(sim, candidates, codes, min_similarity=0.0):
+    """Usable (sample, key, control, similarity) pairs of a (samples x k) candidate similarity array.
+
+    Pairs not above zero or below min_similarity are dropped, and controls sharing a key keep
+    only their best candidate per sample (the first control on ties). Sorted by sample, then key.
+    """
+    n_samples, k = sim.shape
+    rows = np.repeat(np.arange(n_samples), k)
+    controls = candidates.ravel()
+    values = sim.ravel()
+    keep = (values > 0) & (values >= min_similarity)
+    rows, controls, values = rows[keep], controls[keep], values[keep]
+    keys = codes[controls]
+    order = np.lexsort((controls, -values, keys, rows))
+    rows, keys, controls, values = rows[order], keys[order], controls[order], values[order]
+    first = np.r_[True, (rows[1:] != rows[:-1]) | (keys[1:] != keys[:-1])] if len(rows) else np.zeros(0, dtype=bool)
+    return rows[first], keys[first], controls[first], values[first]
+
+
+def greedy_match_candidates(sim, candidates, control_keys=None, min_similarity=0.0):
+    """greedy_match over each sample's k candidates only: (samples x k) similarity and control indices.
+
+    Same rules as greedy_match; returns control indices into the full control list.
+    """
+    n_samples = sim.shape[0]
+    matched = np.full(n_samples, -1, dtype=np.int64)
+    scores = np.zeros(n_samples, dtype=np.float64)
+    n_controls = len(control_keys) if control_keys is not None else int(candidates.max(initial=-1)) + 1
+    codes = key_codes(control_keys, n_controls)
+    rows, keys, controls, values = candidate_pairs(sim, candidates, codes, min_similarity)
+    # Best candidate first within each sample, ties to the first control in file order
+    order = np.lexsort((controls, -values, rows))
+    rows, keys, controls, values = rows[order], keys[order], controls[order], values[order]
+    bounds = np.searchsorted(rows, np.arange(n_samples + 1))
+    available = np.ones(codes.max(initial=-1) + 1, dtype=bool)
+    for i in range(n_samples):
+        for p in range(bounds[i], bounds[i + 1]):
+            if available[keys[p]]:
+                matched[i] = controls[p]
+                scores[i] = values[p]
+                available[keys[p]] = False
+                break
+    return matched, scores
+
+
+def optimal_match_candidates(sim, candidates, control_keys=None, min_similarity=0.0):
+    """optimal_match over each sample's k candidates only, as a sparse bipartite matching.
+
+    Each sample also gets a private dummy column so a full matching always exists; with cost
+    C - similarity for real pairs and C for the dummy, the minimum-cost matching maximises the
+    total similarity. Returns control indices into the full control list.
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+    n_samples = sim.shape[0]
+    matched = np.full(n_samples, -1, dtype=np.int64)
+    scores = np.zeros(n_samples, dtype=np.float64)
+    n_controls = len(control_keys) if control_keys is not None else int(candidates.max(initial=-1)) + 1
+    codes = key_codes(control_keys, n_controls)
+    rows, keys, controls, values = candidate_pairs(sim, candidates, codes, min_similarity)
+    if len(rows) == 0:
+        return matched, scores
+
+    n_keys = int(codes.max()) + 1
+    offset = float(values.max()) + 1.0
+    dummies = np.arange(n_samples)
+    graph = csr_matrix(
+        (np.r_[offset - values, np.full(n_samples, offset)], (np.r_[rows, dummies], np.r_[keys, n_keys + dummies])),
+        shape=(n_samples, n_keys + n_samples)
+    )
+    row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+    real = col_ind < n_keys
+    row_ind, col_ind = row_ind[real], col_ind[real]
+    # Pairs are sorted by (sample, key), so their flat ids are sorted too
+    pair_ids = rows.astype(np.int64) * n_keys + keys
+    pos = np.searchsorted(pair_ids, row_ind.astype(np.int64) * n_keys + col_ind)
+    matched[row_ind] = controls[pos]
+    scores[row_ind] = values[pos]
+    return matched, scores
+
+
+def run_matching(sim, control_keys, match_mode="greedy", min_similarity=0.0, candidates=None):
+    """Match on a similarity matrix and return (matched, scores, summary).
+
+    sim is (samples x controls), or (samples x k) with the (samples x k) candidates it was scored on;
+    matched holds indices into the full control list either way.
+    """
+    if candidates is None:
+        matched, scores = greedy_match(sim, control_keys, min_similarity)
+    else:
+        matched, scores = greedy_match_candidates(sim, candidates, control_keys, min_similarity)
+    greedy_total = float(scores.sum())
+    if match_mode == "optimal":
+        if candidates is None:
+            matched, scores = optimal_match(sim, min_similarity, control_keys)
+        else:
+            matched, scores = optimal_match_candidates(sim, candidates, control_keys, min_similarity)
+    summary = {
+        "mode": match_mode,
+        "matched": int((matched >= 0).sum()),
+        "total_similarity": float(scores.sum()),
+        "greedy_total": greedy_total,
+    }
+    return matched, scores, summary
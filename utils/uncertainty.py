@@ -0,0 +1,59 @@
+import logging
+import numpy as np
+import pandas as pd
+from utils.blank_correction import BLANK_RSD_COLUMN
+
+logger = logging.getLogger(__name__)
+
+# Instrument uncertainty columns kept by load_excel next to Int and Corr Con
+UNCERTAINTY_COLUMNS = ['Int SD', 'Int RSD', 'Corr Con SD', 'Corr Con RSD']
+# Columns added by propagate_uncertainty
+COMBINED_SD = 'Combined SD'
+COMBINED_RSD = 'Combined RSD'
+
+
+def compact_uncertainty(df):
+    """Store the instrument SD/RSD columns as float32 and fill a missing RSD from its SD."""
+    for value_column in ('Int', 'Corr Con'):
+        sd_column, rsd_column = f"{value_column} SD", f"{value_column} RSD"
+        if sd_column not in df.columns and rsd_column not in df.columns:
+            continue
+        for col in (sd_column, rsd_column):
+            if col not in df.columns:
+                df[col] = np.nan
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float32)
+        value = pd.to_numeric(df[value_column], errors='coerce').abs().to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            from_sd = np.where(value > 0, df[sd_column].to_numpy(dtype=np.float64) / value * 100, np.nan)
+        df[rsd_column] = df[rsd_column].fillna(pd.Series(from_sd, index=df.index).astype(np.float32))
+    if 'Units' in df.columns:
+        df['Units'] = df['Units'].astype('category')
+    return df
+
+
+def propagate_uncertainty(df):
+    """Combined SD/RSD of Corr Con after the Process corrections.
+
+    Weight, volume, DF, IS and drift corrections only rescale Corr Con, so a relative
+    uncertainty carries through them unchanged. The blank subtraction is additive: it stores
+    the RSD of the corrected value (sample and interpolated blank SD in quadrature), which is
+    used instead of the instrument RSD on blank-corrected rows. The combined SD is then
+    recomputed from the current Corr Con in one pass.
+    Returns a copy; rows without an instrument RSD get NaN.
+    """
+    df = df.copy()
+    if 'Corr Con RSD' not in df.columns or 'Corr Con' not in df.columns:
+        df[COMBINED_SD] = np.float32(np.nan)
+        df[COMBINED_RSD] = np.float32(np.nan)
+        return df
+
+    combined_rsd = df['Corr Con RSD'].to_numpy(dtype=np.float64)
+    blank_rsd_column = BLANK_RSD_COLUMN.format('Corr Con')
+    if blank_rsd_column in df.columns:
+        blank_rsd = df[blank_rsd_column].to_numpy(dtype=np.float64)
+        combined_rsd = np.where(np.isnan(blank_rsd), combined_rsd, blank_rsd)
+    value = pd.to_numeric(df['Corr Con'], errors='coerce').abs().to_numpy(dtype=np.float64)
+
+    df[COMBINED_RSD] = combined_rsd.astype(np.float32)
+    df[COMBINED_SD] = (value * combined_rsd / 100).astype(np.float32)
+    return df
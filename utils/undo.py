@@ -0,0 +1,214 @@
+import logging
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import QObject, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+# Edits kept on the undo stack
+UNDO_LIMIT = 100
+# Edits keeping whole tables (commits that reshape a stage output) kept on the undo stack
+FRAME_LIMIT = 5
+
+
+class ColumnDelta:
+    """Old and new values of the changed rows (positions) of one column."""
+    __slots__ = ('column', 'rows', 'old', 'new')
+
+    def __init__(self, column, rows, old, new):
+        self.column = column
+        self.rows = rows
+        self.old = old
+        self.new = new
+
+
+def column_delta(column, before, after):
+    """Delta between two aligned value sequences of a column, or None when nothing changed."""
+    before, after = np.asarray(before), np.asarray(after)
+    b, a = pd.Series(before.astype(object)), pd.Series(after.astype(object))
+    same = b.eq(a) | (b.isna() & a.isna())
+    rows = np.flatnonzero(~same.to_numpy())
+    if len(rows) == 0:
+        return None
+    # Keep the column dtype (e.g. uint16 bitmasks) so writing back does not upcast
+    return ColumnDelta(column, rows, before[rows], after[rows])
+
+
+def frame_deltas(before, after):
+    """Column deltas turning `before` into `after`, or None when the frames are not row/column aligned."""
+    if before is None or after is None or before.shape != after.shape or not before.columns.equals(after.columns):
+        return None
+    deltas = []
+    for j, column in enumerate(after.columns):
+        delta = column_delta(j, before.iloc[:, j].to_numpy(), after.iloc[:, j].to_numpy())
+        if delta is not None:
+            deltas.append(delta)
+    return deltas
+
+
+def apply_deltas(df, deltas, undo):
+    """Write the old (undo) or new values of every delta into df in place; columns are positions or names."""
+    for delta in deltas:
+        j = delta.column if isinstance(delta.column, (int, np.integer)) else df.columns.get_loc(delta.column)
+        if len(delta.rows) and delta.rows[-1] >= len(df):
+            raise ValueError(f"Edit no longer matches the data ({len(df)} rows)")
+        df.iloc[delta.rows, j] = delta.old if undo else delta.new
+
+
+def delta_size(deltas):
+    return sum(len(delta.rows) for delta in deltas)
+
+
+class Edit:
+    """One undoable correction: how to undo and redo it, and how many cells it changed.
+
+    source names the data the edit applies to (e.g. 'pivot'), so its edits can be dropped
+    when that data is rebuilt.
+    """
+    def __init__(self, description, undo, redo, cells=0, source=None, frames=0):
+        self.description = description
+        self.undo = undo
+        self.redo = redo
+        self.cells = cells
+        self.source = source
+        self.frames = frames  # whole tables the edit keeps alive
+
+
+def frame_edit(description, get_frame, deltas, refresh=None):
+    """Edit applying column deltas in place on the frame returned by get_frame."""
+    def run(undo):
+        apply_deltas(get_frame(), deltas, undo)
+        if refresh is not None:
+            refresh()
+    return Edit(description, lambda: run(True), lambda: run(False), delta_size(deltas))
+
+
+def stage_edit(description, pipeline, name, before, before_params, after, after_params, refresh=None):
+    """Edit of a pipeline stage commit, kept as column deltas when the outputs are aligned.
+
+    The deltas are applied in place to the stage's current output, as long as that is still
+    the output this edit left (same stage version); otherwise only the parameters are put
+    back and the stage passes its input through until its tab commits again. When a commit
+    reshapes the table (e.g. the first RM check), the edit keeps the two stage outputs and
+    counts against FRAME_LIMIT.
+    """
+    deltas = frame_deltas(before, after)
+    state = {'version': pipeline.version(name)}
+
+    def run(undo):
+        params = before_params if undo else after_params
+        if deltas is None:
+            pipeline.restore(name, before if undo else after, params)
+        else:
+            frame = pipeline.cached_output(name)
+            if frame is None or pipeline.version(name) != state['version']:
+                logger.warning(f"{name} output changed since '{description}'; restoring its parameters only")
+                pipeline.restore(name, None, params)
+            else:
+                apply_deltas(frame, deltas, undo)
+                pipeline.restore(name, frame, params)
+        state['version'] = pipeline.version(name)
+        if refresh is not None:
+            refresh()
+
+    if deltas is not None:
+        # run only needs the deltas: release the two tables held by its closure
+        before = after = None
+        return Edit(description, lambda: run(True), lambda: run(False), delta_size(deltas))
+    frames = sum(frame is not None for frame in (before, after))
+    return Edit(description, lambda: run(True), lambda: run(False), after.size, frames=frames)
+
+
+def params_edit(description, pipeline, name, before_params, after_params, refresh=None):
+    """Edit of the parameters of a stage that computes its own output; no frames are kept.
+
+    Its size is the number of parameter entries (e.g. solution labels) that changed.
+    """
+    def run(undo):
+        pipeline.set_params(name, before_params if undo else after_params)
+        if refresh is not None:
+            refresh()
+
+    before, after = before_params or {}, after_params or {}
+    cells = sum(1 for key in set(before) | set(after) if before.get(key) != after.get(key))
+    return Edit(description, lambda: run(True), lambda: run(False), cells)
+
+
+class UndoStack(QObject):
+    """Undo/redo history of data corrections."""
+    changed = pyqtSignal()
+
+    def __init__(self, limit=UNDO_LIMIT, frame_limit=FRAME_LIMIT):
+        super().__init__()
+        self.limit = limit
+        self.frame_limit = frame_limit
+        self._undo = []
+        self._redo = []
+
+    def push(self, edit):
+        if edit.cells == 0:
+            return
+        self._undo.append(edit)
+        del self._undo[:-self.limit]
+        # Drop the oldest edits until few enough whole tables are kept alive
+        while sum(e.frames for e in self._undo) > self.frame_limit:
+            oldest = next(i for i, e in enumerate(self._undo) if e.frames)
+            del self._undo[:oldest + 1]
+        self._redo.clear()
+        logger.debug(f"Recorded edit '{edit.description}' ({edit.cells} cells)")
+        self.changed.emit()
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.changed.emit()
+
+    def discard(self, source):
+        """Drop the edits of one source, e.g. after the data they apply to was rebuilt."""
+        undo = [edit for edit in self._undo if edit.source != source]
+        redo = [edit for edit in self._redo if edit.source != source]
+        if len(undo) == len(self._undo) and len(redo) == len(self._redo):
+            return
+        logger.debug(f"Discarded {len(self._undo) - len(undo) + len(self._redo) - len(redo)} '{source}' edits")
+        self._undo, self._redo = undo, redo
+        self.changed.emit()
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_text(self):
+        return self._undo[-1].description if self._undo else ""
+
+    def redo_text(self):
+        return self._redo[-1].description if self._redo else ""
+
+    def undo(self):
+        if not self._undo:
+            return None
+        edit = self._undo.pop()
+        try:
+            edit.undo()
+        except Exception as e:
+            logger.error(f"Undo of '{edit.description}' failed: {str(e)}")
+            self.clear()
+            raise
+        self._redo.append(edit)
+        self.changed.emit()
+        return edit.description
+
+    def redo(self):
+        if not self._redo:
+            return None
+        edit = self._redo.pop()
+        try:
+            edit.redo()
+        except Exception as e:
+            logger.error(f"Redo of '{edit.description}' failed: {str(e)}")
+            self.clear()
+            raise
+        self._undo.append(edit)
+        self.changed.emit()
+        return edit.description